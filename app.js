@@ -1,8 +1,17 @@
 // State
 let products = [];
-let toppings = [];
+let productsById = new Map();
 let storeConfig = {};
+let shardIndex = null; // set when the catalog is published as category shards
 let cart = JSON.parse(localStorage.getItem('bitebabe_cart')) || [];
+let liveStock = new Map(); // product id -> units available, from the stock service
+let stockVersion = null;
+const STOCK_POLL_MS = 15000;
+let searchIndexUrl = null; // the editor's precomputed search index, fetched on first use
+let searchIndex = null;
+let searchCategory = null; // facet the results are narrowed to
+let searchSeq = 0;
+const SEARCH_RESULTS = 48;
 
 // DOM Elements
 const productsGrid = document.getElementById('productsGrid');
@@ -12,6 +21,8 @@ const cartTotalElement = document.getElementById('cartTotal');
 const cartBadge = document.getElementById('cartBadge');
 const modal = document.getElementById('productModal');
 const modalBody = document.getElementById('modalBody');
+const searchInput = document.getElementById('searchInput');
+const searchFacets = document.getElementById('searchFacets');
 
 // Initialize
 document.addEventListener('DOMContentLoaded', async () => {
@@ -19,26 +30,113 @@ document.addEventListener('DOMContentLoaded', async () => {
     renderProducts();
     updateCartUI();
     renderStoreInfo();
+    document.getElementById('menuSearch').hidden = !searchIndexUrl;
+    if (storeConfig.stock_api) {
+        await refreshStock();
+        setInterval(refreshStock, STOCK_POLL_MS);
+    }
 });
 
 // Load Data
+// Prefers the editor's published output: a category shard index (first page of
+// each category, rest fetched on demand) or a single bundle with toppings
+// inlined. Falls back to the raw data files when nothing has been published.
 async function loadData() {
     try {
-        const [prodRes, topRes, storeRes] = await Promise.all([
-            fetch('data/products.json'),
-            fetch('data/toppings.json'),
-            fetch('data/store.json')
-        ]);
-
-        products = await prodRes.json();
-        toppings = await topRes.json();
-        storeConfig = await storeRes.json();
+        const manifestRes = await fetch('data/manifest.json', { cache: 'no-cache' });
+        const manifest = manifestRes.ok ? await manifestRes.json() : {};
+        searchIndexUrl = manifest.search ? `data/${manifest.search}` : null;
+        if (manifest.shards) {
+            shardIndex = await (await fetch(`data/${manifest.shards}`)).json();
+            shardIndex.base = `data/${manifest.shards.substring(0, manifest.shards.lastIndexOf('/') + 1)}`;
+            shardIndex.categories.forEach(cat => {
+                cat.products = cat.first_page;
+                cat.pagesLoaded = new Map(); // page -> promise of its products
+            });
+            storeConfig = shardIndex.store;
+        } else if (manifest.bundle) {
+            const bundle = await (await fetch(`data/${manifest.bundle}`)).json();
+            products = bundle.products;
+            storeConfig = bundle.store;
+        } else {
+            await loadRawData();
+        }
+        productsById = new Map(products.map(p => [p.id, p]));
     } catch (error) {
         console.error('Error loading data:', error);
         productsGrid.innerHTML = '<p class="error">Failed to load products. Please try again later.</p>';
     }
 }
 
+async function loadRawData() {
+    const [prodRes, topRes, storeRes] = await Promise.all([
+        fetch('data/products.json'),
+        fetch('data/toppings.json'),
+        fetch('data/store.json')
+    ]);
+
+    products = await prodRes.json();
+    const toppingsById = new Map((await topRes.json()).map(t => [t.id, t]));
+    storeConfig = await storeRes.json();
+
+    // Same shape as the bundle: topping records inline on each product
+    products.forEach(p => {
+        p.toppings = (p.toppings || []).map(id => toppingsById.get(id)).filter(Boolean);
+    });
+}
+
+// Live Stock
+// With `stock_api` in store.json (the editor's `python -m editor serve`), cart
+// quantities are limited by live availability and checkout sells the items
+// atomically, so two customers can't both get the last ones. Without it the
+// static max_order limit applies as before.
+async function refreshStock() {
+    try {
+        const query = stockVersion === null ? '' : `?since=${stockVersion}`;
+        const data = await (await fetch(`${storeConfig.stock_api}/stock${query}`, { cache: 'no-cache' })).json();
+        if (data.full) liveStock = new Map();
+        Object.entries(data.stock).forEach(([id, available]) => liveStock.set(id, available));
+        stockVersion = data.version;
+    } catch (error) {
+        console.warn('Stock service unavailable:', error);
+    }
+}
+
+// Most units of a product one cart line may hold (Infinity when unlimited)
+function orderLimit(productId, maxOrder) {
+    const available = liveStock.get(productId);
+    return available === undefined ? maxOrder || Infinity : Math.min(maxOrder || Infinity, available);
+}
+
+// Sells the whole cart in one request; false (after telling the customer) if it can't be
+async function sellCart() {
+    if (!storeConfig.stock_api) return true;
+    const quantities = new Map();
+    cart.forEach(item => quantities.set(item.productId, (quantities.get(item.productId) || 0) + item.qty));
+    let res;
+    try {
+        res = await fetch(`${storeConfig.stock_api}/decrement`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ items: [...quantities].map(([id, qty]) => ({ id, qty })) })
+        });
+    } catch (error) {
+        // An unreachable stock service must not stop orders
+        console.warn('Stock service unavailable:', error);
+        return true;
+    }
+    const data = await res.json();
+    await refreshStock();
+    if (res.ok) return true;
+    if (res.status === 409) {
+        const lines = Object.entries(data.available).map(([id, n]) => `${cart.find(i => i.productId === id).name}: ${n} left`);
+        alert(`Sorry, some items just sold out:\n${lines.join('\n')}`);
+    } else {
+        alert(data.error);
+    }
+    return false;
+}
+
 // Render Store Info
 function renderStoreInfo() {
     if (storeConfig.name) {
@@ -50,11 +148,32 @@ function renderStoreInfo() {
     }
 }
 
+// Product Images
+// Uses the editor's resized variants (WebP + PNG/JPEG fallback) when present,
+// otherwise falls back to the single `image` path.
+function productImage(product, variant, attrs, placeholder) {
+    const fallbackSrc = placeholder || 'https://placehold.co/400x400/FFD6E8/FF5C9E?text=Cookie';
+    const v = product.variants && product.variants[variant];
+    const src = v ? v.fallback : product.image;
+    const size = v ? `width="${v.width}" height="${v.height}"` : '';
+    const img = `<img src="${src}" ${size} alt="${product.name}" loading="lazy" ${attrs} onerror="this.onerror=null;this.src='${fallbackSrc}'">`;
+    if (!v) return img;
+    return `<picture><source srcset="${v.webp}" type="image/webp">${img}</picture>`;
+}
+
 // Render Products
 function renderProducts() {
-    productsGrid.innerHTML = products.map(product => `
+    if (shardIndex) {
+        renderCategorySections();
+        return;
+    }
+    productsGrid.innerHTML = products.map(productCard).join('');
+}
+
+function productCard(product) {
+    return `
         <div class="product-card">
-            <img src="${product.image}" alt="${product.name}" class="product-image" onerror="this.src='https://placehold.co/400x400/FFD6E8/FF5C9E?text=Cookie'">
+            ${productImage(product, 'card', 'class="product-image"')}
             <div class="product-info">
                 <div class="product-category">${product.category}</div>
                 <h3 class="product-title">${product.name}</h3>
@@ -64,19 +183,182 @@ function renderProducts() {
                 </button>
             </div>
         </div>
+    `;
+}
+
+// Category Shards
+function renderCategorySections() {
+    productsGrid.innerHTML = shardIndex.categories.map(cat => `
+        <div class="category-section">
+            <h3 class="category-title">${cat.name || 'Other'} <span>(${cat.count})</span></h3>
+            <div class="products-grid" id="grid-${cat.slug}">${cat.products.map(productCard).join('')}</div>
+            ${cat.products.length < cat.count ? `
+                <button class="btn btn-primary load-more" id="more-${cat.slug}" onclick="loadMoreCategory('${cat.slug}')">Load more</button>
+            ` : ''}
+        </div>
     `).join('');
 }
 
+// Fetches one shard page (once); its full product records become available to the modal/cart
+function loadCategoryPage(cat, page) {
+    if (!cat.pagesLoaded.has(page)) {
+        cat.pagesLoaded.set(page, fetch(shardIndex.base + cat.pages[page])
+            .then(res => res.json())
+            .then(shard => {
+                shard.products.forEach(p => productsById.set(p.id, p));
+                return shard.products;
+            })
+            .catch(error => {
+                cat.pagesLoaded.delete(page);
+                throw error;
+            }));
+    }
+    return cat.pagesLoaded.get(page);
+}
+
+async function loadMoreCategory(slug) {
+    const cat = shardIndex.categories.find(c => c.slug === slug);
+    const page = Math.ceil(cat.products.length / shardIndex.page_size);
+    const pageProducts = await loadCategoryPage(cat, page);
+    cat.products = cat.products.concat(pageProducts);
+
+    document.getElementById(`grid-${slug}`).insertAdjacentHTML('beforeend', pageProducts.map(productCard).join(''));
+    if (cat.products.length >= cat.count) {
+        document.getElementById(`more-${slug}`).remove();
+    }
+}
+
+// Cards from the index are summaries; the full record lives in the category's first shard
+async function findProduct(productId) {
+    if (productsById.has(productId) || !shardIndex) return productsById.get(productId);
+    const cat = shardIndex.categories.find(c => c.first_page.some(p => p.id === productId));
+    if (cat) await loadCategoryPage(cat, 0);
+    return productsById.get(productId);
+}
+
+// Search
+// The index maps accent-folded words to docs (positions in index.docs), best
+// match first, and typed prefixes to the words they may be completing. Docs
+// are grouped by category in shard order: category i holds the next
+// index.facets[i] docs.
+function searchTokens(text) {
+    return String(text).normalize('NFKD').replace(/\p{M}/gu, '').toLowerCase().match(/[\p{L}\p{N}]+/gu) || [];
+}
+
+function indexEntry(map, key) {
+    return Object.hasOwn(map, key) ? map[key] : [];
+}
+
+function loadSearchIndex() {
+    if (!searchIndex) {
+        searchIndex = fetch(searchIndexUrl).then(res => res.json()).then(index => {
+            index.docCategory = new Uint32Array(index.docs.length);
+            index.categoryStart = [];
+            let start = 0;
+            index.facets.forEach((count, i) => {
+                index.categoryStart.push(start);
+                index.docCategory.fill(i, start, start + count);
+                start += count;
+            });
+            return index;
+        }).catch(error => {
+            searchIndex = null;
+            throw error;
+        });
+    }
+    return searchIndex;
+}
+
+// Every word must match, the last one as a prefix of a word
+function searchProducts(index, query) {
+    const words = searchTokens(query);
+    if (!words.length) return [];
+    const partial = words.pop();
+    const required = words.map(word => new Set(indexEntry(index.terms, word)));
+    const seen = new Set();
+    const matches = [];
+    for (const word of [partial, ...indexEntry(index.prefixes, partial)]) {
+        for (const doc of indexEntry(index.terms, word)) {
+            if (!seen.has(doc) && required.every(docs => docs.has(doc))) {
+                seen.add(doc);
+                matches.push(doc);
+            }
+        }
+    }
+    return matches;
+}
+
+// Card data for the docs: loaded already, on the first page in the shard
+// index, or fetched with the shard page the doc falls on
+async function searchResults(index, docs) {
+    const pages = new Map();
+    const summaries = new Map();
+    if (shardIndex) {
+        docs.forEach(doc => {
+            const i = index.docCategory[doc];
+            const cat = shardIndex.categories[i];
+            const page = Math.floor((doc - index.categoryStart[i]) / shardIndex.page_size);
+            if (productsById.has(index.docs[doc])) return;
+            if (page === 0) {
+                summaries.set(index.docs[doc], cat.first_page[doc - index.categoryStart[i]]);
+            } else {
+                pages.set(`${i}/${page}`, loadCategoryPage(cat, page));
+            }
+        });
+        await Promise.all(pages.values());
+    }
+    return docs.map(doc => productsById.get(index.docs[doc]) || summaries.get(index.docs[doc])).filter(Boolean);
+}
+
+async function searchMenu() {
+    const seq = ++searchSeq;
+    const query = searchInput.value;
+    if (!searchTokens(query).length) {
+        searchCategory = null;
+        searchFacets.innerHTML = '';
+        renderProducts();
+        return;
+    }
+    try {
+        const index = await loadSearchIndex();
+        const matches = searchProducts(index, query);
+        const counts = new Map();
+        matches.forEach(doc => counts.set(index.docCategory[doc], (counts.get(index.docCategory[doc]) || 0) + 1));
+        if (!counts.has(searchCategory)) searchCategory = null;
+        const shown = matches.filter(doc => searchCategory === null || index.docCategory[doc] === searchCategory);
+        const results = await searchResults(index, shown.slice(0, SEARCH_RESULTS));
+        if (seq !== searchSeq) return; // a newer keystroke has taken over
+
+        searchFacets.innerHTML = matches.length ? [
+            `<button class="facet ${searchCategory === null ? 'active' : ''}" onclick="filterSearch(null)">All <span>(${matches.length})</span></button>`,
+            ...[...counts].map(([i, count]) => `
+                <button class="facet ${searchCategory === i ? 'active' : ''}" onclick="filterSearch(${i})">${index.categories[i] || 'Other'} <span>(${count})</span></button>
+            `)
+        ].join('') : '';
+        productsGrid.innerHTML = results.length
+            ? results.map(productCard).join('') + (shown.length > results.length ? `<p class="search-more">Showing ${results.length} of ${shown.length} results. Keep typing to narrow them down.</p>` : '')
+            : `<p class="search-empty">No treats match "${query.replace(/[&<>"]/g, c => `&#${c.charCodeAt(0)};`)}".</p>`;
+    } catch (error) {
+        console.error('Error searching:', error);
+    }
+}
+
+function filterSearch(category) {
+    searchCategory = category;
+    return searchMenu();
+}
+
 // Product Modal
-function openProductModal(productId) {
-    const product = products.find(p => p.id === productId);
+async function openProductModal(productId) {
+    const product = await findProduct(productId);
     if (!product) return;
 
-    const productToppings = toppings.filter(t => product.toppings.includes(t.id));
+    const productToppings = product.toppings;
+    const limit = orderLimit(product.id, product.max_order);
 
     modalBody.innerHTML = `
         <div style="text-align: center; margin-bottom: 20px;">
-            <img src="${product.image}" style="width: 150px; height: 150px; object-fit: cover; border-radius: 10px; margin-bottom: 10px;" onerror="this.src='https://placehold.co/400x400/FFD6E8/FF5C9E?text=Cookie'">
+            ${productImage(product, 'modal', 'style="width: 150px; height: 150px; object-fit: cover; border-radius: 10px; margin-bottom: 10px;"')}
             <h2>${product.name}</h2>
             <p style="color: var(--text-light);">${product.description}</p>
             <h3 style="color: var(--accent); margin-top: 10px;">${formatRupiah(product.price)}</h3>
@@ -87,7 +369,7 @@ function openProductModal(productId) {
             <div style="display: flex; align-items: center; gap: 10px; justify-content: center; margin-bottom: 20px;">
                 <button class="qty-btn" onclick="adjustModalQty(-1)">-</button>
                 <span id="modalQty" style="font-weight: bold; font-size: 1.2rem;">1</span>
-                <button class="qty-btn" onclick="adjustModalQty(1, ${product.max_order})">+</button>
+                <button class="qty-btn" onclick="adjustModalQty(1, ${limit})">+</button>
             </div>
         </div>
 
@@ -106,9 +388,13 @@ function openProductModal(productId) {
             </div>
         ` : ''}
 
-        <button class="btn btn-primary btn-block" onclick="addToCart('${product.id}')">
-            Add to Order - <span id="modalTotal">${formatRupiah(product.price)}</span>
-        </button>
+        ${limit > 0 ? `
+            <button class="btn btn-primary btn-block" onclick="addToCart('${product.id}')">
+                Add to Order - <span id="modalTotal">${formatRupiah(product.price)}</span>
+            </button>
+        ` : `
+            <button class="btn btn-primary btn-block" disabled>Sold out</button>
+        `}
     `;
 
     modal.classList.add('active');
@@ -124,7 +410,7 @@ function closeModal() {
 function adjustModalQty(delta, max) {
     let newQty = window.currentModalQty + delta;
     if (newQty < 1) newQty = 1;
-    if (max && newQty > max) newQty = max;
+    if (max !== undefined && newQty > max) newQty = max;
 
     window.currentModalQty = newQty;
     document.getElementById('modalQty').textContent = newQty;
@@ -140,7 +426,7 @@ function toggleToppingSelection(toppingId, checkboxElement) {
         label.classList.remove('selected');
     }
 
-    const topping = toppings.find(t => t.id === toppingId);
+    const topping = window.currentModalProduct.toppings.find(t => t.id === toppingId);
     if (checkboxElement.checked) {
         window.currentModalToppings.push(topping);
     } else {
@@ -153,19 +439,29 @@ function updateModalTotal() {
     const basePrice = window.currentModalProduct.price;
     const toppingsPrice = window.currentModalToppings.reduce((sum, t) => sum + t.price, 0);
     const total = (basePrice + toppingsPrice) * window.currentModalQty;
-    document.getElementById('modalTotal').textContent = formatRupiah(total);
+    const totalElement = document.getElementById('modalTotal');
+    if (totalElement) totalElement.textContent = formatRupiah(total); // absent when sold out
 }
 
 // Cart Logic
 function addToCart(productId) {
-    const product = products.find(p => p.id === productId);
+    const product = productsById.get(productId);
+    // Live stock may have dropped since the modal opened
+    const qty = Math.min(window.currentModalQty, orderLimit(product.id, product.max_order));
+    if (qty < 1) {
+        alert(`Sorry, ${product.name} just sold out.`);
+        closeModal();
+        return;
+    }
     const cartItem = {
         id: Date.now(), // Unique ID for cart item
         productId: product.id,
         name: product.name,
         price: product.price,
         image: product.image,
-        qty: window.currentModalQty,
+        variants: product.variants ? { thumb: product.variants.thumb } : undefined,
+        max_order: product.max_order,
+        qty,
         toppings: [...window.currentModalToppings]
     };
 
@@ -184,14 +480,16 @@ function updateCartQty(cartItemId, delta) {
     const item = cart.find(i => i.id === cartItemId);
     if (!item) return;
 
-    const product = products.find(p => p.id === item.productId);
+    const product = productsById.get(item.productId);
     let newQty = item.qty + delta;
 
     if (newQty < 1) {
         removeFromCart(cartItemId);
         return;
     }
-    if (product.max_order && newQty > product.max_order) return;
+    // Shard mode may not have the product loaded; the cart item keeps its own limit
+    const maxOrder = orderLimit(item.productId, product ? product.max_order : item.max_order);
+    if (newQty > maxOrder) return;
 
     item.qty = newQty;
     saveCart();
@@ -219,7 +517,7 @@ function updateCartUI() {
 
         return `
             <div class="cart-item">
-                <img src="${item.image}" class="cart-item-img" onerror="this.src='https://placehold.co/100x100/FFD6E8/FF5C9E?text=Cookie'">
+                ${productImage(item, 'thumb', 'class="cart-item-img"', 'https://placehold.co/100x100/FFD6E8/FF5C9E?text=Cookie')}
                 <div class="cart-item-details">
                     <div class="cart-item-title">${item.name}</div>
                     <div class="cart-item-price">${formatRupiah(item.price)}</div>
@@ -247,7 +545,7 @@ function toggleCart() {
 }
 
 // Checkout
-function checkoutWhatsApp() {
+async function checkoutWhatsApp() {
     if (cart.length === 0) {
         alert('Your cart is empty!');
         return;
@@ -262,6 +560,13 @@ function checkoutWhatsApp() {
         return;
     }
 
+    // Opened before awaiting the stock service, or browsers block it as a popup
+    const whatsappWindow = storeConfig.stock_api ? window.open('', '_blank') : null;
+    if (!(await sellCart())) {
+        if (whatsappWindow) whatsappWindow.close();
+        return;
+    }
+
     let message = `Halo, saya ingin pesan:\n\n`;
     let total = 0;
 
@@ -285,7 +590,11 @@ function checkoutWhatsApp() {
     const whatsappNumber = storeConfig.whatsapp || '628123456789';
     const url = `https://wa.me/${whatsappNumber}?text=${encodeURIComponent(message)}`;
 
-    window.open(url, '_blank');
+    if (whatsappWindow) {
+        whatsappWindow.location = url;
+    } else {
+        window.open(url, '_blank');
+    }
 }
 
 // Utility
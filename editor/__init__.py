@@ -0,0 +1 @@
+"""BiteBabe catalog editor: the Qt GUI (editor.admin) and a headless CLI (python -m editor)"""
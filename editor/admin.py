@@ -1,37 +1,663 @@
+import time
+_IMPORT_START = time.perf_counter()
+
 import sys
-import json
 import os
-import shutil
-import subprocess
+import csv
+import dataclasses
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
-                             QLabel, QLineEdit, QPushButton, QTabWidget, QTableWidget, 
-                             QTableWidgetItem, QHeaderView, QFileDialog, QMessageBox, 
+                             QLabel, QLineEdit, QPushButton, QTabWidget, QTableView,
+                             QAbstractItemView, QHeaderView, QFileDialog, QMessageBox, 
                              QFormLayout, QTextEdit, QSpinBox, QDoubleSpinBox, QComboBox,
-                             QListWidget, QCheckBox, QGroupBox, QScrollArea)
-from PyQt5.QtGui import QPixmap, QIcon, QFont, QColor
-from PyQt5.QtCore import Qt, QSize
-from PIL import Image
-
-# Constants
-SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-PROJECT_DIR = os.path.dirname(SCRIPT_DIR)  # Parent of 'editor' folder
-DATA_DIR = os.path.join(PROJECT_DIR, "data")
-ASSETS_DIR = os.path.join(PROJECT_DIR, "assets")
-PRODUCTS_DIR = os.path.join(ASSETS_DIR, "products")
-PRODUCTS_FILE = os.path.join(DATA_DIR, "products.json")
-TOPPINGS_FILE = os.path.join(DATA_DIR, "toppings.json")
-STORE_FILE = os.path.join(DATA_DIR, "store.json")
-LOGO_TARGET = os.path.join(ASSETS_DIR, "logo.png")
-FAVICON_TARGET = os.path.join(ASSETS_DIR, "favicon.png")
-
-# Ensure directories exist
-os.makedirs(DATA_DIR, exist_ok=True)
-os.makedirs(ASSETS_DIR, exist_ok=True)
-os.makedirs(PRODUCTS_DIR, exist_ok=True)
+                             QListWidget, QListView, QCheckBox, QGroupBox, QScrollArea, QProgressDialog,
+                             QShortcut, QInputDialog, QDialog, QDialogButtonBox, QStackedWidget,
+                             QUndoStack, QUndoCommand)
+from PyQt5.QtGui import QPixmap, QIcon, QFont, QColor, QImage, QImageReader, QKeySequence
+from PyQt5.QtCore import (Qt, QSize, QTimer, QObject, QThread, pyqtSignal, QAbstractTableModel,
+                          QAbstractListModel, QSortFilterProxyModel, QModelIndex, QSettings, QSemaphore,
+                          QFileSystemWatcher, QRunnable, QThreadPool)
+
+if __package__ in (None, ""):
+    # Run as a script (python editor/admin.py): make the editor package importable
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from editor.config import (PROJECT_DIR, DATA_DIR, PRODUCTS_DIR, THUMBNAIL_CACHE_DIR, PRODUCTS_FILE, TOPPINGS_FILE, STORE_FILE, LOGO_TARGET,
+                           EXPORT_MODES, PRICE_MAX, TOPPING_PRICE_MAX, STOCK_MAX,
+                           MAX_ORDER_RANGE, PUBLISHED_SOURCES, CATALOG_BACKEND, CATALOG_DB, catalog_backend_error, ensure_dirs)
+from editor.catalog import Catalog, Product, Topping, new_id, diff_records
+from editor.storage import DataFileError, DataStore, file_signature, read_json
+from editor.images import (build_image_variants, build_branding, init_import_worker, import_image_worker,
+                           apply_import_result, match_import_images, preview_source)
+from editor.publish import git_publish, publish_storefront, store_export_mode, storefront_files
+from editor.assets import collect_garbage, product_assets, release_assets
+from editor.timing import PhaseTimer, span, tracer
+from editor.buildcache import BuildCache
+from editor.catalogdb import CatalogDB, open_catalog_db
+from editor.bulk import BULK_OPERATIONS, BulkEditError, apply_records, plan_bulk_edit
+from editor.importer import ProductImporter, apply_batch, open_import, validated_batches
+
+# Edits within this window are written to disk in one batch
+SAVE_DEBOUNCE_MS = 300
+
+# Rapid "Save & Push" clicks within this window are published as one commit
+PUBLISH_DEBOUNCE_MS = 3000
+
+# Products at or below this stock show under the "Low stock" filter
+LOW_STOCK = 5
+
+# Cold start (import to first paint) target; the phase report is printed when it
+# is exceeded, or always with BITEBABE_STARTUP_REPORT=1
+STARTUP_BUDGET_MS = 800
+
+# Data file changes from other programs (git pull, scripts) are picked up after
+# this quiet period, so multi-file updates are read together
+RELOAD_DEBOUNCE_MS = 250
+
+# Validated import batches allowed in flight between the import thread and the GUI
+IMPORT_QUEUED_BATCHES = 4
+LOGO_PREVIEW_SIZE = 140
+
+# Product table thumbnails and the product form preview, in px
+THUMBNAIL_SIZE = 40
+PRODUCT_PREVIEW_SIZE = 160
+# Decoded thumbnails kept in memory (bytes of pixel data, least recently used dropped first)
+THUMBNAIL_MEMORY_BYTES = 32 * 1024 * 1024
+# Decoder threads; kept low so decoding never competes with the GUI thread
+THUMBNAIL_THREADS = 2
+
+# --- Thumbnails ---
+class ThumbnailTask(QRunnable):
+    """Decode one image downscaled to `edge` px on a pool thread.
+
+    Reads the on-disk thumbnail cache first; the cache file is named by the
+    source path, modification time and size, so a replaced file gets a new one.
+    """
+    def __init__(self, loader, path, edge):
+        super().__init__()
+        self.loader = loader
+        self.path = path
+        self.edge = edge
+
+    def run(self):
+        image = QImage()
+        signature = file_signature(self.path)
+        if signature is not None:
+            key = hashlib.sha256(f"{self.path}|{signature[0]}|{signature[1]}|{self.edge}".encode()).hexdigest()[:24]
+            cache_file = os.path.join(THUMBNAIL_CACHE_DIR, f"{key}.png")
+            image = QImage(cache_file) if os.path.exists(cache_file) else QImage()
+            if image.isNull():
+                image = self.decode()
+                if not image.isNull():
+                    os.makedirs(THUMBNAIL_CACHE_DIR, exist_ok=True)
+                    tmp = f"{cache_file}.{threading.get_ident()}.tmp"
+                    if image.save(tmp, "PNG"):
+                        os.replace(tmp, cache_file)
+        self.loader.decoded.emit(self.path, self.edge, image)
+
+    def decode(self):
+        reader = QImageReader(self.path)
+        reader.setAutoTransform(True)
+        size = reader.size()
+        # Let the codec scale while decoding (JPEG decodes at 1/2, 1/4, 1/8 directly)
+        if size.isValid() and max(size.width(), size.height()) > self.edge:
+            reader.setScaledSize(size.scaled(self.edge, self.edge, Qt.KeepAspectRatio))
+        image = reader.read()
+        if not image.isNull() and max(image.width(), image.height()) > self.edge:
+            image = image.scaled(self.edge, self.edge, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        return image
+
+def pixmap_bytes(pixmap):
+    return pixmap.width() * pixmap.height() * 4
+
+class ThumbnailLoader(QObject):
+    """Downscaled image pixmaps, decoded on a thread pool and kept in a size-bounded LRU.
+
+    pixmap() never blocks: it returns the cached pixmap or None, queueing the
+    decode. `ready` is emitted once it is available, or once the decode has
+    failed (the key is then in `failed`). The newest requests are
+    decoded first, so the rows in view fill in before ones scrolled past.
+    Product image files are content-addressed; call invalidate() for files
+    that are replaced in place (the logo).
+    """
+    decoded = pyqtSignal(str, int, QImage)  # from pool threads
+    ready = pyqtSignal(str, int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(THUMBNAIL_THREADS)
+        self.pixmaps = OrderedDict()  # (path, edge) -> QPixmap
+        self.bytes = 0
+        self.pending = set()
+        self.failed = set()
+        self.requests = 0
+        self.decoded.connect(self.on_decoded)
+
+    def pixmap(self, path, edge):
+        key = (path, edge)
+        pixmap = self.pixmaps.get(key)
+        if pixmap is not None:
+            self.pixmaps.move_to_end(key)
+            return pixmap
+        if key not in self.pending and key not in self.failed:
+            self.pending.add(key)
+            self.requests += 1
+            self.pool.start(ThumbnailTask(self, path, edge), self.requests)
+        return None
+
+    def on_decoded(self, path, edge, image):
+        key = (path, edge)
+        self.pending.discard(key)
+        if image.isNull():
+            self.failed.add(key)
+            self.ready.emit(path, edge)  # so views stop showing a placeholder
+            return
+        pixmap = QPixmap.fromImage(image)
+        self.pixmaps[key] = pixmap
+        self.bytes += pixmap_bytes(pixmap)
+        while self.bytes > THUMBNAIL_MEMORY_BYTES and len(self.pixmaps) > 1:
+            _, old = self.pixmaps.popitem(last=False)
+            self.bytes -= pixmap_bytes(old)
+        self.ready.emit(path, edge)
+
+    def invalidate(self, path):
+        for key in [k for k in self.pixmaps if k[0] == path]:
+            self.bytes -= pixmap_bytes(self.pixmaps.pop(key))
+        self.failed = {k for k in self.failed if k[0] != path}
+
+    def shutdown(self):
+        """Drop queued decodes and wait for running ones (before the window goes away)"""
+        self.pool.clear()
+        self.pool.waitForDone()
+
+# --- Git Publish Queue ---
+class PublishWorker(QThread):
+    """Runs one git_publish call off the GUI thread"""
+    done = pyqtSignal(bool, str)
+
+    def __init__(self, paths, message, parent=None):
+        super().__init__(parent)
+        self.paths = paths
+        self.message = message
+
+    def run(self):
+        try:
+            ok, status = git_publish(self.paths, self.message)
+        except Exception as e:
+            ok, status = False, str(e)
+        self.done.emit(ok, status)
+
+class GitPublisher(QObject):
+    """Coalesces publish requests into one background commit + push.
+
+    Each request restarts a debounce timer; when it fires, every path and label
+    queued so far goes out in a single commit. Requests made while a push is
+    running are held and published right after it finishes.
+    """
+    status = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pending_paths = set()
+        self.pending_labels = []
+        self.retry_paths = set()
+        self.worker = None
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.flush)
+
+    def request(self, paths, label):
+        self.pending_paths.update(paths)
+        self.pending_paths.update(self.retry_paths)
+        self.retry_paths.clear()
+        if label not in self.pending_labels:
+            self.pending_labels.append(label)
+        self.timer.start(PUBLISH_DEBOUNCE_MS)
+        self.status.emit(f"Publish queued: {', '.join(self.pending_labels)}")
+
+    def is_busy(self):
+        return self.worker is not None or bool(self.pending_paths)
+
+    def flush(self):
+        if self.worker is not None or not self.pending_paths:
+            return
+        self.worker = PublishWorker(set(self.pending_paths), self.commit_message(), self)
+        self.worker.done.connect(self.on_done)
+        self.pending_paths.clear()
+        self.pending_labels = []
+        self.status.emit("Publishing to GitHub...")
+        self.worker.start()
+
+    def on_done(self, ok, status):
+        if not ok:
+            # Keep failed paths so the next publish retries them
+            self.retry_paths.update(self.worker.paths)
+        self.worker.wait()
+        self.worker.deleteLater()
+        self.worker = None
+        self.status.emit(("✅ " if ok else "❌ ") + status)
+        if self.pending_paths and not self.timer.isActive():
+            self.flush()
+
+    def wait_for_idle(self):
+        """Publish anything still queued and block until done (used on exit)"""
+        self.timer.stop()
+        if self.worker is not None:
+            self.worker.wait()
+        if self.pending_paths:
+            git_publish(self.pending_paths, self.commit_message())
+            self.pending_paths.clear()
+            self.pending_labels = []
+
+    def commit_message(self):
+        return f"Update {', '.join(self.pending_labels)} from BiteBabe Admin"
+
+# --- Product Table Model ---
+SORT_ROLE = Qt.UserRole + 1
+
+class ProductTableModel(QAbstractTableModel):
+    """Table view over Catalog.products; rows are only materialised when painted.
+
+    Edits are reported per row (product_changed / product_added /
+    product_removed) instead of rebuilding the table. With a ThumbnailLoader
+    the first column shows image thumbnails, a placeholder until decoded.
+    """
+    COLUMNS = [("", "image"), ("Name", "name"), ("Category", "category"), ("Price", "price"), ("Stock", "stock")]
+
+    def __init__(self, catalog, parent=None, thumbnails=None):
+        super().__init__(parent)
+        self.catalog = catalog
+        self.ids = list(catalog.products)
+        self.rows = {p_id: row for row, p_id in enumerate(self.ids)}
+        self.thumbnails = thumbnails
+        self.waiting = {}  # image path -> ids of products showing a placeholder for it
+        if thumbnails is not None:
+            self.placeholder = QPixmap(THUMBNAIL_SIZE, THUMBNAIL_SIZE)
+            self.placeholder.fill(QColor("#FFE8F1"))
+            thumbnails.ready.connect(self.thumbnail_ready)
+
+    def reset_catalog(self, catalog):
+        self.beginResetModel()
+        self.catalog = catalog
+        self.ids = list(catalog.products)
+        self.rows = {p_id: row for row, p_id in enumerate(self.ids)}
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.ids)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.COLUMNS[section][0]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        product = self.catalog.get_product(self.ids[index.row()])
+        if product is None:
+            return None
+        if role == Qt.UserRole:
+            return product.id
+        attr = self.COLUMNS[index.column()][1]
+        if attr == "image":
+            return self.thumbnail(product) if role == Qt.DecorationRole else None
+        value = getattr(product, attr)
+        if role == Qt.DisplayRole:
+            return str(value)
+        if role == SORT_ROLE:
+            return value if isinstance(value, (int, float)) else str(value).lower()
+        return None
+
+    def thumbnail(self, product):
+        if self.thumbnails is None:
+            return None
+        path = preview_source(product.variants, product.image, THUMBNAIL_SIZE)
+        if path is None:
+            return None
+        pixmap = self.thumbnails.pixmap(path, THUMBNAIL_SIZE)
+        if pixmap is None:
+            if (path, THUMBNAIL_SIZE) in self.thumbnails.failed:
+                return None
+            self.waiting.setdefault(path, set()).add(product.id)
+            return self.placeholder
+        return pixmap
+
+    def thumbnail_ready(self, path, edge):
+        if edge != THUMBNAIL_SIZE:
+            return
+        for p_id in self.waiting.pop(path, ()):
+            row = self.row_of(p_id)
+            if row >= 0:
+                self.dataChanged.emit(self.index(row, 0), self.index(row, 0), [Qt.DecorationRole])
+
+    def row_of(self, p_id):
+        return self.rows.get(p_id, -1)
+
+    def product_changed(self, p_id):
+        row = self.row_of(p_id)
+        if row >= 0:
+            self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.COLUMNS) - 1))
+
+    def product_added(self, p_id):
+        row = len(self.ids)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.ids.append(p_id)
+        self.rows[p_id] = row
+        self.endInsertRows()
+
+    def product_removed(self, p_id):
+        row = self.row_of(p_id)
+        if row < 0:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.ids[row]
+        del self.rows[p_id]
+        for i in range(row, len(self.ids)):
+            self.rows[self.ids[i]] = i
+        self.endRemoveRows()
+
+class ProductFilterProxyModel(QSortFilterProxyModel):
+    """Sorts on raw values and filters by search text (name or category) and stock level"""
+    STOCK_FILTERS = ["All stock", "In stock", "Low stock", "Out of stock"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.search = ""
+        self.stock_filter = "All stock"
+        self.setSortRole(SORT_ROLE)
+        self.setDynamicSortFilter(True)
+
+    def set_search(self, text):
+        self.search = text.strip().lower()
+        self.invalidateFilter()
+
+    def set_stock_filter(self, name):
+        self.stock_filter = name
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        model = self.sourceModel()
+        product = model.catalog.get_product(model.ids[source_row])
+        if product is None:
+            return False
+        if self.search and self.search not in product.name.lower() and self.search not in product.category.lower():
+            return False
+        if self.stock_filter == "In stock":
+            return product.stock > 0
+        if self.stock_filter == "Low stock":
+            return 0 < product.stock <= LOW_STOCK
+        if self.stock_filter == "Out of stock":
+            return product.stock <= 0
+        return True
+
+# --- Topping List Model ---
+class ToppingListModel(QAbstractListModel):
+    """List over Catalog.toppings shared by the Toppings tab and the product form"""
+    def __init__(self, catalog, parent=None):
+        super().__init__(parent)
+        self.reset_catalog(catalog)
+
+    def reset_catalog(self, catalog):
+        self.beginResetModel()
+        self.catalog = catalog
+        self.ids = list(catalog.toppings)
+        self.rows = {t_id: row for row, t_id in enumerate(self.ids)}
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.ids)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        topping = self.catalog.get_topping(self.ids[index.row()])
+        if topping is None:
+            return None
+        if role == Qt.DisplayRole:
+            return f"{topping.name} - {topping.price}"
+        if role == Qt.UserRole:
+            return topping.id
+        return None
+
+    def topping_changed(self, t_id):
+        row = self.rows.get(t_id, -1)
+        if row >= 0:
+            self.dataChanged.emit(self.index(row), self.index(row))
+
+    def topping_added(self, t_id):
+        row = len(self.ids)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.ids.append(t_id)
+        self.rows[t_id] = row
+        self.endInsertRows()
+
+    def topping_removed(self, t_id):
+        row = self.rows.get(t_id, -1)
+        if row < 0:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.ids[row]
+        del self.rows[t_id]
+        for i in range(row, len(self.ids)):
+            self.rows[self.ids[i]] = i
+        self.endRemoveRows()
+
+class ToppingCheckProxyModel(QSortFilterProxyModel):
+    """Searchable, checkable view of ToppingListModel for picking a product's toppings"""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.checked = set()
+        self.setFilterCaseSensitivity(Qt.CaseInsensitive)
+
+    def flags(self, index):
+        return super().flags(index) | Qt.ItemIsUserCheckable
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.CheckStateRole:
+            return Qt.Checked if super().data(index, Qt.UserRole) in self.checked else Qt.Unchecked
+        return super().data(index, role)
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.CheckStateRole:
+            return super().setData(index, value, role)
+        t_id = super().data(index, Qt.UserRole)
+        if value == Qt.Checked:
+            self.checked.add(t_id)
+        else:
+            self.checked.discard(t_id)
+        self.dataChanged.emit(index, index, [Qt.CheckStateRole])
+        return True
+
+    def set_checked(self, t_ids):
+        """Replace the checked set, repainting only rows whose state changed"""
+        t_ids = set(t_ids)
+        changed = self.checked ^ t_ids
+        self.checked = t_ids
+        source = self.sourceModel()
+        for t_id in changed:
+            row = source.rows.get(t_id, -1)
+            if row >= 0:
+                index = self.mapFromSource(source.index(row))
+                if index.isValid():
+                    self.dataChanged.emit(index, index, [Qt.CheckStateRole])
+
+    def checked_ids(self):
+        """Checked toppings in catalog order"""
+        return [t_id for t_id in self.sourceModel().ids if t_id in self.checked]
+
+# --- Product Import ---
+class ProductImportWorker(QThread):
+    """Streams and validates an import file off the GUI thread.
+
+    Valid rows are handed over in batches; the worker waits while
+    IMPORT_QUEUED_BATCHES are still unapplied, so memory stays flat even when
+    the GUI falls behind.
+    """
+    batch_ready = pyqtSignal(list)
+    progress = pyqtSignal(int)
+    failed = pyqtSignal(str)
+
+    def __init__(self, importer, path, parent=None):
+        super().__init__(parent)
+        self.importer = importer
+        self.path = path
+        self.slots = QSemaphore(IMPORT_QUEUED_BATCHES)
+
+    def run(self):
+        try:
+            f, fmt = open_import(self.path)
+            with f:
+                for batch in validated_batches(self.importer, f, fmt, cancelled=self.isInterruptionRequested):
+                    while not self.slots.tryAcquire(1, 100):
+                        if self.isInterruptionRequested():
+                            return
+                    self.batch_ready.emit(batch)
+                    self.progress.emit(f.buffer.tell())
+        except (OSError, ValueError, csv.Error) as e:
+            self.failed.emit(str(e))
+
+    def batch_applied(self):
+        self.slots.release()
+
+# --- Bulk Edit ---
+class BulkEditDialog(QDialog):
+    """Pick the products (selection, current filter or a category) and one operation"""
+    # BULK_OPERATIONS key -> page of the value stack
+    VALUE_PAGES = {"set_price": 0, "scale_price": 1, "set_stock": 2, "add_topping": 3, "remove_topping": 3, "set_category": 4}
+
+    def __init__(self, catalog, selected_ids, shown_ids, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Bulk Edit Products")
+        form = QFormLayout(self)
+
+        self.scope = QComboBox()
+        if selected_ids:
+            self.scope.addItem(f"Selected products ({len(selected_ids)})", selected_ids)
+        self.scope.addItem(f"Products shown ({len(shown_ids)})", shown_ids)
+        for category in sorted(catalog.categories()):
+            ids = [p.id for p in catalog.products_in_category(category)]
+            self.scope.addItem(f"Category: {category or '(none)'} ({len(ids)})", ids)
+
+        self.operation = QComboBox()
+        for op, label in BULK_OPERATIONS.items():
+            self.operation.addItem(label, op)
+
+        self.price = QDoubleSpinBox()
+        self.price.setRange(0, PRICE_MAX)
+        self.price.setSingleStep(1000)
+        self.percent = QDoubleSpinBox()
+        self.percent.setRange(-90, 500)
+        self.percent.setSuffix(" %")
+        self.stock = QSpinBox()
+        self.stock.setRange(0, STOCK_MAX)
+        self.topping = QComboBox()
+        for topping in catalog.toppings.values():
+            self.topping.addItem(topping.name, topping.id)
+        self.category = QLineEdit()
+        self.values = QStackedWidget()
+        for widget in (self.price, self.percent, self.stock, self.topping, self.category):
+            self.values.addWidget(widget)
+        self.operation.currentIndexChanged.connect(
+            lambda: self.values.setCurrentIndex(self.VALUE_PAGES[self.operation.currentData()]))
+
+        self.push = QCheckBox("Publish when done (one commit)")
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+
+        form.addRow("Products:", self.scope)
+        form.addRow("Operation:", self.operation)
+        form.addRow("Value:", self.values)
+        form.addRow("", self.push)
+        form.addRow(buttons)
+
+    def edit(self):
+        """(product ids, operation, value, publish)"""
+        op = self.operation.currentData()
+        value = [self.price.value(), self.percent.value(), self.stock.value(),
+                 self.topping.currentData(), self.category.text().strip()][self.VALUE_PAGES[op]]
+        return self.scope.currentData(), op, value, self.push.isChecked()
+
+class BulkEditCommand(QUndoCommand):
+    """One undo step for a bulk edit: (old, new) product pairs.
+
+    Undo only restores products still as the edit left them, so later edits
+    to some of them are not lost.
+    """
+    def __init__(self, editor, label, pairs):
+        super().__init__(label)
+        self.editor = editor
+        self.old = [old for old, new in pairs]
+        self.new = [new for old, new in pairs]
+
+    def redo(self):
+        self.editor.apply_bulk_records(self.new, {r.id: r for r in self.old})
+
+    def undo(self):
+        self.editor.apply_bulk_records(self.old, {r.id: r for r in self.new})
+
+# --- Hot Reload ---
+class DataReloadWorker(QThread):
+    """Re-reads data files changed on disk and diffs them by id against snapshots
+    of the catalog, off the GUI thread.
+
+    `done` carries {path: (signature, payload)} where payload is
+    (added, changed, removed) for products/toppings, a pair of those for the
+    catalog database, or the new store config.
+    """
+    done = pyqtSignal(dict)
+    failed = pyqtSignal(str)
+
+    def __init__(self, paths, products, toppings, parent=None):
+        super().__init__(parent)
+        self.paths = paths
+        self.products = products
+        self.toppings = toppings
+
+    def run(self):
+        results = {}
+        try:
+            with span("reload.diff", files=len(self.paths)):
+                for path in self.paths:
+                    signature = file_signature(path)
+                    if path == PRODUCTS_FILE:
+                        records = [Product.from_dict(p) for p in read_json(path, [])]
+                        results[path] = (signature, diff_records(self.products, records))
+                    elif path == TOPPINGS_FILE:
+                        records = [Topping.from_dict(t) for t in read_json(path, [])]
+                        results[path] = (signature, diff_records(self.toppings, records))
+                    elif path == CATALOG_DB:
+                        db = CatalogDB(path)  # connections are per thread
+                        try:
+                            results[path] = (signature, (diff_records(self.products, list(db.products())),
+                                                         diff_records(self.toppings, list(db.toppings()))))
+                        finally:
+                            db.close()
+                    else:
+                        results[path] = (signature, read_json(path, {}))
+        except (DataFileError, OSError, TypeError, AttributeError, sqlite3.Error) as e:
+            # Half-written file or merge conflict markers; the next change retries
+            self.failed.emit(str(e))
+            return
+        self.done.emit(results)
 
 class BiteBabeAdmin(QMainWindow):
-    def __init__(self):
+    # (span name, ms) of each finished top-level traced operation, from any thread
+    span_finished = pyqtSignal(str, float)
+
+    def __init__(self, startup=None):
         super().__init__()
+        self.startup = startup or PhaseTimer()
+        self.startup_reported = False
         self.setWindowTitle("BiteBabe Editor PRO")
         self.setGeometry(100, 100, 1000, 700)
         self.setStyleSheet("""
@@ -43,30 +669,358 @@ class BiteBabeAdmin(QMainWindow):
             QPushButton:hover { background-color: #ff3385; }
             QLineEdit, QTextEdit, QSpinBox, QDoubleSpinBox { padding: 8px; border: 1px solid #FFD6E8; border-radius: 5px; }
             QLabel { color: #3B3B3B; font-weight: 500; }
-            QTableWidget { border: 1px solid #FFD6E8; gridline-color: #FFD6E8; }
+            QTableView { border: 1px solid #FFD6E8; gridline-color: #FFD6E8; }
             QHeaderView::section { background-color: #FFD6E8; padding: 5px; border: none; font-weight: bold; color: #3B3B3B; }
         """)
+        self.startup.mark("stylesheet")
+
+        # Files written by this session; only these are staged on publish
+        self.touched_paths = set()
+        # Old image files to delete once products.json no longer refers to them
+        self.pending_releases = []
+        self.settings = QSettings("BiteBabe", "Editor")
+        self.store = DataStore()
+        self.db = None  # CatalogDB with BITEBABE_BACKEND=sqlite
+        # Records edited here but not yet flushed; a reload never overwrites them
+        self.unsaved_products = set()
+        self.unsaved_toppings = set()
+        self.build_cache = BuildCache()
+        self.save_timer = QTimer(self)
+        self.save_timer.setSingleShot(True)
+        self.save_timer.timeout.connect(self.flush_data)
+        self.publisher = GitPublisher(self)
+        self.publisher.status.connect(self.statusBar().showMessage)
+        self.undo_stack = QUndoStack(self)
+        undo_action = self.undo_stack.createUndoAction(self, "Undo")
+        undo_action.setShortcut(QKeySequence.Undo)  # text fields keep their own Ctrl+Z while focused
+        redo_action = self.undo_stack.createRedoAction(self, "Redo")
+        redo_action.setShortcut(QKeySequence.Redo)
+        self.addActions([undo_action, redo_action])
+        self.thumbnails = ThumbnailLoader(self)
+        self.thumbnails.ready.connect(self.thumbnail_ready)
+        self.init_tracing()
 
         self.load_data()
+        self.startup.mark("load data")
         self.init_ui()
+        self.init_reload()
+        self.startup.mark("build ui")
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.startup_reported:
+            self.startup_reported = True
+            self.startup.mark("first paint")
+            self.report_startup()
+
+    def report_startup(self):
+        total = self.startup.total_ms()
+        self.statusBar().showMessage(f"Ready in {total:.0f} ms", 5000)
+        if total > STARTUP_BUDGET_MS or os.environ.get("BITEBABE_STARTUP_REPORT"):
+            print(self.startup.report("Editor startup", STARTUP_BUDGET_MS), file=sys.stderr)
+
+    # --- Tracing ---
+    def init_tracing(self):
+        """Ctrl+Shift+T toggles tracing (or start with BITEBABE_TRACE=1), Ctrl+Shift+E saves
+        a Chrome trace. With BITEBABE_TRACE=<file>.json the trace is also saved on exit."""
+        self.trace_label = QLabel()
+        self.statusBar().addPermanentWidget(self.trace_label)
+        self.trace_label.setVisible(tracer.enabled)
+        self.span_finished.connect(self.show_span)
+        tracer.on_finish = self.span_finished.emit
+        QShortcut(QKeySequence("Ctrl+Shift+T"), self, self.toggle_tracing)
+        QShortcut(QKeySequence("Ctrl+Shift+E"), self, self.save_trace)
+
+    def show_span(self, name, ms):
+        self.trace_label.setText(f"⏱ {name}: {ms:.0f} ms")
+
+    def toggle_tracing(self):
+        tracer.enabled = not tracer.enabled
+        self.trace_label.setVisible(tracer.enabled)
+        self.trace_label.setText("⏱ tracing")
+        self.statusBar().showMessage("Tracing on (Ctrl+Shift+E saves a trace)" if tracer.enabled else "Tracing off", 5000)
+
+    def save_trace(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Save Trace", "bitebabe-trace.json", "Chrome trace (*.json)")
+        if not path: return
+        try:
+            count = tracer.save(path)
+        except OSError as e:
+            QMessageBox.critical(self, "Trace", f"Could not save the trace: {e}")
+            return
+        self.statusBar().showMessage(f"{count} span(s) saved to {path}; open in chrome://tracing or ui.perfetto.dev", 8000)
 
     def load_data(self):
-        self.products = self.load_json(PRODUCTS_FILE, [])
-        self.toppings = self.load_json(TOPPINGS_FILE, [])
+        if CATALOG_BACKEND == "sqlite":
+            try:
+                self.db = open_catalog_db()
+                self.catalog = self.db.load()
+                self.db_version = self.db.data_version()
+            except (sqlite3.Error, DataFileError) as e:
+                QMessageBox.critical(self, "Catalog Database", f"Could not open {CATALOG_DB}: {e}")
+                raise SystemExit(1)
+        else:
+            self.catalog = Catalog.from_json(self.load_json(PRODUCTS_FILE, []), self.load_json(TOPPINGS_FILE, []))
         self.store_config = self.load_json(STORE_FILE, {})
 
     def load_json(self, filepath, default):
-        if os.path.exists(filepath):
+        while True:
             try:
-                with open(filepath, 'r') as f:
-                    return json.load(f)
-            except:
-                return default
-        return default
+                return self.store.load(filepath, default)
+            except DataFileError as e:
+                if e.backup and QMessageBox.question(
+                        self, "Corrupt Data File",
+                        f"{e}\n\nRestore the last good version from backup?",
+                        QMessageBox.Yes | QMessageBox.No) == QMessageBox.Yes:
+                    self.store.restore_backup(filepath)
+                    continue
+                # Refuse to start rather than show (and later save) an empty catalog
+                QMessageBox.critical(self, "Corrupt Data File", f"{e}\n\nFix or restore {filepath} and restart the editor.")
+                raise SystemExit(1)
 
     def save_json(self, filepath, data):
-        with open(filepath, 'w') as f:
-            json.dump(data, f, indent=2)
+        """Mark a data file dirty; it is written shortly after by flush_data"""
+        self.store.set(filepath, data)
+        self.touched_paths.add(filepath)
+        self.save_timer.start(SAVE_DEBOUNCE_MS)
+
+    # --- Hot Reload ---
+    def init_reload(self):
+        """Watch the data files for changes made outside the editor.
+
+        With the SQLite backend products.json/toppings.json are exports; the
+        database is watched instead, as the stock service writes sales into it.
+        """
+        self.reload_paths = [STORE_FILE, CATALOG_DB] if self.db is not None else [PRODUCTS_FILE, TOPPINGS_FILE, STORE_FILE]
+        # Commits land in the -wal file until a checkpoint
+        self.watch_paths = self.reload_paths + ([CATALOG_DB + "-wal"] if self.db is not None else [])
+        self.reload_pending = set()
+        self.reload_worker = None
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.fileChanged.connect(self.data_file_changed)
+        # Atomic replaces (ours and git's) swap the inode; watching the folder catches those too
+        self.watcher.directoryChanged.connect(lambda _: self.data_file_changed(None))
+        self.watcher.addPath(DATA_DIR)
+        self.watcher.addPaths([p for p in self.watch_paths if os.path.exists(p)])
+        self.reload_timer = QTimer(self)
+        self.reload_timer.setSingleShot(True)
+        self.reload_timer.timeout.connect(self.start_reload)
+
+    def data_file_changed(self, path):
+        if path == CATALOG_DB + "-wal":
+            path = CATALOG_DB
+        self.reload_pending.update([path] if path else self.reload_paths)
+        self.reload_timer.start(RELOAD_DEBOUNCE_MS)
+
+    def start_reload(self):
+        if self.reload_worker is not None:
+            self.reload_timer.start(RELOAD_DEBOUNCE_MS)  # one reload at a time
+            return
+        # Re-arm watches on files that were replaced
+        watched = set(self.watcher.files())
+        rearm = [p for p in self.watch_paths if p not in watched and os.path.exists(p)]
+        if rearm:
+            self.watcher.addPaths(rearm)
+
+        paths = [p for p in self.reload_pending if p in self.reload_paths and self.changed_on_disk(p)]
+        self.reload_pending = set()
+        if not paths:
+            return  # our own write
+        self.reload_worker = DataReloadWorker(paths, dict(self.catalog.products), dict(self.catalog.toppings), self)
+        self.reload_worker.done.connect(self.apply_reload)
+        self.reload_worker.failed.connect(lambda message: self.statusBar().showMessage(f"Data file changed on disk but could not be read: {message}", 8000))
+        self.reload_worker.finished.connect(self.reload_finished)
+        self.reload_worker.start()
+
+    def changed_on_disk(self, path):
+        """Whether `path` changed since we last read or wrote it. For the database
+        only commits by other connections count, not our own."""
+        if path != CATALOG_DB:
+            return self.store.changed_on_disk(path)
+        version = self.db.data_version()
+        if version == self.db_version:
+            return False
+        self.db_version = version
+        return True
+
+    def reload_now(self, paths):
+        """Merge external changes synchronously, e.g. right before overwriting the files"""
+        worker = DataReloadWorker(paths, dict(self.catalog.products), dict(self.catalog.toppings))
+        worker.done.connect(self.apply_reload)
+        worker.run()
+
+    def reload_finished(self):
+        self.reload_worker = None
+        if self.reload_pending:
+            self.reload_timer.start(RELOAD_DEBOUNCE_MS)
+
+    def apply_reload(self, results):
+        """Merge records changed on disk into the catalog, row by row. Records with
+        unsaved edits here are kept; the next save writes them over the file."""
+        with span("ui.apply_reload"):
+            notes = []
+            conflicts = []
+            if TOPPINGS_FILE in results:
+                signature, diff = results[TOPPINGS_FILE]
+                counts = self.apply_topping_diff(*diff, conflicts)
+                notes.append(f"toppings {counts}")
+                self.store.synced(TOPPINGS_FILE, signature)
+            if PRODUCTS_FILE in results:
+                signature, diff = results[PRODUCTS_FILE]
+                counts = self.apply_product_diff(*diff, conflicts)
+                notes.append(f"products {counts}")
+                self.store.synced(PRODUCTS_FILE, signature)
+            if CATALOG_DB in results:
+                _, (product_diff, topping_diff) = results[CATALOG_DB]
+                notes.append(f"toppings {self.apply_topping_diff(*topping_diff, conflicts)}")
+                notes.append(f"products {self.apply_product_diff(*product_diff, conflicts)}")
+                self.db.synced_stock(product_diff[0] + product_diff[1])
+            if STORE_FILE in results and not self.store.is_dirty(STORE_FILE):
+                signature, store_config = results[STORE_FILE]
+                self.apply_store_config(store_config)
+                notes.append("store settings")
+                self.store.synced(STORE_FILE, signature)
+        self.statusBar().showMessage("Reloaded from disk: " + ", ".join(notes), 8000)
+        for kind, record_id, reload_form in conflicts:
+            self.resolve_reload_conflict(kind, record_id, reload_form)
+
+    def apply_product_diff(self, added, changed, removed, conflicts):
+        open_id = self.p_id.text() if "products" in self.built_tabs else ""
+        applied = [0, 0, 0]
+        for product in added + changed:
+            if product.id in self.unsaved_products:
+                continue
+            old = self.catalog.get_product(product.id)
+            if self.catalog.put_product(product):
+                self.prod_model_added(product.id)
+                applied[0] += 1
+            else:
+                self.prod_model_changed(product.id)
+                applied[1] += 1
+            if product.id != open_id:
+                continue
+            if old is not None and dataclasses.replace(old, stock=product.stock) == product:
+                # Only stock moved (sales through the stock service): follow it unless edited here
+                if self.p_stock.value() == old.stock:
+                    self.p_stock.setValue(product.stock)
+            else:
+                conflicts.append(("product", product.id, self.load_open_product))
+        for p_id in removed:
+            if p_id in self.unsaved_products:
+                continue
+            self.catalog.remove_product(p_id)
+            if "products" in self.built_tabs:
+                self.prod_model.product_removed(p_id)
+            applied[2] += 1
+            if p_id == open_id:
+                conflicts.append(("product", p_id, self.clear_product_form))
+        return "{} added, {} changed, {} removed".format(*applied)
+
+    def prod_model_added(self, p_id):
+        if "products" in self.built_tabs:
+            self.prod_model.product_added(p_id)
+
+    def prod_model_changed(self, p_id):
+        if "products" in self.built_tabs:
+            self.prod_model.product_changed(p_id)
+
+    def apply_topping_diff(self, added, changed, removed, conflicts):
+        open_id = self.t_id.text() if "toppings" in self.built_tabs else ""
+        applied = [0, 0, 0]
+        for topping in added + changed:
+            if topping.id in self.unsaved_toppings:
+                continue
+            if self.catalog.put_topping(topping):
+                self.topping_model.topping_added(topping.id)
+                applied[0] += 1
+            else:
+                self.topping_model.topping_changed(topping.id)
+                applied[1] += 1
+            if topping.id == open_id:
+                conflicts.append(("topping", topping.id, self.load_open_topping))
+        for t_id in removed:
+            if t_id in self.unsaved_toppings:
+                continue
+            # products.json, if it changed too, is applied next and wins for product rows
+            self.catalog.remove_topping(t_id)
+            self.topping_model.topping_removed(t_id)
+            self.topping_checks.checked.discard(t_id)
+            applied[2] += 1
+            if t_id == open_id:
+                conflicts.append(("topping", t_id, self.clear_topping_form))
+        return "{} added, {} changed, {} removed".format(*applied)
+
+    def apply_store_config(self, store_config):
+        self.store_config = store_config
+        if "dashboard" in self.built_tabs:
+            self.store_name_edit.setText(store_config.get("name", ""))
+            self.store_slogan_edit.setText(store_config.get("slogan", ""))
+            self.store_wa_edit.setText(store_config.get("whatsapp", ""))
+            self.export_mode_combo.blockSignals(True)
+            self.export_mode_combo.setCurrentIndex(list(EXPORT_MODES).index(self.export_mode()))
+            self.export_mode_combo.blockSignals(False)
+
+    def resolve_reload_conflict(self, kind, record_id, reload_form):
+        """The record open in a form changed on disk: show the new version, or keep editing"""
+        answer = QMessageBox.question(
+            self, "Changed Outside the Editor",
+            f"The {kind} you are editing ({record_id}) was changed by another program or editor.\n\n"
+            f"Load the version on disk? Choose No to keep your form as it is; saving it will overwrite that change.",
+            QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes)
+        if answer == QMessageBox.Yes:
+            reload_form()
+
+    def load_open_product(self):
+        row = self.prod_model.row_of(self.p_id.text())
+        if row >= 0:
+            self.load_product_details(self.prod_model.index(row, 0))
+
+    def load_open_topping(self):
+        row = self.topping_model.rows.get(self.t_id.text(), -1)
+        if row >= 0:
+            self.load_topping_details(self.topping_model.index(row))
+
+    def save_catalog(self, product_ids=(), topping_ids=()):
+        """Persist products/toppings that changed or were deleted in self.catalog.
+
+        With the SQLite backend only those rows are written, right away in one
+        transaction, and the JSON files are exported on publish; otherwise the
+        affected JSON files are rewritten by the next flush.
+        """
+        if self.db is None:
+            self.unsaved_products.update(product_ids)
+            self.unsaved_toppings.update(topping_ids)
+            if topping_ids:
+                self.save_json(TOPPINGS_FILE, self.catalog.toppings_json)
+            if product_ids:
+                self.save_json(PRODUCTS_FILE, self.catalog.products_json)
+            return
+        try:
+            self.db.save(self.catalog, product_ids, topping_ids)
+        except sqlite3.Error as e:
+            QMessageBox.critical(self, "Save Error", f"Could not write {CATALOG_DB}: {e}")
+            return
+        self.save_timer.start(SAVE_DEBOUNCE_MS)  # still flushes store.json and image releases
+
+    def flush_data(self):
+        self.save_timer.stop()
+        # A file about to be rewritten changed on disk since we read it: merge first
+        stale = [p for p in self.reload_paths if self.store.is_dirty(p) and self.store.changed_on_disk(p)]
+        if stale:
+            self.reload_now(stale)
+        try:
+            with span("ui.flush_data"):
+                self.store.flush()
+                self.unsaved_products.clear()
+                self.unsaved_toppings.clear()
+                if self.pending_releases:
+                    if release_assets(self.catalog, self.pending_releases, self.store_config):
+                        self.touched_paths.add(PRODUCTS_DIR)
+                    self.pending_releases = []
+        except OSError as e:
+            QMessageBox.critical(self, "Save Error", f"Could not write data files: {e}")
+            return False
+        return True
 
     def init_ui(self):
         main_widget = QWidget()
@@ -78,16 +1032,37 @@ class BiteBabeAdmin(QMainWindow):
         header.setStyleSheet("font-size: 24px; font-weight: bold; color: #FF5C9E; margin-bottom: 10px;")
         layout.addWidget(header)
 
-        # Tabs
+        self.topping_model = ToppingListModel(self.catalog, self)
+        self.topping_checks = ToppingCheckProxyModel(self)
+        self.topping_checks.setSourceModel(self.topping_model)
+
+        # Tabs are built the first time they are shown; until then each page is
+        # an empty placeholder
         self.tabs = QTabWidget()
         layout.addWidget(self.tabs)
 
-        self.tabs.addTab(self.create_dashboard_tab(), "Dashboard & Branding")
-        self.tabs.addTab(self.create_products_tab(), "Products Manager")
-        self.tabs.addTab(self.create_toppings_tab(), "Toppings")
+        self.tab_builders = [
+            ("dashboard", "Dashboard & Branding", self.create_dashboard_tab),
+            ("products", "Products Manager", self.create_products_tab),
+            ("toppings", "Toppings", self.create_toppings_tab),
+        ]
+        self.built_tabs = set()
+        for key, title, builder in self.tab_builders:
+            page = QWidget()
+            QVBoxLayout(page).setContentsMargins(0, 0, 0, 0)
+            self.tabs.addTab(page, title)
+        self.tabs.currentChanged.connect(self.ensure_tab)
+        self.ensure_tab(self.tabs.currentIndex())
 
         # Footer removed - save buttons now in each form
 
+    def ensure_tab(self, index):
+        key, title, builder = self.tab_builders[index]
+        if key in self.built_tabs:
+            return
+        self.built_tabs.add(key)
+        self.tabs.widget(index).layout().addWidget(builder())
+
     # --- Dashboard Tab ---
     def create_dashboard_tab(self):
         tab = QWidget()
@@ -133,17 +1108,79 @@ class BiteBabeAdmin(QMainWindow):
         
         logo_layout.addWidget(self.logo_preview, alignment=Qt.AlignCenter)
         logo_layout.addWidget(upload_btn, alignment=Qt.AlignCenter)
+
+        gc_btn = QPushButton("🧹 Clean Unused Images")
+        gc_btn.clicked.connect(self.clean_unused_images)
+        logo_layout.addWidget(gc_btn, alignment=Qt.AlignCenter)
         logo_group.setLayout(logo_layout)
         layout.addWidget(logo_group)
+
+        # Publishing
+        publish_group = QGroupBox("Storefront Publishing")
+        publish_form = QFormLayout()
+        self.export_mode_combo = QComboBox()
+        for mode, label in EXPORT_MODES.items():
+            self.export_mode_combo.addItem(label, mode)
+        self.export_mode_combo.setCurrentIndex(list(EXPORT_MODES).index(self.export_mode()))
+        self.export_mode_combo.currentIndexChanged.connect(lambda: self.set_export_mode(self.export_mode_combo.currentData()))
+        publish_form.addRow("Export:", self.export_mode_combo)
+        publish_group.setLayout(publish_form)
+        layout.addWidget(publish_group)
         
         layout.addStretch()
         return tab
 
+    def export_mode(self):
+        # Older versions kept the mode in the editor's settings only
+        if "export_mode" not in self.store_config and self.settings.contains("publish/export_mode"):
+            return store_export_mode({"export_mode": self.settings.value("publish/export_mode")})
+        return store_export_mode(self.store_config)
+
+    def set_export_mode(self, mode):
+        """Saved in store.json, where `python -m editor publish` reads it too"""
+        if mode != self.store_config.get("export_mode"):
+            self.store_config["export_mode"] = mode
+            self.save_json(STORE_FILE, self.store_config)
+
     def update_logo_preview(self):
+        """Show the logo downscaled; it is decoded off the GUI thread the first time"""
         if os.path.exists(LOGO_TARGET):
-            pixmap = QPixmap(LOGO_TARGET)
-            self.logo_preview.setPixmap(pixmap.scaled(140, 140, Qt.KeepAspectRatio, Qt.SmoothTransformation))
-            self.logo_preview.setText("")
+            pixmap = self.thumbnails.pixmap(LOGO_TARGET, LOGO_PREVIEW_SIZE)
+            if pixmap is not None:
+                self.logo_preview.setPixmap(pixmap)
+
+    def update_product_preview(self):
+        path = preview_source(self.p_img_variants, self.p_img_path, PRODUCT_PREVIEW_SIZE)
+        pixmap = self.thumbnails.pixmap(path, PRODUCT_PREVIEW_SIZE) if path else None
+        if pixmap is not None:
+            self.p_img_preview.setPixmap(pixmap)
+        else:
+            self.p_img_preview.clear()
+            self.p_img_preview.setText("Loading..." if path and (path, PRODUCT_PREVIEW_SIZE) not in self.thumbnails.failed
+                                       else "No Image")
+
+    def thumbnail_ready(self, path, edge):
+        if path == LOGO_TARGET and edge == LOGO_PREVIEW_SIZE and hasattr(self, "logo_preview"):
+            self.update_logo_preview()
+        elif edge == PRODUCT_PREVIEW_SIZE and hasattr(self, "p_img_preview"):
+            if path == preview_source(self.p_img_variants, self.p_img_path, PRODUCT_PREVIEW_SIZE):
+                self.update_product_preview()
+
+    def clean_unused_images(self):
+        if not self.flush_data():
+            return
+        with span("ui.find_unused_images"):
+            garbage = collect_garbage(self.catalog, self.store_config, dry_run=True)
+        if not garbage:
+            QMessageBox.information(self, "Clean Up", "No unused product images.")
+            return
+
+        size_kb = sum(size for _, size in garbage) // 1024
+        confirm = QMessageBox.question(self, "Clean Up", f"Delete {len(garbage)} unused product image(s) ({size_kb} KB)?", QMessageBox.Yes | QMessageBox.No)
+        if confirm == QMessageBox.Yes:
+            collect_garbage(self.catalog, self.store_config)
+            self.touched_paths.add(PRODUCTS_DIR)
+            self.statusBar().showMessage(f"Removed {len(garbage)} unused image(s), {size_kb} KB freed")
 
     def save_store_config(self):
         self.store_config["name"] = self.store_name_edit.text()
@@ -161,26 +1198,12 @@ class BiteBabeAdmin(QMainWindow):
         if not path: return
 
         try:
-            img = Image.open(path).convert("RGBA")
-            
-            # Create square canvas
-            size = 512
-            canvas = Image.new("RGBA", (size, size), (255, 232, 241, 255)) # Soft pink bg
-            
-            # Resize and center
-            img.thumbnail((size*0.8, size*0.8), Image.Resampling.LANCZOS)
-            x = (size - img.width) // 2
-            y = (size - img.height) // 2
-            canvas.paste(img, (x, y), img)
-            
-            canvas.save(LOGO_TARGET, "PNG", optimize=True)
-            
-            # Favicon
-            fav = canvas.copy()
-            fav.thumbnail((64, 64), Image.Resampling.LANCZOS)
-            fav.save(FAVICON_TARGET, "PNG", optimize=True)
-            
-            self.update_logo_preview()
+            with span("ui.upload_logo"):
+                self.build_cache.reset_counts()
+                self.touched_paths.update(build_branding(path, cache=self.build_cache))
+                self.build_cache.save()
+                self.thumbnails.invalidate(LOGO_TARGET)
+                self.update_logo_preview()
             QMessageBox.information(self, "Success", "Logo updated and favicon generated!")
         except Exception as e:
             QMessageBox.critical(self, "Error", str(e))
@@ -192,12 +1215,37 @@ class BiteBabeAdmin(QMainWindow):
 
         # Left: List
         left_layout = QVBoxLayout()
-        self.prod_table = QTableWidget()
-        self.prod_table.setColumnCount(3)
-        self.prod_table.setHorizontalHeaderLabels(["Name", "Price", "Stock"])
-        self.prod_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
-        self.prod_table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.prod_table.itemClicked.connect(self.load_product_details)
+
+        filter_layout = QHBoxLayout()
+        self.prod_search = QLineEdit()
+        self.prod_search.setPlaceholderText("Search name or category...")
+        self.prod_stock_filter = QComboBox()
+        self.prod_stock_filter.addItems(ProductFilterProxyModel.STOCK_FILTERS)
+        filter_layout.addWidget(self.prod_search)
+        filter_layout.addWidget(self.prod_stock_filter)
+        left_layout.addLayout(filter_layout)
+
+        self.prod_model = ProductTableModel(self.catalog, self, self.thumbnails)
+        self.prod_proxy = ProductFilterProxyModel(self)
+        self.prod_proxy.setSourceModel(self.prod_model)
+        self.prod_search.textChanged.connect(self.prod_proxy.set_search)
+        self.prod_stock_filter.currentTextChanged.connect(self.prod_proxy.set_stock_filter)
+
+        self.prod_table = QTableView()
+        self.prod_table.setModel(self.prod_proxy)
+        self.prod_table.setSortingEnabled(True)
+        self.prod_table.sortByColumn(-1, Qt.AscendingOrder)  # keep catalog order until a header is clicked
+        self.prod_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Fixed)
+        self.prod_table.horizontalHeader().resizeSection(0, THUMBNAIL_SIZE + 8)
+        self.prod_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
+        self.prod_table.setIconSize(QSize(THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+        # Fixed row heights keep layout O(1) with tens of thousands of rows
+        self.prod_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.prod_table.verticalHeader().setDefaultSectionSize(THUMBNAIL_SIZE + 4)
+        self.prod_table.verticalHeader().hide()
+        self.prod_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.prod_table.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.prod_table.clicked.connect(self.load_product_details)
         left_layout.addWidget(self.prod_table)
         
         btn_layout = QHBoxLayout()
@@ -206,9 +1254,30 @@ class BiteBabeAdmin(QMainWindow):
         del_btn = QPushButton("Delete")
         del_btn.setStyleSheet("background-color: #ff4444;")
         del_btn.clicked.connect(self.delete_product)
+        bulk_btn = QPushButton("✏️ Bulk Edit")
+        bulk_btn.clicked.connect(self.bulk_edit_products)
+        undo_btn = QPushButton("↶ Undo")
+        undo_btn.setEnabled(self.undo_stack.canUndo())
+        undo_btn.clicked.connect(self.undo_stack.undo)
+        self.undo_stack.canUndoChanged.connect(undo_btn.setEnabled)
+        self.undo_stack.undoTextChanged.connect(lambda text: undo_btn.setToolTip(f"Undo {text}" if text else ""))
         btn_layout.addWidget(add_btn)
         btn_layout.addWidget(del_btn)
+        btn_layout.addWidget(bulk_btn)
+        btn_layout.addWidget(undo_btn)
         left_layout.addLayout(btn_layout)
+
+        import_layout = QHBoxLayout()
+        import_dir_btn = QPushButton("📁 Import Image Folder")
+        import_dir_btn.clicked.connect(self.bulk_import_folder)
+        import_csv_btn = QPushButton("📄 Import Image CSV")
+        import_csv_btn.clicked.connect(self.bulk_import_csv)
+        import_products_btn = QPushButton("📥 Import Products")
+        import_products_btn.clicked.connect(self.import_products)
+        import_layout.addWidget(import_dir_btn)
+        import_layout.addWidget(import_csv_btn)
+        import_layout.addWidget(import_products_btn)
+        left_layout.addLayout(import_layout)
         
         layout.addLayout(left_layout, stretch=1)
 
@@ -223,32 +1292,41 @@ class BiteBabeAdmin(QMainWindow):
         
         self.p_name = QLineEdit()
         self.p_price = QDoubleSpinBox()
-        self.p_price.setRange(0, 1000000)
+        self.p_price.setRange(0, PRICE_MAX)
         self.p_price.setSingleStep(1000)
         
         self.p_desc = QTextEdit()
         self.p_desc.setMaximumHeight(80)
         
         self.p_stock = QSpinBox()
-        self.p_stock.setRange(0, 1000)
+        self.p_stock.setRange(0, STOCK_MAX)
         
         self.p_max = QSpinBox()
-        self.p_max.setRange(1, 100)
+        self.p_max.setRange(*MAX_ORDER_RANGE)
         
         self.p_cat = QLineEdit()
         
         self.p_img_btn = QPushButton("Choose Image")
         self.p_img_btn.clicked.connect(self.upload_product_image)
         self.p_img_label = QLabel("No Image")
+        self.p_img_preview = QLabel("No Image")
+        self.p_img_preview.setAlignment(Qt.AlignCenter)
+        self.p_img_preview.setFixedSize(PRODUCT_PREVIEW_SIZE + 10, PRODUCT_PREVIEW_SIZE + 10)
+        self.p_img_preview.setStyleSheet("border: 2px dashed #FFD6E8; border-radius: 10px;")
         self.p_img_path = ""
+        self.p_img_variants = {}
 
-        # Toppings Checkboxes
-        self.topping_checks = []
+        # Toppings: searchable checkable list
         toppings_group = QGroupBox("Available Toppings")
         toppings_layout = QVBoxLayout()
-        self.toppings_container = QWidget()
-        self.toppings_vbox = QVBoxLayout(self.toppings_container)
-        toppings_layout.addWidget(self.toppings_container)
+        self.topping_search = QLineEdit()
+        self.topping_search.setPlaceholderText("Search toppings...")
+        self.topping_search.textChanged.connect(self.topping_checks.setFilterFixedString)
+        self.topping_check_view = QListView()
+        self.topping_check_view.setModel(self.topping_checks)
+        self.topping_check_view.setUniformItemSizes(True)
+        toppings_layout.addWidget(self.topping_search)
+        toppings_layout.addWidget(self.topping_check_view)
         toppings_group.setLayout(toppings_layout)
 
         form.addRow("ID:", self.p_id)
@@ -260,6 +1338,7 @@ class BiteBabeAdmin(QMainWindow):
         form.addRow("Description:", self.p_desc)
         form.addRow("Image:", self.p_img_btn)
         form.addRow("", self.p_img_label)
+        form.addRow("", self.p_img_preview)
         
         right_layout.addLayout(form)
         right_layout.addWidget(toppings_group)
@@ -276,53 +1355,32 @@ class BiteBabeAdmin(QMainWindow):
         right_layout.addStretch()
 
         layout.addWidget(right_widget, stretch=1)
-        
-        self.refresh_product_table()
-        self.refresh_topping_checks()
         return tab
 
     def refresh_product_table(self):
-        self.prod_table.setRowCount(0)
-        for p in self.products:
-            row = self.prod_table.rowCount()
-            self.prod_table.insertRow(row)
-            self.prod_table.setItem(row, 0, QTableWidgetItem(p['name']))
-            self.prod_table.setItem(row, 1, QTableWidgetItem(str(p['price'])))
-            self.prod_table.setItem(row, 2, QTableWidgetItem(str(p['stock'])))
-            self.prod_table.item(row, 0).setData(Qt.UserRole, p['id'])
-
-    def refresh_topping_checks(self):
-        # Clear existing
-        for i in reversed(range(self.toppings_vbox.count())): 
-            self.toppings_vbox.itemAt(i).widget().setParent(None)
-        
-        self.topping_checks = []
-        for t in self.toppings:
-            cb = QCheckBox(f"{t['name']} (+{t['price']})")
-            cb.setProperty("t_id", t['id'])
-            self.toppings_vbox.addWidget(cb)
-            self.topping_checks.append(cb)
-
-    def load_product_details(self, item):
-        row = item.row()
-        p_id = self.prod_table.item(row, 0).data(Qt.UserRole)
-        product = next((p for p in self.products if p['id'] == p_id), None)
+        """Full reload; normal edits update single rows through prod_model"""
+        with span("ui.refresh_product_table"):
+            self.prod_model.reset_catalog(self.catalog)
+
+    def load_product_details(self, index):
+        p_id = index.data(Qt.UserRole)
+        product = self.catalog.get_product(p_id)
         
         if product:
-            self.p_id.setText(product['id'])
-            self.p_name.setText(product['name'])
-            self.p_price.setValue(product['price'])
-            self.p_desc.setText(product.get('description', ''))
-            self.p_stock.setValue(product.get('stock', 0))
-            self.p_max.setValue(product.get('max_order', 5))
-            self.p_cat.setText(product.get('category', ''))
-            self.p_img_path = product.get('image', '')
+            self.p_id.setText(product.id)
+            self.p_name.setText(product.name)
+            self.p_price.setValue(product.price)
+            self.p_desc.setText(product.description)
+            self.p_stock.setValue(product.stock)
+            self.p_max.setValue(product.max_order)
+            self.p_cat.setText(product.category)
+            self.p_img_path = product.image
+            self.p_img_variants = product.variants
             self.p_img_label.setText(os.path.basename(self.p_img_path) if self.p_img_path else "No Image")
+            self.update_product_preview()
             
-            # Set toppings
-            p_toppings = product.get('toppings', [])
-            for cb in self.topping_checks:
-                cb.setChecked(cb.property("t_id") in p_toppings)
+            with span("ui.load_product_toppings", count=len(product.toppings)):
+                self.topping_checks.set_checked(product.toppings)
 
     def clear_product_form(self):
         self.p_id.clear()
@@ -333,57 +1391,194 @@ class BiteBabeAdmin(QMainWindow):
         self.p_max.setValue(5)
         self.p_cat.clear()
         self.p_img_path = ""
+        self.p_img_variants = {}
         self.p_img_label.setText("No Image")
-        for cb in self.topping_checks:
-            cb.setChecked(False)
+        self.update_product_preview()
+        self.topping_checks.set_checked(())
         self.prod_table.clearSelection()
 
     def upload_product_image(self):
         path, _ = QFileDialog.getOpenFileName(self, "Select Image", "", "Images (*.png *.jpg *.jpeg)")
+        if not path: return
+
+        try:
+            with span("ui.upload_product_image"):
+                variants = build_image_variants(path, cache=self.build_cache)
+                self.build_cache.save()
+        except Exception as e:
+            QMessageBox.critical(self, "Error", str(e))
+            return
+
+        self.touched_paths.add(PRODUCTS_DIR)
+        # Keep "image" pointing at a plain card-sized file for older storefront code
+        self.p_img_variants = variants
+        self.p_img_path = variants["card"]["fallback"]
+        self.p_img_label.setText(os.path.basename(self.p_img_path))
+        self.update_product_preview()
+
+    # --- Bulk Image Import ---
+    def bulk_import_folder(self):
+        directory = QFileDialog.getExistingDirectory(self, "Select Image Folder")
+        if directory:
+            self.start_bulk_image_import(directory=directory)
+
+    def bulk_import_csv(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Select Image Mapping", "", "CSV (*.csv)")
         if path:
-            filename = f"prod_{int(QApplication.instance().applicationPid())}_{os.path.basename(path)}"
-            target = os.path.join(PRODUCTS_DIR, filename)
-            
-            # Resize and save
-            img = Image.open(path)
-            img.thumbnail((500, 500))
-            img.save(target)
-            
-            self.p_img_path = f"assets/products/{filename}"
-            self.p_img_label.setText(filename)
+            self.start_bulk_image_import(mapping_csv=path)
+
+    def start_bulk_image_import(self, directory=None, mapping_csv=None):
+        """Resize/encode matched images in a process pool, polling results from the GUI thread"""
+        try:
+            matches, unmatched = match_import_images(self.catalog.products.values(), directory, mapping_csv)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", str(e))
+            return
+
+        if not matches:
+            QMessageBox.warning(self, "Import", "No images matched any product by name or id.")
+            return
+
+        self.build_cache.reset_counts()
+        self.import_executor = ProcessPoolExecutor(initializer=init_import_worker, initargs=(self.build_cache.entries,))
+        self.import_futures = {self.import_executor.submit(import_image_worker, path): p_id for p_id, path in matches}
+        self.import_results = {}
+        self.import_errors = []
+        self.import_unmatched = unmatched
+
+        self.import_progress = QProgressDialog("Importing images...", "Cancel", 0, len(matches), self)
+        self.import_progress.setWindowModality(Qt.WindowModal)
+        self.import_progress.setMinimumDuration(0)
+        self.import_progress.canceled.connect(self.cancel_bulk_image_import)
+        self.import_progress.setValue(0)
+
+        self.import_timer = QTimer(self)
+        self.import_timer.timeout.connect(self.poll_bulk_image_import)
+        self.import_timer.start(100)
+
+    def poll_bulk_image_import(self):
+        for future in [f for f in self.import_futures if f.done()]:
+            p_id = self.import_futures.pop(future)
+            try:
+                src_path, variants, cache_update = future.result()
+                apply_import_result(self.build_cache, variants, cache_update)
+                self.import_results[p_id] = variants
+            except Exception as e:
+                self.import_errors.append(f"{p_id}: {e}")
+
+        done = self.import_progress.maximum() - len(self.import_futures)
+        self.import_progress.setValue(done)
+        if not self.import_futures:
+            self.finish_bulk_image_import()
+
+    def cancel_bulk_image_import(self):
+        if not self.import_futures: return
+        self.import_futures = {}
+        self.finish_bulk_image_import(cancelled=True)
+
+    def finish_bulk_image_import(self, cancelled=False):
+        self.import_timer.stop()
+        self.import_executor.shutdown(wait=False, cancel_futures=True)
+        self.import_progress.close()
+        self.build_cache.save()
+
+        # Apply everything that finished, even on cancel, with a single write
+        for p_id, variants in self.import_results.items():
+            product = self.catalog.get_product(p_id)
+            if product:
+                self.catalog.put_product(dataclasses.replace(product, variants=variants, image=variants["card"]["fallback"]))
+                self.pending_releases += product_assets(product)  # released by the flush, once nothing refers to them
+                self.prod_model.product_changed(p_id)
+        if self.import_results:
+            self.touched_paths.add(PRODUCTS_DIR)
+            self.save_catalog(product_ids=list(self.import_results))
+
+        summary = f"{len(self.import_results)} product image(s) imported ({self.build_cache.summary()})."
+        if cancelled:
+            summary = "Import cancelled. " + summary
+        if self.import_unmatched:
+            summary += f"\n\nUnmatched ({len(self.import_unmatched)}): " + ", ".join(self.import_unmatched[:20])
+        if self.import_errors:
+            summary += f"\n\nFailed ({len(self.import_errors)}):\n" + "\n".join(self.import_errors[:20])
+        QMessageBox.information(self, "Import", summary)
+
+    def import_products(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Import Products", "", "Product lists (*.csv *.jsonl *.ndjson)")
+        if not path: return
+        key, ok = QInputDialog.getItem(self, "Import Products", "Match existing products by column\n(or type another, e.g. sku):",
+                                       ["id", "name"], 0, True)
+        if not ok or not key.strip(): return
+
+        self.product_importer = ProductImporter(self.catalog, key.strip())
+        self.product_import_ids = set()
+        self.product_import = ProductImportWorker(self.product_importer, path, self)
+        self.product_import.batch_ready.connect(self.apply_product_batch)
+        self.product_import.failed.connect(lambda message: QMessageBox.critical(self, "Import", message))
+        self.product_import.finished.connect(self.finish_product_import)
+
+        size = max(1, os.path.getsize(path))
+        self.product_import_progress = QProgressDialog("Importing products...", "Cancel", 0, size, self)
+        self.product_import_progress.setWindowModality(Qt.WindowModal)
+        self.product_import_progress.setMinimumDuration(0)
+        self.product_import_progress.canceled.connect(self.product_import.requestInterruption)
+        self.product_import.progress.connect(lambda pos: self.product_import_progress.setValue(min(pos, size)))
+        self.product_import.start()
+
+    def apply_product_batch(self, batch):
+        with span("ui.import_products_batch", rows=len(batch)):
+            self.product_import_ids.update(apply_batch(self.product_importer, batch))
+        self.product_import.batch_applied()
+
+    def finish_product_import(self):
+        """Rows applied so far are kept, even on cancel or a read error; one reload, one write"""
+        cancelled = self.product_import_progress.wasCanceled()
+        self.product_import_progress.close()
+        importer = self.product_importer
+        if self.product_import_ids:
+            self.refresh_product_table()
+            self.save_catalog(product_ids=self.product_import_ids)
+
+        summary = f"Products: {importer.summary()}."
+        if cancelled:
+            summary = "Import cancelled. " + summary
+        if importer.errors:
+            summary += "\n\n" + "\n".join(importer.errors[:20])
+            if importer.rejected > 20:
+                summary += f"\n... and {importer.rejected - 20} more"
+        QMessageBox.information(self, "Import", summary)
 
     def save_product(self):
         p_id = self.p_id.text()
         is_new = not p_id
         
         if is_new:
-            import uuid
-            p_id = str(uuid.uuid4())
-        
-        selected_toppings = [cb.property("t_id") for cb in self.topping_checks if cb.isChecked()]
-        
-        product_data = {
-            "id": p_id,
-            "name": self.p_name.text(),
-            "price": self.p_price.value(),
-            "description": self.p_desc.toPlainText(),
-            "stock": self.p_stock.value(),
-            "max_order": self.p_max.value(),
-            "category": self.p_cat.text(),
-            "image": self.p_img_path,
-            "toppings": selected_toppings
-        }
+            p_id = new_id()
         
-        if is_new:
-            self.products.append(product_data)
-        else:
-            for i, p in enumerate(self.products):
-                if p['id'] == p_id:
-                    self.products[i] = product_data
-                    break
+        selected_toppings = self.topping_checks.checked_ids()
+        old = self.catalog.get_product(p_id)
         
-        self.save_json(PRODUCTS_FILE, self.products)
-        self.refresh_product_table()
+        product = Product(
+            id=p_id,
+            name=self.p_name.text(),
+            price=self.p_price.value(),
+            description=self.p_desc.toPlainText(),
+            stock=self.p_stock.value(),
+            max_order=self.p_max.value(),
+            category=self.p_cat.text(),
+            image=self.p_img_path,
+            variants=self.p_img_variants,
+            toppings=selected_toppings,
+            extra=old.extra if old else {},
+        )
+        with span("ui.save_product"):
+            if self.catalog.put_product(product):
+                self.prod_model.product_added(p_id)
+            else:
+                self.prod_model.product_changed(p_id)
+            if old:
+                self.pending_releases += product_assets(old)
+
+            self.save_catalog(product_ids=[p_id])
         self.clear_product_form()
         QMessageBox.information(self, "Success", "Product saved locally!")
     
@@ -391,17 +1586,55 @@ class BiteBabeAdmin(QMainWindow):
         self.save_product()
         self.save_and_push_to_github("Product")
 
+    def bulk_edit_products(self):
+        selected = [index.data(Qt.UserRole) for index in self.prod_table.selectionModel().selectedRows()]
+        shown = [self.prod_proxy.index(row, 0).data(Qt.UserRole) for row in range(self.prod_proxy.rowCount())]
+        dialog = BulkEditDialog(self.catalog, selected, shown, self)
+        if dialog.exec_() != QDialog.Accepted: return
+        ids, op, value, push = dialog.edit()
+
+        try:
+            pairs = plan_bulk_edit(self.catalog, ids, op, value)
+        except BulkEditError as e:
+            QMessageBox.warning(self, "Bulk Edit", str(e))
+            return
+        if not pairs:
+            QMessageBox.information(self, "Bulk Edit", "None of these products would change.")
+            return
+
+        label = f"{BULK_OPERATIONS[op].lower()} on {len(pairs)} product(s)"
+        with span("ui.bulk_edit", products=len(pairs)):
+            self.undo_stack.push(BulkEditCommand(self, label, pairs))  # applies it
+            if not self.flush_data():
+                return
+        if push:
+            self.save_and_push_to_github(f"{len(pairs)} products ({BULK_OPERATIONS[op].lower()})")
+        self.statusBar().showMessage(f"Applied {label}. Ctrl+Z or Undo reverts it.", 8000)
+
+    def apply_bulk_records(self, records, expected):
+        """Put records from a bulk edit or its undo, then save them with one write"""
+        ids = apply_records(self.catalog, records, expected)
+        for p_id in ids:
+            self.prod_model.product_changed(p_id)
+        if ids:
+            self.save_catalog(product_ids=ids)
+        if self.p_id.text() in ids:
+            self.load_open_product()
+        if len(ids) < len(records):
+            self.statusBar().showMessage(f"{len(records) - len(ids)} product(s) changed since and were left as they are", 8000)
+
     def delete_product(self):
-        row = self.prod_table.currentRow()
-        if row < 0: return
+        index = self.prod_table.currentIndex()
+        if not index.isValid(): return
         
-        p_id = self.prod_table.item(row, 0).data(Qt.UserRole)
+        p_id = index.data(Qt.UserRole)
         confirm = QMessageBox.question(self, "Confirm", "Delete this product?", QMessageBox.Yes | QMessageBox.No)
         
         if confirm == QMessageBox.Yes:
-            self.products = [p for p in self.products if p['id'] != p_id]
-            self.save_json(PRODUCTS_FILE, self.products)
-            self.refresh_product_table()
+            product = self.catalog.remove_product(p_id)
+            self.prod_model.product_removed(p_id)
+            self.pending_releases += product_assets(product)
+            self.save_catalog(product_ids=[p_id])
             self.clear_product_form()
 
     # --- Toppings Tab ---
@@ -410,8 +1643,10 @@ class BiteBabeAdmin(QMainWindow):
         layout = QHBoxLayout(tab)
         
         # List
-        self.top_list = QListWidget()
-        self.top_list.itemClicked.connect(self.load_topping_details)
+        self.top_list = QListView()
+        self.top_list.setModel(self.topping_model)
+        self.top_list.setUniformItemSizes(True)
+        self.top_list.clicked.connect(self.load_topping_details)
         layout.addWidget(self.top_list)
         
         # Form
@@ -423,7 +1658,7 @@ class BiteBabeAdmin(QMainWindow):
         self.t_id.setReadOnly(True)
         self.t_name = QLineEdit()
         self.t_price = QDoubleSpinBox()
-        self.t_price.setRange(0, 100000)
+        self.t_price.setRange(0, TOPPING_PRICE_MAX)
         
         form.addRow("ID:", self.t_id)
         form.addRow("Name:", self.t_name)
@@ -452,26 +1687,20 @@ class BiteBabeAdmin(QMainWindow):
         form_layout.addStretch()
         
         layout.addWidget(form_widget)
-        
-        self.refresh_topping_list()
         return tab
 
     def refresh_topping_list(self):
-        self.top_list.clear()
-        for t in self.toppings:
-            self.top_list.addItem(f"{t['name']} - {t['price']}")
-            list_item = self.top_list.item(self.top_list.count() - 1)
-            list_item.setData(Qt.UserRole, t['id'])
-        
-        self.refresh_topping_checks() # Update product tab checks too
+        """Full reload; normal edits update single rows through topping_model"""
+        with span("ui.refresh_topping_list"):
+            self.topping_model.reset_catalog(self.catalog)
 
-    def load_topping_details(self, item):
-        t_id = item.data(Qt.UserRole)
-        topping = next((t for t in self.toppings if t['id'] == t_id), None)
+    def load_topping_details(self, index):
+        t_id = index.data(Qt.UserRole)
+        topping = self.catalog.get_topping(t_id)
         if topping:
-            self.t_id.setText(topping['id'])
-            self.t_name.setText(topping['name'])
-            self.t_price.setValue(topping['price'])
+            self.t_id.setText(topping.id)
+            self.t_name.setText(topping.name)
+            self.t_price.setValue(topping.price)
 
     def clear_topping_form(self):
         self.t_id.clear()
@@ -484,25 +1713,19 @@ class BiteBabeAdmin(QMainWindow):
         is_new = not t_id
         
         if is_new:
-            import uuid
-            t_id = str(uuid.uuid4())
-            
-        topping_data = {
-            "id": t_id,
-            "name": self.t_name.text(),
-            "price": self.t_price.value()
-        }
+            t_id = new_id()
         
-        if is_new:
-            self.toppings.append(topping_data)
+        old = self.catalog.get_topping(t_id)
+        if self.catalog.put_topping(Topping(
+                id=t_id,
+                name=self.t_name.text(),
+                price=self.t_price.value(),
+                extra=old.extra if old else {})):
+            self.topping_model.topping_added(t_id)
         else:
-            for i, t in enumerate(self.toppings):
-                if t['id'] == t_id:
-                    self.toppings[i] = topping_data
-                    break
+            self.topping_model.topping_changed(t_id)
         
-        self.save_json(TOPPINGS_FILE, self.toppings)
-        self.refresh_topping_list()
+        self.save_catalog(topping_ids=[t_id])
         self.clear_topping_form()
         QMessageBox.information(self, "Success", "Topping saved locally!")
     
@@ -511,44 +1734,90 @@ class BiteBabeAdmin(QMainWindow):
         self.save_and_push_to_github("Topping")
 
     def delete_topping(self):
-        row = self.top_list.currentRow()
-        if row < 0: return
+        index = self.top_list.currentIndex()
+        if not index.isValid(): return
+        
+        t_id = index.data(Qt.UserRole)
+        used_by = len(self.catalog.products_with_topping(t_id))
+        if used_by:
+            confirm = QMessageBox.question(self, "Confirm", f"This topping is offered on {used_by} product(s). Delete it and remove it from them?", QMessageBox.Yes | QMessageBox.No)
+            if confirm != QMessageBox.Yes: return
         
-        t_id = self.top_list.item(row).data(Qt.UserRole)
-        self.toppings = [t for t in self.toppings if t['id'] != t_id]
-        self.save_json(TOPPINGS_FILE, self.toppings)
-        self.refresh_topping_list()
+        # Reverse index: only products offering the topping change; both are saved together
+        with span("ui.delete_topping", products=used_by):
+            affected = self.catalog.remove_topping(t_id)
+            self.topping_model.topping_removed(t_id)
+            self.topping_checks.checked.discard(t_id)
+            self.save_catalog(product_ids=affected, topping_ids=[t_id])
         self.clear_topping_form()
 
     # --- Git Sync ---
     def save_and_push_to_github(self, item_name):
-        """Save changes and push to GitHub"""
-        try:
-            git_dir = os.path.join(PROJECT_DIR, ".git")
-            if not os.path.exists(git_dir):
-                QMessageBox.warning(self, "Git Error", "This folder is not a Git repository.\n\nPlease initialize git first with:\ngit init\ngit remote add origin <your-repo-url>")
+        """Queue the files this session touched for a background commit + push"""
+        git_dir = os.path.join(PROJECT_DIR, ".git")
+        if not os.path.exists(git_dir):
+            QMessageBox.warning(self, "Git Error", "This folder is not a Git repository.\n\nPlease initialize git first with:\ngit init\ngit remote add origin <your-repo-url>")
+            return False
+
+        with span("ui.save_and_push"):
+            if not self.flush_data():
+                return False
+            try:
+                if self.db is not None:
+                    # Build from the current stock, not what we read before the latest sales
+                    if self.changed_on_disk(CATALOG_DB):
+                        self.reload_now([CATALOG_DB])
+                    self.touched_paths.update(self.db.export_json())
+                self.build_cache.reset_counts()
+                self.touched_paths.update(publish_storefront(self.catalog, self.store_config, self.export_mode(), self.build_cache))
+                self.build_cache.save()
+                self.statusBar().showMessage(f"Storefront built ({self.build_cache.summary()})")
+                # Also whatever an earlier, unpushed build or session left behind
+                self.touched_paths.update(PUBLISHED_SOURCES)
+                self.touched_paths.update(storefront_files())
+            except (OSError, sqlite3.Error) as e:
+                QMessageBox.critical(self, "Publish Error", f"Could not build the storefront files: {e}")
                 return False
+        self.publisher.request(self.touched_paths, item_name)
+        self.touched_paths = set()
+        return True
 
-            subprocess.run(["git", "add", "."], cwd=PROJECT_DIR, check=True)
-            subprocess.run(["git", "commit", "-m", f"Update {item_name} from BiteBabe Admin"], cwd=PROJECT_DIR, check=True)
-            subprocess.run(["git", "push"], cwd=PROJECT_DIR, check=True)
-            
-            QMessageBox.information(self, "Success", f"{item_name} saved locally!\n\n✅ Changes pushed to GitHub successfully!")
-            return True
-        except subprocess.CalledProcessError as e:
-            QMessageBox.critical(self, "Sync Error", f"{item_name} saved locally!\n\n❌ Failed to push to GitHub: {str(e)}")
-            return False
-        except Exception as e:
-            QMessageBox.critical(self, "Error", str(e))
-            return False
+    def closeEvent(self, event):
+        if not self.flush_data():
+            event.ignore()
+            return
+        if self.publisher.is_busy():
+            self.statusBar().showMessage("Publishing pending changes before exit...")
+            self.publisher.wait_for_idle()
+        tracer.on_finish = None
+        self.thumbnails.shutdown()
+        if self.db is not None:
+            self.db.close()
+        trace_file = os.environ.get("BITEBABE_TRACE", "")
+        if tracer.enabled and trace_file.endswith(".json"):
+            tracer.save(trace_file)
+        super().closeEvent(event)
 
-if __name__ == "__main__":
+def main():
+    startup = PhaseTimer(_IMPORT_START)
+    startup.mark("import")
+    ensure_dirs()
     app = QApplication(sys.argv)
     
     # Set app font
     font = QFont("Segoe UI", 10)
     app.setFont(font)
+    startup.mark("qt init")
+
+    error = catalog_backend_error()
+    if error:
+        QMessageBox.critical(None, "Catalog Backend", error[0].upper() + error[1:])
+        sys.exit(1)
     
-    window = BiteBabeAdmin()
+    window = BiteBabeAdmin(startup)
     window.show()
+    startup.mark("show")
     sys.exit(app.exec_())
+
+if __name__ == "__main__":
+    main()
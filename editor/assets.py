@@ -0,0 +1,68 @@
+"""Reference counting and garbage collection for product image files.
+
+Product images are content-addressed (named by source hash, see
+images.build_image_variants), so identical uploads share files. A file in
+PRODUCTS_DIR is live while products.json, store.json or the branding assets
+refer to it; everything else can be collected.
+"""
+import os
+from collections import Counter
+
+from .config import PROJECT_DIR, PRODUCTS_DIR, LOGO_TARGET, FAVICON_TARGET
+
+def product_assets(product):
+    """Relative asset paths a product refers to (image plus every variant file)"""
+    paths = [product.image] if product.image else []
+    for variant in product.variants.values():
+        paths += [variant[key] for key in ("webp", "fallback") if variant.get(key)]
+    return paths
+
+def asset_refcounts(catalog, store_config=None):
+    """Counter of relative asset path -> number of references"""
+    refs = Counter()
+    for product in catalog.products.values():
+        refs.update(product_assets(product))
+    for value in (store_config or {}).values():
+        if isinstance(value, str) and value.startswith("assets/"):
+            refs[value] += 1
+    for path in (LOGO_TARGET, FAVICON_TARGET):
+        refs[asset_path(path)] += 1
+    return refs
+
+def asset_path(abs_path):
+    return os.path.relpath(abs_path, PROJECT_DIR).replace(os.sep, "/")
+
+def unreferenced_assets(catalog, store_config=None, directory=PRODUCTS_DIR):
+    """Files in `directory` nothing refers to, as absolute paths"""
+    refs = asset_refcounts(catalog, store_config)
+    return sorted(os.path.join(directory, filename) for filename in os.listdir(directory)
+                  if not filename.startswith(".") and refs[asset_path(os.path.join(directory, filename))] == 0)
+
+def missing_assets(catalog, store_config=None):
+    """Referenced asset paths that don't exist on disk"""
+    refs = asset_refcounts(catalog, store_config)
+    return sorted(path for path in refs if not os.path.exists(os.path.join(PROJECT_DIR, path)))
+
+def collect_garbage(catalog, store_config=None, dry_run=False):
+    """Remove unreferenced product images; returns [(path, size in bytes)]"""
+    garbage = [(path, os.path.getsize(path)) for path in unreferenced_assets(catalog, store_config)]
+    if not dry_run:
+        for path, _ in garbage:
+            os.remove(path)
+    return garbage
+
+def release_assets(catalog, paths, store_config=None):
+    """Delete the given relative asset paths that are no longer referenced.
+
+    Called after a product's image is replaced or the product is deleted, so
+    only its old files are checked. Returns the absolute paths removed.
+    """
+    refs = asset_refcounts(catalog, store_config)
+    removed = []
+    for path in set(paths):
+        abs_path = os.path.normpath(os.path.join(PROJECT_DIR, path))
+        # Only ever delete inside the managed products folder
+        if refs[path] == 0 and os.path.dirname(abs_path) == PRODUCTS_DIR and os.path.isfile(abs_path):
+            os.remove(abs_path)
+            removed.append(abs_path)
+    return removed
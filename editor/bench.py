@@ -0,0 +1,325 @@
+"""Benchmarks at synthetic scale: python -m editor.bench
+
+Generates catalogs (10 to 100k products, 10 to 5k toppings) and test images in
+a temporary directory, so the real data files are never touched, and times
+catalog I/O, storefront export, the editor's table and topping list refresh
+(under QT_QPA_PLATFORM=offscreen) and the image pipelines.
+
+Results are written as JSON (by default to .cache/bench/<commit>.json);
+`--compare` checks a run against an earlier one and exits 1 on regressions.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from .config import CACHE_DIR, PROJECT_DIR
+from .catalog import Catalog, Product, Topping
+from .storage import read_json, write_json
+
+# name -> (products, toppings)
+SCALES = {
+    "small": (10, 10),
+    "medium": (1000, 500),
+    "large": (100000, 5000),
+}
+GROUPS = ("catalog", "gui", "images")
+CATEGORIES = ["Best Seller", "Special", "Premium", "Classic", "Seasonal", "Vegan", "Mini", "Party Box",
+              "Cheesecake", "Brownies", "Cookies", "Donuts", "Cupcakes", "Tarts", "Drinks"]
+FLAVORS = ["Choco", "Red Velvet", "Matcha", "Cheese", "Strawberry", "Tiramisu", "Caramel", "Lotus",
+           "Oreo", "Pandan", "Taro", "Mango", "Coffee", "Vanilla", "Hazelnut"]
+LOOKUPS = 10000
+FORM_LOADS = 200
+
+def synthetic_catalog(n_products, n_toppings, seed=0):
+    """A deterministic catalog shaped like data/products.json and data/toppings.json"""
+    rng = random.Random(seed)
+    toppings = [Topping(f"top_{i}", f"{rng.choice(FLAVORS)} Topping {i}", rng.randrange(1000, 15000, 500))
+                for i in range(n_toppings)]
+    topping_ids = [t.id for t in toppings]
+    products = []
+    for i in range(n_products):
+        digest = f"{rng.getrandbits(48):012x}"
+        variants = {name: {"webp": f"assets/products/{digest}_{name}.webp",
+                           "fallback": f"assets/products/{digest}_{name}.jpg", "width": size, "height": size}
+                    for name, size in (("card", 600), ("modal", 300), ("thumb", 100))}
+        products.append(Product(
+            id=f"prod_{i}",
+            name=f"{rng.choice(FLAVORS)} {rng.choice(['Cake', 'Slice', 'Box', 'Roll'])} {i}",
+            price=rng.randrange(15000, 250000, 1000),
+            description="Soft, rich and freshly baked every morning. " * rng.randint(1, 3),
+            stock=rng.randint(0, 50),
+            max_order=rng.randint(1, 10),
+            category=rng.choice(CATEGORIES),
+            image=variants["card"]["fallback"],
+            variants=variants,
+            toppings=rng.sample(topping_ids, min(len(topping_ids), rng.randint(0, 8))),
+        ))
+    return Catalog(products, toppings)
+
+def synthetic_image(path, size, mode="RGB"):
+    """A photo-like test image: a gradient with noise, so encoders can't cheat on flat colour"""
+    from PIL import Image, ImageChops
+
+    gradient = Image.linear_gradient("L").resize(size)
+    noise = Image.effect_noise(size, 48)
+    channels = [gradient, ImageChops.add(gradient.rotate(90, expand=False), noise), noise]
+    img = Image.merge("RGB", channels)
+    if mode == "RGBA":
+        img.putalpha(Image.radial_gradient("L").resize(size))
+    img.save(path)
+    return path
+
+def measure(fn, repeat, setup=None):
+    """Run `fn` `repeat` times (after an untimed `setup` each time); timings in ms"""
+    runs = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        runs.append((time.perf_counter() - start) * 1000)
+    return {"median_ms": round(statistics.median(runs), 3), "min_ms": round(min(runs), 3),
+            "max_ms": round(max(runs), 3), "runs": len(runs)}
+
+def bench_catalog(catalog, label, work_dir, repeat):
+    from .catalogdb import CatalogDB
+    from .publish import build_catalog_shards, build_search_index, build_storefront_bundle
+
+    products_file = os.path.join(work_dir, "products.json")
+    toppings_file = os.path.join(work_dir, "toppings.json")
+    write_json(products_file, catalog.products_json())
+    write_json(toppings_file, catalog.toppings_json())
+    out_dir = os.path.join(work_dir, "out")
+
+    rng = random.Random(1)
+    product_ids = rng.choices(list(catalog.products), k=LOOKUPS)
+    topping_ids = rng.choices(list(catalog.toppings), k=LOOKUPS)
+    categories = catalog.categories()
+
+    def lookups():
+        for p_id, t_id in zip(product_ids, topping_ids):
+            catalog.get_product(p_id)
+            catalog.products_with_topping(t_id)
+        for category in categories:
+            catalog.products_in_category(category)
+
+    db = CatalogDB(os.path.join(work_dir, "catalog.db"))
+    db.replace_all(catalog)
+    edited = product_ids[:100]
+
+    def fresh_out_dir():
+        shutil.rmtree(out_dir, ignore_errors=True)
+        os.makedirs(out_dir)
+
+    results = {
+        f"catalog.load/{label}": measure(
+            lambda: Catalog.from_json(read_json(products_file, []), read_json(toppings_file, [])), repeat),
+        f"catalog.save/{label}": measure(lambda: write_json(products_file, catalog.products_json()), repeat),
+        f"catalog.lookup/{label}": measure(lookups, repeat),
+        # Saving 100 single-product edits: SQLite backend point updates
+        f"catalogdb.save_100/{label}": measure(lambda: [db.save(catalog, [p_id]) for p_id in edited], repeat),
+        f"catalogdb.load/{label}": measure(db.load, repeat),
+        f"catalogdb.export/{label}": measure(
+            lambda: db.export_json(products_file, toppings_file), repeat, setup=lambda: os.remove(products_file)),
+        f"storefront.bundle/{label}": measure(
+            lambda: build_storefront_bundle(catalog, {}, {}, out_dir), repeat, setup=fresh_out_dir),
+        f"storefront.shards/{label}": measure(
+            lambda: build_catalog_shards(catalog, {}, {}, out_dir), repeat, setup=fresh_out_dir),
+        f"storefront.search/{label}": measure(
+            lambda: build_search_index(catalog, {}, out_dir), repeat, setup=fresh_out_dir),
+    }
+    db.close()
+    return results
+
+def qt_app():
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
+
+def bench_gui(catalog, label, repeat):
+    from PyQt5.QtWidgets import QListView, QTableView
+    from editor.admin import ProductFilterProxyModel, ProductTableModel, ToppingCheckProxyModel, ToppingListModel
+
+    app = qt_app()
+    table_model = ProductTableModel(catalog)
+    table_proxy = ProductFilterProxyModel()
+    table_proxy.setSourceModel(table_model)
+    table = QTableView()
+    table.setModel(table_proxy)
+    table.setSortingEnabled(True)
+    table.resize(600, 700)
+    table.show()
+
+    topping_model = ToppingListModel(catalog)
+    topping_checks = ToppingCheckProxyModel()
+    topping_checks.setSourceModel(topping_model)
+    topping_view = QListView()
+    topping_view.setModel(topping_checks)
+    topping_view.setUniformItemSizes(True)
+    topping_view.resize(300, 300)
+    topping_view.show()
+    app.processEvents()
+
+    rng = random.Random(2)
+    form_toppings = [p.toppings for p in rng.choices(list(catalog.products.values()), k=FORM_LOADS)]
+
+    def refresh_table():
+        table_model.reset_catalog(catalog)
+        app.processEvents()
+
+    def search_table():
+        table_proxy.set_search("choco")
+        table_proxy.set_search("")
+        app.processEvents()
+
+    def refresh_toppings():
+        topping_model.reset_catalog(catalog)
+        app.processEvents()
+
+    def load_forms():
+        # What clicking through products does to the topping checkboxes
+        for t_ids in form_toppings:
+            topping_checks.set_checked(t_ids)
+            app.processEvents()
+
+    results = {
+        f"gui.table_refresh/{label}": measure(refresh_table, repeat),
+        f"gui.table_search/{label}": measure(search_table, repeat),
+        f"gui.topping_refresh/{label}": measure(refresh_toppings, repeat),
+        f"gui.topping_checks/{label}": measure(load_forms, repeat),
+    }
+    table.close()
+    topping_view.close()
+    return results
+
+def bench_images(work_dir, repeat):
+    from .images import build_branding, build_image_variants
+
+    photo = synthetic_image(os.path.join(work_dir, "photo.jpg"), (2400, 1800))
+    cutout = synthetic_image(os.path.join(work_dir, "cutout.png"), (1200, 1200), "RGBA")
+    logo = synthetic_image(os.path.join(work_dir, "logo.png"), (1000, 600), "RGBA")
+    out_dir = os.path.join(work_dir, "products")
+    os.makedirs(out_dir)
+    logo_target = os.path.join(work_dir, "logo_out.png")
+    favicon_target = os.path.join(work_dir, "favicon_out.png")
+
+    return {
+        "images.variants_jpeg/2400x1800": measure(lambda: build_image_variants(photo, out_dir), repeat),
+        "images.variants_png/1200x1200": measure(lambda: build_image_variants(cutout, out_dir), repeat),
+        "images.branding/1000x600": measure(lambda: build_branding(logo, logo_target, favicon_target), repeat),
+    }
+
+def git_commit():
+    result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_DIR, capture_output=True, text=True)
+    if result.returncode != 0:
+        return None, False
+    dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                           cwd=PROJECT_DIR, capture_output=True, text=True).stdout.strip() != ""
+    return result.stdout.strip(), dirty
+
+def run(scales, groups, repeat):
+    commit, dirty = git_commit()
+    report = {
+        "commit": commit,
+        "dirty": dirty,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "scales": {name: SCALES[name] for name in scales},
+        "results": {},
+        "skipped": {},
+    }
+    with tempfile.TemporaryDirectory(prefix="bitebabe-bench-") as work_dir:
+        for name in scales:
+            if "catalog" not in groups and "gui" not in groups:
+                break
+            n_products, n_toppings = SCALES[name]
+            print(f"{name}: generating {n_products} products, {n_toppings} toppings", file=sys.stderr)
+            catalog = synthetic_catalog(n_products, n_toppings)
+            label = f"{n_products}p-{n_toppings}t"
+            if "catalog" in groups:
+                scale_dir = os.path.join(work_dir, name)
+                os.makedirs(scale_dir)
+                report["results"].update(bench_catalog(catalog, label, scale_dir, repeat))
+            if "gui" in groups:
+                try:
+                    report["results"].update(bench_gui(catalog, label, repeat))
+                except ImportError as e:
+                    report["skipped"]["gui"] = str(e)
+        if "images" in groups:
+            print("images", file=sys.stderr)
+            try:
+                report["results"].update(bench_images(work_dir, repeat))
+            except ImportError as e:
+                report["skipped"]["images"] = str(e)
+    return report
+
+def compare(report, baseline, threshold, min_delta_ms):
+    """Print each benchmark against `baseline`; returns the names slower by more than
+    `threshold`x and by at least `min_delta_ms` (sub-millisecond timings are mostly noise)"""
+    regressions = []
+    for name, result in report["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            print(f"  {name:<44} {result['median_ms']:10.2f} ms   (new)")
+            continue
+        ratio = result["median_ms"] / base["median_ms"] if base["median_ms"] else float("inf")
+        flag = ""
+        if ratio > threshold and result["median_ms"] - base["median_ms"] >= min_delta_ms:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"  {name:<44} {result['median_ms']:10.2f} ms   {ratio:5.2f}x{flag}")
+    return regressions
+
+def print_report(report):
+    for name, result in report["results"].items():
+        print(f"  {name:<44} {result['median_ms']:10.2f} ms   (min {result['min_ms']:.2f})")
+    for group, reason in report["skipped"].items():
+        print(f"  {group} skipped: {reason}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m editor.bench", description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", action="append", choices=SCALES, help="catalog sizes to run (default: all)")
+    parser.add_argument("--group", action="append", choices=GROUPS, help="benchmark groups to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per benchmark (median is reported)")
+    parser.add_argument("-o", "--output", help="results file (default: .cache/bench/<commit>.json, '-' for stdout)")
+    parser.add_argument("--compare", metavar="BASELINE", help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="slowdown ratio counted as a regression")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="ignore slowdowns smaller than this")
+    args = parser.parse_args(argv)
+
+    report = run(args.scale or list(SCALES), args.group or list(GROUPS), max(1, args.repeat))
+
+    output = args.output
+    if output is None:
+        name = (report["commit"] or "nocommit") + ("-dirty" if report["dirty"] else "")
+        output = os.path.join(CACHE_DIR, "bench", f"{name}.json")
+    if output == "-":
+        print(json.dumps(report, indent=2))
+    else:
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        write_json(output, report)
+        print(f"results written to {output}", file=sys.stderr)
+
+    if args.compare:
+        baseline = read_json(args.compare, {})
+        print(f"compared with {baseline.get('commit')} ({args.compare}):")
+        regressions = compare(report, baseline, args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"{len(regressions)} regression(s) over {args.threshold}x")
+            return 1
+    elif output != "-":
+        print_report(report)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""Incremental build cache for derived files (image variants, branding, storefront JSON).
+
+Each artifact is recorded under a key with a fingerprint of its inputs (source
+hashes plus the settings used to build it) and the files it produced. A later
+build with the same fingerprint, whose outputs still exist, is a hit and can be
+skipped.
+"""
+import hashlib
+import json
+import os
+
+from .config import PROJECT_DIR, BUILD_CACHE_FILE
+from .storage import DataFileError, read_json, write_json
+
+def fingerprint(inputs):
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode('utf-8')).hexdigest()
+
+class BuildCache:
+    def __init__(self, path=BUILD_CACHE_FILE, entries=None):
+        """Load the cache from `path`, or wrap an `entries` snapshot (read-only use in workers)"""
+        self.path = path
+        if entries is not None:
+            self.entries = entries
+        else:
+            try:
+                self.entries = read_json(path, {})
+            except DataFileError:
+                self.entries = {}  # disposable; rebuilt on the next misses
+        self.hits = 0
+        self.misses = 0
+        self.dirty = False
+
+    def get(self, key, inputs, check=None):
+        """The recorded entry ({"result": ..., "outputs": [...]}) if still valid, else None.
+
+        `check(entry)` can reject an entry whose outputs were changed by another build.
+        """
+        entry = self.entries.get(key)
+        if (entry and entry["fingerprint"] == fingerprint(inputs)
+                and all(os.path.exists(os.path.join(PROJECT_DIR, path)) for path in entry["outputs"])
+                and (check is None or check(entry))):
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def put(self, key, inputs, result, outputs):
+        self.entries[key] = {
+            "fingerprint": fingerprint(inputs),
+            "result": result,
+            "outputs": [os.path.relpath(path, PROJECT_DIR).replace(os.sep, "/") for path in outputs],
+        }
+        self.dirty = True
+
+    def save(self):
+        if self.dirty:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            write_json(self.path, self.entries, compact=True)
+            self.dirty = False
+
+    def reset_counts(self):
+        self.hits = self.misses = 0
+
+    def summary(self):
+        return f"build cache: {self.hits} hit(s), {self.misses} miss(es)"
@@ -0,0 +1,80 @@
+"""Bulk edits: one operation over many products, planned and validated before
+anything changes, then applied to the catalog at once"""
+import dataclasses
+
+from .config import PRICE_MAX, STOCK_MAX
+
+BULK_OPERATIONS = {
+    "set_price": "Set price",
+    "scale_price": "Change price by %",
+    "set_stock": "Set stock",
+    "add_topping": "Add topping",
+    "remove_topping": "Remove topping",
+    "set_category": "Change category",
+}
+
+class BulkEditError(ValueError):
+    pass
+
+def scaled_price(price, percent):
+    """`price` changed by `percent`, to the form's 2 decimals; whole prices stay ints"""
+    value = round(price * (100 + percent) / 100, 2)
+    return int(value) if isinstance(price, int) and value.is_integer() else value
+
+def edited_product(product, op, value):
+    if op == "set_price":
+        return dataclasses.replace(product, price=value)
+    if op == "scale_price":
+        return dataclasses.replace(product, price=scaled_price(product.price, value))
+    if op == "set_stock":
+        return dataclasses.replace(product, stock=value)
+    if op == "add_topping":
+        if value in product.toppings:
+            return product
+        return dataclasses.replace(product, toppings=product.toppings + [value])
+    if op == "remove_topping":
+        return dataclasses.replace(product, toppings=[t for t in product.toppings if t != value])
+    if op == "set_category":
+        return dataclasses.replace(product, category=value)
+    raise BulkEditError(f"unknown bulk operation {op!r}")
+
+def plan_bulk_edit(catalog, ids, op, value):
+    """(old, new) record pairs for the products `op` actually changes.
+
+    Nothing is modified; raises BulkEditError when the value or any resulting
+    price is outside the product form's limits.
+    """
+    if op == "set_price" and not 0 <= value <= PRICE_MAX:
+        raise BulkEditError(f"price must be between 0 and {PRICE_MAX}")
+    if op == "set_stock" and not 0 <= value <= STOCK_MAX:
+        raise BulkEditError(f"stock must be between 0 and {STOCK_MAX}")
+    if op in ("add_topping", "remove_topping") and catalog.get_topping(value) is None:
+        raise BulkEditError(f"unknown topping {value!r}")
+
+    pairs = []
+    out_of_range = []
+    for p_id in ids:
+        old = catalog.get_product(p_id)
+        if old is None:
+            continue
+        new = edited_product(old, op, value)
+        if new == old:
+            continue
+        if not 0 <= new.price <= PRICE_MAX:
+            out_of_range.append(old.name or old.id)
+        pairs.append((old, new))
+    if out_of_range:
+        raise BulkEditError(f"{len(out_of_range)} product(s) would be priced outside 0-{PRICE_MAX}: "
+                            + ", ".join(out_of_range[:5]))
+    return pairs
+
+def apply_records(catalog, records, expected=None):
+    """put_product each record; with `expected` (id -> record), products changed
+    since then are skipped. Returns the ids written."""
+    written = []
+    for record in records:
+        if expected is not None and catalog.get_product(record.id) != expected.get(record.id):
+            continue
+        catalog.put_product(record)
+        written.append(record.id)
+    return written
@@ -0,0 +1,183 @@
+"""Catalog records and the id/category indexed Catalog"""
+import re
+import uuid
+from dataclasses import dataclass, field, fields, replace
+
+from .timing import traced
+
+@dataclass(slots=True)
+class Product:
+    id: str
+    name: str = ""
+    price: float = 0
+    description: str = ""
+    stock: int = 0
+    max_order: int = 5
+    category: str = ""
+    image: str = ""
+    variants: dict = field(default_factory=dict)
+    toppings: list = field(default_factory=list)
+    extra: dict = field(default_factory=dict)  # unknown keys, kept for round-trips
+
+    @classmethod
+    def from_dict(cls, data):
+        return record_from_dict(cls, data)
+
+    def to_dict(self):
+        data = record_to_dict(self)
+        if not self.variants:
+            del data["variants"]
+        return data
+
+@dataclass(slots=True)
+class Topping:
+    id: str
+    name: str = ""
+    price: float = 0
+    extra: dict = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, data):
+        return record_from_dict(cls, data)
+
+    def to_dict(self):
+        return record_to_dict(self)
+
+def record_from_dict(cls, data):
+    known = {f.name for f in fields(cls)} - {"extra"}
+    record = cls(**{k: v for k, v in data.items() if k in known})
+    record.extra = {k: v for k, v in data.items() if k not in known}
+    return record
+
+def record_to_dict(record):
+    data = {f.name: getattr(record, f.name) for f in fields(record) if f.name != "extra"}
+    data.update(record.extra)
+    return data
+
+def new_id():
+    return str(uuid.uuid4())
+
+# Namespace for stable_id; changing it would duplicate every re-imported product
+_STABLE_ID_NAMESPACE = uuid.UUID("677c997a-3bc0-4527-98d8-cf0c50f35534")
+
+def stable_id(*parts):
+    """Deterministic id for a record identified by an external key, e.g. ("sku", "a-100")"""
+    return str(uuid.uuid5(_STABLE_ID_NAMESPACE, "/".join(parts)))
+
+def normalize_key(text):
+    """Loose match key for names/ids vs. file names: 'Red_Velvet' == 'red velvet'"""
+    return re.sub(r"[\s_\-]+", " ", str(text)).strip().lower()
+
+def diff_records(current, records):
+    """Compare `records` (e.g. freshly read from disk) with the id -> record dict
+    `current`; returns (added, changed, removed) with added/changed as records"""
+    added, changed = [], []
+    seen = set()
+    for record in records:
+        seen.add(record.id)
+        old = current.get(record.id)
+        if old is None:
+            added.append(record)
+        elif old != record:
+            changed.append(record)
+    removed = [r_id for r_id in current if r_id not in seen]
+    return added, changed, removed
+
+class Catalog:
+    """Products and toppings indexed by id (insertion ordered), plus products by
+    category and by topping.
+
+    The secondary indexes are maintained by put_product/remove_product, so a
+    product's category or toppings should be changed by putting a new record
+    (e.g. dataclasses.replace), not by mutating the stored one.
+    """
+    def __init__(self, products=(), toppings=()):
+        self.products = {}
+        self.toppings = {}
+        self.by_category = {}  # category -> {product id: None}, an ordered set
+        self.by_topping = {}  # topping id -> {product id: None}
+        for p in products:
+            self.put_product(p)
+        for t in toppings:
+            self.put_topping(t)
+
+    @classmethod
+    @traced("catalog.from_json")
+    def from_json(cls, products, toppings):
+        return cls([Product.from_dict(p) for p in products], [Topping.from_dict(t) for t in toppings])
+
+    def products_json(self):
+        return [p.to_dict() for p in self.products.values()]
+
+    def toppings_json(self):
+        return [t.to_dict() for t in self.toppings.values()]
+
+    # Products
+    def get_product(self, p_id):
+        return self.products.get(p_id)
+
+    def put_product(self, product):
+        """Insert or replace; a replaced product keeps its position"""
+        old = self.products.get(product.id)
+        if old is not None:
+            if old.category != product.category:
+                self._unindex_category(old)
+            self._unindex_toppings(old, set(old.toppings) - set(product.toppings))
+        self.products[product.id] = product
+        self.by_category.setdefault(product.category, {})[product.id] = None
+        for t_id in product.toppings:
+            self.by_topping.setdefault(t_id, {})[product.id] = None
+        return old is None
+
+    def remove_product(self, p_id):
+        product = self.products.pop(p_id, None)
+        if product is not None:
+            self._unindex_category(product)
+            self._unindex_toppings(product, product.toppings)
+        return product
+
+    def products_in_category(self, category):
+        return [self.products[p_id] for p_id in self.by_category.get(category, ())]
+
+    def categories(self):
+        return list(self.by_category)
+
+    def _unindex_category(self, product):
+        ids = self.by_category.get(product.category)
+        if ids is not None:
+            ids.pop(product.id, None)
+            if not ids:
+                del self.by_category[product.category]
+
+    def _unindex_toppings(self, product, t_ids):
+        for t_id in t_ids:
+            ids = self.by_topping.get(t_id)
+            if ids is not None:
+                ids.pop(product.id, None)
+                if not ids:
+                    del self.by_topping[t_id]
+
+    # Toppings
+    def get_topping(self, t_id):
+        return self.toppings.get(t_id)
+
+    def put_topping(self, topping):
+        is_new = topping.id not in self.toppings
+        self.toppings[topping.id] = topping
+        return is_new
+
+    def products_with_topping(self, t_id):
+        return [self.products[p_id] for p_id in self.by_topping.get(t_id, ())]
+
+    def remove_topping(self, t_id):
+        """Delete a topping and strip it from the products offering it.
+
+        Only those products are touched (replaced, never mutated, so snapshots
+        such as undo records stay as they were); returns their ids.
+        """
+        self.toppings.pop(t_id, None)
+        affected = list(self.by_topping.get(t_id, ()))
+        for p_id in affected:
+            product = self.products[p_id]
+            self.put_product(replace(product, toppings=[x for x in product.toppings if x != t_id]))
+        return affected
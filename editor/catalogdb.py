@@ -0,0 +1,215 @@
+"""Optional SQLite catalog store (BITEBABE_BACKEND=sqlite).
+
+Products, toppings and the product-topping join live in indexed tables of a
+WAL-mode database; edits are point updates inside a transaction instead of a
+rewrite of products.json. The JSON files app.js reads are exported from the
+database on publish, in catalog order and byte-for-byte the same as the JSON
+backend would write them.
+"""
+import contextlib
+import json
+import os
+import sqlite3
+
+from .catalog import Catalog, Product, Topping
+from .config import CATALOG_DB, PRODUCTS_FILE, TOPPINGS_FILE, COMPACT_JSON
+from .storage import dump_json, read_json, write_bytes
+from .timing import traced
+
+# price has no declared type (no column affinity), so 35000 and 35000.0 come
+# back exactly as they were stored and exports match the original files
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL DEFAULT '',
+    price,
+    description TEXT NOT NULL DEFAULT '',
+    stock INTEGER NOT NULL DEFAULT 0,
+    max_order INTEGER NOT NULL DEFAULT 5,
+    category TEXT NOT NULL DEFAULT '',
+    image TEXT NOT NULL DEFAULT '',
+    variants TEXT NOT NULL DEFAULT '{}',
+    extra TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS products_position ON products (position);
+CREATE INDEX IF NOT EXISTS products_category ON products (category, position);
+
+CREATE TABLE IF NOT EXISTS toppings (
+    id TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL DEFAULT '',
+    price,
+    extra TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS toppings_position ON toppings (position);
+
+-- No foreign key on topping_id: products may still list a deleted topping
+CREATE TABLE IF NOT EXISTS product_toppings (
+    product_id TEXT NOT NULL REFERENCES products (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    topping_id TEXT NOT NULL,
+    PRIMARY KEY (product_id, position)
+);
+CREATE INDEX IF NOT EXISTS product_toppings_topping ON product_toppings (topping_id);
+"""
+
+def to_json(value):
+    return json.dumps(value, ensure_ascii=False)
+
+class CatalogDB:
+    def __init__(self, path=CATALOG_DB):
+        self.path = path
+        # Autocommit mode; writes are grouped with transaction()
+        self.conn = sqlite3.connect(path, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+        # product id -> stock as last loaded or written by us; see put_product
+        self.stock_base = {}
+
+    def close(self):
+        self.conn.close()
+
+    @contextlib.contextmanager
+    def transaction(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.conn
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def data_version(self):
+        """Changes whenever another connection (e.g. the stock service) commits"""
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def synced_stock(self, products):
+        """Record that `products` (as just read from the database) are what we now hold"""
+        self.stock_base.update((p.id, p.stock) for p in products)
+
+    def is_empty(self):
+        return self.conn.execute("SELECT NOT EXISTS (SELECT 1 FROM products) AND NOT EXISTS (SELECT 1 FROM toppings)").fetchone()[0]
+
+    # Reading
+    def topping_lists(self):
+        lists = {}
+        for row in self.conn.execute("SELECT product_id, topping_id FROM product_toppings ORDER BY product_id, position"):
+            lists.setdefault(row[0], []).append(row[1])
+        return lists
+
+    def products(self):
+        lists = self.topping_lists()
+        for row in self.conn.execute("SELECT * FROM products ORDER BY position"):
+            yield Product(id=row["id"], name=row["name"], price=row["price"], description=row["description"],
+                          stock=row["stock"], max_order=row["max_order"], category=row["category"], image=row["image"],
+                          variants=json.loads(row["variants"]), toppings=lists.get(row["id"], []),
+                          extra=json.loads(row["extra"]))
+
+    def toppings(self):
+        for row in self.conn.execute("SELECT * FROM toppings ORDER BY position"):
+            yield Topping(id=row["id"], name=row["name"], price=row["price"], extra=json.loads(row["extra"]))
+
+    @traced("catalogdb.load")
+    def load(self):
+        catalog = Catalog(self.products(), self.toppings())
+        self.stock_base = {p.id: p.stock for p in catalog.products.values()}
+        return catalog
+
+    # Writing; call inside transaction()
+    def next_position(self, table):
+        return self.conn.execute(f"SELECT COALESCE(MAX(position), 0) + 1 FROM {table}").fetchone()[0]
+
+    def put_product(self, product):
+        """Insert or update; an existing product keeps its position.
+
+        Stock is applied as a change from the stock we last loaded or wrote, so
+        units sold meanwhile by another writer (the stock service) are kept:
+        an edit that leaves stock alone doesn't touch it, a restock adds to it.
+        """
+        base = self.stock_base.get(product.id, product.stock)
+        self.conn.execute(
+            """INSERT INTO products (id, position, name, price, description, stock, max_order, category, image, variants, extra)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT (id) DO UPDATE SET name = excluded.name, price = excluded.price,
+                   description = excluded.description, stock = MAX(0, stock + ?), max_order = excluded.max_order,
+                   category = excluded.category, image = excluded.image, variants = excluded.variants,
+                   extra = excluded.extra""",
+            (product.id, self.next_position("products"), product.name, product.price, product.description,
+             product.stock, product.max_order, product.category, product.image, to_json(product.variants),
+             to_json(product.extra), product.stock - base))
+        self.stock_base[product.id] = product.stock
+        self.conn.execute("DELETE FROM product_toppings WHERE product_id = ?", (product.id,))
+        self.conn.executemany("INSERT INTO product_toppings (product_id, position, topping_id) VALUES (?, ?, ?)",
+                              [(product.id, i, t_id) for i, t_id in enumerate(product.toppings)])
+
+    def remove_product(self, p_id):
+        self.conn.execute("DELETE FROM products WHERE id = ?", (p_id,))
+
+    def put_topping(self, topping):
+        self.conn.execute(
+            """INSERT INTO toppings (id, position, name, price, extra) VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT (id) DO UPDATE SET name = excluded.name, price = excluded.price, extra = excluded.extra""",
+            (topping.id, self.next_position("toppings"), topping.name, topping.price, to_json(topping.extra)))
+
+    def remove_topping(self, t_id):
+        self.conn.execute("DELETE FROM toppings WHERE id = ?", (t_id,))
+        self.conn.execute("DELETE FROM product_toppings WHERE topping_id = ?", (t_id,))
+
+    @traced("catalogdb.save")
+    def save(self, catalog, product_ids=(), topping_ids=()):
+        """Write the given products and toppings as they now are in `catalog`
+        (deleting those no longer in it), in one transaction"""
+        with self.transaction():
+            for t_id in topping_ids:
+                topping = catalog.get_topping(t_id)
+                if topping is None:
+                    self.remove_topping(t_id)
+                else:
+                    self.put_topping(topping)
+            for p_id in product_ids:
+                product = catalog.get_product(p_id)
+                if product is None:
+                    self.remove_product(p_id)
+                else:
+                    self.put_product(product)
+
+    def replace_all(self, catalog):
+        """Make the database hold exactly `catalog`, e.g. when importing the JSON files"""
+        with self.transaction():
+            self.conn.execute("DELETE FROM product_toppings")
+            self.conn.execute("DELETE FROM products")
+            self.conn.execute("DELETE FROM toppings")
+            for topping in catalog.toppings.values():
+                self.put_topping(topping)
+            for product in catalog.products.values():
+                self.put_product(product)
+
+    # JSON export
+    @traced("catalogdb.export")
+    def export_json(self, products_file=PRODUCTS_FILE, toppings_file=TOPPINGS_FILE, compact=COMPACT_JSON):
+        """Write products.json/toppings.json from the database; returns the files that changed"""
+        changed = []
+        for path, records in ((products_file, self.products()), (toppings_file, self.toppings())):
+            payload = dump_json([r.to_dict() for r in records], compact).encode('utf-8')
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    if f.read() == payload:
+                        continue
+            write_bytes(path, payload)
+            changed.append(path)
+        return changed
+
+def open_catalog_db(path=CATALOG_DB, products_file=PRODUCTS_FILE, toppings_file=TOPPINGS_FILE):
+    """Open the catalog database, seeding a new (empty) one from the JSON files"""
+    db = CatalogDB(path)
+    try:
+        if db.is_empty():
+            db.replace_all(Catalog.from_json(read_json(products_file, []), read_json(toppings_file, [])))
+    except BaseException:
+        db.close()
+        raise
+    return db
@@ -0,0 +1,443 @@
+"""Headless catalog operations: python -m editor <command>
+
+Never imports Qt (and only imports Pillow for image commands), so it starts
+quickly and runs on machines without a display, e.g. nightly stock syncs in cron.
+"""
+import argparse
+import dataclasses
+import functools
+import json
+import os
+import sqlite3
+import sys
+
+from .config import (PRODUCTS_FILE, TOPPINGS_FILE, STORE_FILE, PUBLISHED_SOURCES, EXPORT_MODES, CATALOG_BACKEND,
+                     CATALOG_DB, DEFAULT_EXPORT_MODE, PRICE_MAX, STOCK_MAX, MAX_ORDER_RANGE, STOCK_API_HOST, STOCK_API_PORT,
+                     RESERVATION_TTL, catalog_backend_error, ensure_dirs)
+from .catalog import Catalog, Product, new_id, normalize_key
+from .storage import DataFileError, DataStore, file_signature
+from .assets import product_assets, release_assets
+from .timing import span, tracer
+
+class CliError(Exception):
+    pass
+
+def bounded(kind, low, high):
+    """argparse type: `kind` value within [low, high], the same limits as the editor form"""
+    def parse(text):
+        value = kind(text)
+        if not low <= value <= high:
+            raise argparse.ArgumentTypeError(f"must be between {low} and {high}")
+        return value
+    return parse
+
+def nonblank(text):
+    """argparse type: text that isn't empty or just spaces (a product name, as the importer requires)"""
+    if not text.strip():
+        raise argparse.ArgumentTypeError("must not be blank")
+    return text
+
+@functools.lru_cache(maxsize=None)
+def catalog_db():
+    """The SQLite catalog with BITEBABE_BACKEND=sqlite, else None; opened once per run"""
+    error = catalog_backend_error()
+    if error:
+        raise CliError(error)
+    if CATALOG_BACKEND != "sqlite":
+        return None
+    from .catalogdb import open_catalog_db
+    return open_catalog_db()
+
+def load_catalog(store):
+    db = catalog_db()
+    if db is not None:
+        return db.load()
+    return Catalog.from_json(store.load(PRODUCTS_FILE, []), store.load(TOPPINGS_FILE, []))
+
+def save_catalog(store, catalog, product_ids):
+    """Persist the products in `product_ids` (changed or deleted). The SQLite backend
+    updates just those rows; the JSON backend rewrites products.json."""
+    db = catalog_db()
+    if db is not None:
+        db.save(catalog, product_ids)
+        return
+    store.set(PRODUCTS_FILE, catalog.products_json)
+    store.flush()
+
+def find_product(catalog, key):
+    """Look a product up by id, or by name when the name is unique"""
+    product = catalog.get_product(key)
+    if product:
+        return product
+    matches = [p for p in catalog.products.values() if normalize_key(p.name) == normalize_key(key)]
+    if len(matches) == 1:
+        return matches[0]
+    raise CliError(f"no product named {key!r}" if not matches else f"{key!r} matches {len(matches)} products, use the id")
+
+def topping_ids(catalog, names):
+    ids = []
+    for name in names:
+        if catalog.get_topping(name):
+            ids.append(name)
+            continue
+        match = next((t.id for t in catalog.toppings.values() if normalize_key(t.name) == normalize_key(name)), None)
+        if match is None:
+            raise CliError(f"unknown topping {name!r}")
+        ids.append(match)
+    return ids
+
+def split_list(text):
+    return [part.strip() for part in text.split(",") if part.strip()]
+
+def apply_fields(catalog, product, args):
+    for attr in ("name", "price", "description", "stock", "max_order", "category"):
+        value = getattr(args, attr)
+        if value is not None:
+            setattr(product, attr, value)
+    if args.toppings is not None:
+        product.toppings = topping_ids(catalog, split_list(args.toppings))
+    if args.image:
+        from .buildcache import BuildCache
+        from .images import build_image_variants
+        ensure_dirs()
+        cache = BuildCache()
+        product.variants = build_image_variants(args.image, cache=cache)
+        cache.save()
+        product.image = product.variants["card"]["fallback"]
+
+# --- Commands ---
+def cmd_list(args, store):
+    catalog = load_catalog(store)
+    products = catalog.products_in_category(args.category) if args.category is not None else catalog.products.values()
+    if args.json:
+        json.dump([p.to_dict() for p in products], sys.stdout, ensure_ascii=False, indent=2)
+        print()
+        return 0
+    for p in products:
+        print(f"{p.id}\t{p.name}\t{p.price}\t{p.stock}\t{p.category}")
+    return 0
+
+def cmd_add(args, store):
+    catalog = load_catalog(store)
+    product = Product(id=new_id())
+    apply_fields(catalog, product, args)
+    catalog.put_product(product)
+    save_catalog(store, catalog, [product.id])
+    print(product.id)
+    return 0
+
+def cmd_update(args, store):
+    catalog = load_catalog(store)
+    # Edit a copy so put_product can re-index a changed category
+    old = find_product(catalog, args.product)
+    product = dataclasses.replace(old)
+    apply_fields(catalog, product, args)
+    catalog.put_product(product)
+    save_catalog(store, catalog, [product.id])
+    release_assets(catalog, product_assets(old), store.load(STORE_FILE, {}))
+    return 0
+
+def cmd_delete(args, store):
+    catalog = load_catalog(store)
+    product = find_product(catalog, args.product)
+    catalog.remove_product(product.id)
+    save_catalog(store, catalog, [product.id])
+    release_assets(catalog, product_assets(product), store.load(STORE_FILE, {}))
+    print(f"deleted {product.id}")
+    return 0
+
+def cmd_import_images(args, store):
+    from concurrent.futures import ProcessPoolExecutor
+    from .buildcache import BuildCache
+    from .images import init_import_worker, import_image_worker, apply_import_result, match_import_images
+
+    ensure_dirs()
+    catalog = load_catalog(store)
+    matches, unmatched = match_import_images(catalog.products.values(), args.directory, args.csv)
+    for name in unmatched:
+        print(f"unmatched: {name}", file=sys.stderr)
+
+    imported = []
+    replaced = []  # asset paths of the images replaced
+    cache = BuildCache()
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_import_worker, initargs=(cache.entries,)) as executor:
+        futures = {executor.submit(import_image_worker, path): p_id for p_id, path in matches}
+        for n, (future, p_id) in enumerate(futures.items(), 1):
+            try:
+                _, variants, cache_update = future.result()
+                apply_import_result(cache, variants, cache_update)
+            except Exception as e:
+                print(f"failed: {p_id}: {e}", file=sys.stderr)
+                continue
+            old = catalog.get_product(p_id)
+            product = dataclasses.replace(old, variants=variants, image=variants["card"]["fallback"])
+            catalog.put_product(product)
+            replaced += product_assets(old)
+            imported.append(p_id)
+            print(f"[{n}/{len(futures)}] {product.name or p_id}")
+
+    cache.save()
+    print(cache.summary())
+    if imported:
+        save_catalog(store, catalog, imported)
+        release_assets(catalog, replaced, store.load(STORE_FILE, {}))
+    return 1 if len(imported) < len(matches) else 0
+
+def cmd_import_products(args, store):
+    from .importer import ProductImporter, apply_batch, open_import, validated_batches
+
+    catalog = load_catalog(store)
+    importer = ProductImporter(catalog, args.key)
+    try:
+        f, fmt = open_import(args.file)
+    except ValueError as e:
+        raise CliError(str(e)) from None
+    touched = set()
+    with f:
+        for batch in validated_batches(importer, f, fmt):
+            touched.update(apply_batch(importer, batch))
+    for error in importer.errors:
+        print(error, file=sys.stderr)
+    if importer.rejected > len(importer.errors):
+        print(f"... and {importer.rejected - len(importer.errors)} more", file=sys.stderr)
+    print(importer.summary() + (" (dry run, nothing saved)" if args.dry_run else ""))
+    if not args.dry_run and touched:
+        save_catalog(store, catalog, touched)
+    return 1 if importer.rejected else 0
+
+def cmd_search(args, store):
+    from .publish import search_index, search_products
+
+    catalog = load_catalog(store)
+    matches = search_products(search_index(catalog), args.query)
+    for p_id in matches[:args.limit]:
+        p = catalog.products[p_id]
+        print(f"{p.id}\t{p.name}\t{p.price}\t{p.stock}\t{p.category}")
+    print(f"{len(matches)} match(es)", file=sys.stderr)
+    return 0
+
+def cmd_bulk(args, store):
+    from .bulk import BULK_OPERATIONS, BulkEditError, plan_bulk_edit
+
+    catalog = load_catalog(store)
+    if args.all:
+        ids = list(catalog.products)
+    elif args.ids is not None:
+        ids = [find_product(catalog, key).id for key in split_list(args.ids)]
+    else:
+        ids = [p.id for p in catalog.products_in_category(args.in_category)]
+    op = next(op for op in BULK_OPERATIONS if getattr(args, op) is not None)
+    value = getattr(args, op)
+    if op in ("add_topping", "remove_topping"):
+        value = topping_ids(catalog, [value])[0]
+    try:
+        pairs = plan_bulk_edit(catalog, ids, op, value)
+    except BulkEditError as e:
+        raise CliError(str(e)) from None
+
+    for old, new in pairs:
+        catalog.put_product(new)
+    print(f"{BULK_OPERATIONS[op]}: {len(pairs)} of {len(ids)} product(s) changed"
+          + (" (dry run, nothing saved)" if args.dry_run else ""))
+    if args.dry_run or not pairs:
+        return 0
+    save_catalog(store, catalog, [new.id for old, new in pairs])
+    if not args.push:
+        return 0
+    return publish(store, catalog, None, args.message)
+
+def publish(store, catalog, mode=None, message=None):
+    """Build the storefront files; with a `message`, also commit and push them.
+
+    `mode` defaults to the export mode saved in store.json; another mode is
+    saved there, so later publishes (and the editor) keep building it.
+    """
+    from .buildcache import BuildCache
+    from .publish import git_publish, publish_storefront, store_export_mode, storefront_files
+
+    store_config = store.load(STORE_FILE, {})
+    if mode is None:
+        mode = store_export_mode(store_config)
+    elif mode != store_export_mode(store_config):
+        store_config["export_mode"] = mode
+        store.set(STORE_FILE, store_config)
+        store.flush()
+        print(f"export mode is now {mode!r}")
+    db = catalog_db()
+    changed = db.export_json() if db is not None else []
+    cache = BuildCache()
+    changed += publish_storefront(catalog, store_config, mode, cache)
+    cache.save()
+    print(f"{len(changed)} storefront file(s) updated ({cache.summary()})")
+    if message is None:
+        return 0
+
+    ok, status = git_publish(set(PUBLISHED_SOURCES) | set(changed) | set(storefront_files()), message)
+    print(status, file=sys.stdout if ok else sys.stderr)
+    return 0 if ok else 1
+
+def cmd_publish(args, store):
+    return publish(store, load_catalog(store), args.mode, args.message if args.push else None)
+
+def cmd_gc(args, store):
+    from .assets import collect_garbage, missing_assets
+
+    catalog = load_catalog(store)
+    store_config = store.load(STORE_FILE, {})
+    garbage = collect_garbage(catalog, store_config, dry_run=args.dry_run)
+    for path, size in garbage:
+        print(f"{'unreferenced' if args.dry_run else 'removed'}: {os.path.relpath(path)} ({size // 1024} KB)")
+    for path in missing_assets(catalog, store_config):
+        print(f"missing: {path}", file=sys.stderr)
+    total = sum(size for _, size in garbage) // 1024
+    print(f"{len(garbage)} file(s), {total} KB {'reclaimable' if args.dry_run else 'freed'}")
+    return 0
+
+def cmd_db(args, store):
+    from .catalogdb import open_catalog_db
+
+    db = open_catalog_db()
+    try:
+        if args.action == "import":
+            db.replace_all(Catalog.from_json(store.load(PRODUCTS_FILE, []), store.load(TOPPINGS_FILE, [])))
+            print(f"{args.action}: {db.path} now holds products.json and toppings.json")
+        else:
+            changed = db.export_json()
+            print(f"{len(changed)} file(s) exported")
+    finally:
+        db.close()
+    return 0
+
+def cmd_serve(args, store):
+    import asyncio
+    from .stockapi import StockService, serve
+
+    def disk_version():
+        if catalog_db() is None:
+            return file_signature(PRODUCTS_FILE)
+        return file_signature(CATALOG_DB), file_signature(CATALOG_DB + "-wal")
+
+    service = StockService(lambda: load_catalog(store), lambda catalog, ids: save_catalog(store, catalog, ids),
+                           disk_version, ttl=args.ttl)
+    def started(port):
+        print(f"stock service on http://{args.host}:{port} (Ctrl+C to stop)", flush=True)
+
+    try:
+        asyncio.run(serve(service, args.host, args.port, started))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+    return 0
+
+def cmd_gui(args, store):
+    from .admin import main as gui_main
+    return gui_main()
+
+def add_field_options(parser, name_required=False):
+    parser.add_argument("--name", type=nonblank, required=name_required)
+    parser.add_argument("--price", type=bounded(float, 0, PRICE_MAX))
+    parser.add_argument("--description")
+    parser.add_argument("--stock", type=bounded(int, 0, STOCK_MAX))
+    parser.add_argument("--max-order", dest="max_order", type=bounded(int, *MAX_ORDER_RANGE))
+    parser.add_argument("--category")
+    parser.add_argument("--toppings", help="comma separated topping ids or names (replaces the list)")
+    parser.add_argument("--image", help="image file to resize into the product's variants")
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m editor", description="BiteBabe catalog editor")
+    parser.add_argument("--trace", metavar="FILE", help="write a Chrome trace (chrome://tracing) of the command")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("list", help="list products")
+    p.add_argument("--category")
+    p.add_argument("--json", action="store_true", help="print products.json records")
+    p.set_defaults(func=cmd_list)
+
+    p = commands.add_parser("search", help="search products the way the storefront's search box does")
+    p.add_argument("query")
+    p.add_argument("--limit", type=int, default=20)
+    p.set_defaults(func=cmd_search)
+
+    p = commands.add_parser("add", help="add a product and print its id")
+    add_field_options(p, name_required=True)
+    p.set_defaults(func=cmd_add)
+
+    p = commands.add_parser("update", help="change fields of a product")
+    p.add_argument("product", help="product id or unique name")
+    add_field_options(p)
+    p.set_defaults(func=cmd_update)
+
+    p = commands.add_parser("delete", help="delete a product")
+    p.add_argument("product", help="product id or unique name")
+    p.set_defaults(func=cmd_delete)
+
+    p = commands.add_parser("import-images", help="import product images matched by file name or a CSV mapping")
+    source = p.add_mutually_exclusive_group(required=True)
+    source.add_argument("directory", nargs="?")
+    source.add_argument("--csv", help="CSV with id/name/product and image columns")
+    p.add_argument("--workers", type=int, help="worker processes (default: all cores)")
+    p.set_defaults(func=cmd_import_images)
+
+    p = commands.add_parser("import-products", help="create/update products from a CSV or JSON-lines file")
+    p.add_argument("file", help="CSV with a header row, or one JSON object per line (.jsonl)")
+    p.add_argument("--key", default="id", help="column matching rows to existing products: id, name or e.g. sku (default: id)")
+    p.add_argument("--dry-run", action="store_true", help="validate and report without saving")
+    p.set_defaults(func=cmd_import_products)
+
+    p = commands.add_parser("bulk", help="apply one change to many products with a single save")
+    scope = p.add_mutually_exclusive_group(required=True)
+    scope.add_argument("--category", dest="in_category", metavar="CATEGORY", help="products in this category")
+    scope.add_argument("--ids", help="comma separated product ids or unique names")
+    scope.add_argument("--all", action="store_true", help="every product")
+    op = p.add_mutually_exclusive_group(required=True)
+    op.add_argument("--set-price", dest="set_price", type=bounded(float, 0, PRICE_MAX))
+    op.add_argument("--scale-price", dest="scale_price", metavar="PERCENT", type=bounded(float, -90, 500),
+                    help="raise (or with a minus sign lower) prices by PERCENT")
+    op.add_argument("--set-stock", dest="set_stock", type=bounded(int, 0, STOCK_MAX))
+    op.add_argument("--add-topping", dest="add_topping", metavar="TOPPING")
+    op.add_argument("--remove-topping", dest="remove_topping", metavar="TOPPING")
+    op.add_argument("--set-category", dest="set_category", metavar="CATEGORY")
+    p.add_argument("--dry-run", action="store_true", help="report how many products would change without saving")
+    p.add_argument("--push", action="store_true", help="publish and commit the change as one commit")
+    p.add_argument("-m", "--message", default="Bulk edit from BiteBabe CLI")
+    p.set_defaults(func=cmd_bulk)
+
+    p = commands.add_parser("publish", help="build storefront files, optionally commit and push")
+    p.add_argument("--mode", choices=list(EXPORT_MODES),
+                   help=f"what to build; saved in store.json for later publishes (default: the saved mode, else {DEFAULT_EXPORT_MODE})")
+    p.add_argument("--push", action="store_true", help="commit and push the changed files")
+    p.add_argument("-m", "--message", default="Update catalog from BiteBabe CLI")
+    p.set_defaults(func=cmd_publish)
+
+    p = commands.add_parser("gc", help="remove product images no product refers to")
+    p.add_argument("--dry-run", action="store_true", help="only report what would be removed")
+    p.set_defaults(func=cmd_gc)
+
+    p = commands.add_parser("db", help="sync the SQLite catalog (BITEBABE_BACKEND=sqlite) with the JSON files")
+    p.add_argument("action", choices=["import", "export"],
+                   help="import: replace the database with products.json/toppings.json; export: write them from it")
+    p.set_defaults(func=cmd_db)
+
+    p = commands.add_parser("serve", help="run the local stock/reservation API for the storefront")
+    p.add_argument("--host", default=STOCK_API_HOST)
+    p.add_argument("--port", type=int, default=STOCK_API_PORT)
+    p.add_argument("--ttl", type=bounded(int, 1, 24 * 3600), default=RESERVATION_TTL,
+                   help=f"seconds a cart reservation holds stock (default: {RESERVATION_TTL})")
+    p.set_defaults(func=cmd_serve)
+
+    p = commands.add_parser("gui", help="start the editor GUI")
+    p.set_defaults(func=cmd_gui)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.trace:
+        tracer.enabled = True
+    try:
+        with span(f"cli.{args.command}"):
+            return args.func(args, DataStore())
+    except (CliError, DataFileError, OSError, sqlite3.Error) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if args.trace:
+            print(f"{tracer.save(args.trace)} span(s) written to {args.trace}", file=sys.stderr)
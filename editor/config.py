@@ -0,0 +1,81 @@
+"""Paths and settings shared by the editor GUI and the command line"""
+import os
+
+# Paths
+EDITOR_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(EDITOR_DIR)  # Parent of 'editor' folder
+DATA_DIR = os.path.join(PROJECT_DIR, "data")
+ASSETS_DIR = os.path.join(PROJECT_DIR, "assets")
+PRODUCTS_DIR = os.path.join(ASSETS_DIR, "products")
+PRODUCTS_FILE = os.path.join(DATA_DIR, "products.json")
+TOPPINGS_FILE = os.path.join(DATA_DIR, "toppings.json")
+STORE_FILE = os.path.join(DATA_DIR, "store.json")
+LOGO_TARGET = os.path.join(ASSETS_DIR, "logo.png")
+FAVICON_TARGET = os.path.join(ASSETS_DIR, "favicon.png")
+BACKUP_DIR = os.path.join(DATA_DIR, ".backup")
+# Storefront publish output: MANIFEST_FILE names the current bundle and/or shard index
+MANIFEST_FILE = os.path.join(DATA_DIR, "manifest.json")
+SHARDS_DIR = os.path.join(DATA_DIR, "shards")
+# Local derived files (previews etc.), never published
+CACHE_DIR = os.path.join(PROJECT_DIR, ".cache")
+BUILD_CACHE_FILE = os.path.join(CACHE_DIR, "build.json")
+THUMBNAIL_CACHE_DIR = os.path.join(CACHE_DIR, "thumbs")
+# SQLite catalog (not published; products.json/toppings.json are exported from it)
+CATALOG_DB = os.path.join(DATA_DIR, "catalog.db")
+
+# Files the editor manages; staged by a publish when they changed
+PUBLISHED_SOURCES = [PRODUCTS_FILE, TOPPINGS_FILE, STORE_FILE, PRODUCTS_DIR, LOGO_TARGET, FAVICON_TARGET]
+
+# Product image variants: name -> max edge in px (card grid, product modal, cart thumbnail)
+IMAGE_VARIANTS = {
+    "card": 600,
+    "modal": 300,
+    "thumb": 100,
+}
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+WEBP_QUALITY = 80
+JPEG_QUALITY = 85
+
+# Branding: square logo canvas and favicon size, in px
+LOGO_SIZE = 512
+FAVICON_SIZE = 64
+LOGO_BACKGROUND = (255, 232, 241, 255)  # Soft pink
+
+# Where the catalog is edited: "json" rewrites products.json/toppings.json,
+# "sqlite" makes point updates to CATALOG_DB and exports the JSON files on publish
+CATALOG_BACKENDS = ("json", "sqlite")
+CATALOG_BACKEND = os.environ.get("BITEBABE_BACKEND", "json")
+
+# Write data files minified (smaller published copy, but noisier git diffs)
+COMPACT_JSON = False
+
+# Local stock service (python -m editor serve): address, how long a cart hold
+# lasts and how soon sales are written back to the data files, in s
+STOCK_API_HOST = "127.0.0.1"
+STOCK_API_PORT = 8765
+RESERVATION_TTL = 15 * 60
+STOCK_WRITE_DELAY = 1.0
+
+# Storefront export modes and products per category shard page
+EXPORT_MODES = {"bundle": "Single bundle", "shards": "Category shards", "both": "Bundle + shards"}
+DEFAULT_EXPORT_MODE = "bundle"
+SHARD_PAGE_SIZE = 24
+# Storefront search index: completions kept per typed prefix (the most common words)
+SEARCH_COMPLETIONS = 8
+
+# Field limits, shared by the product form and command line validation
+PRICE_MAX = 1000000
+TOPPING_PRICE_MAX = 100000
+STOCK_MAX = 1000
+MAX_ORDER_RANGE = (1, 100)
+
+def catalog_backend_error():
+    """Why CATALOG_BACKEND can't be used, or None; the CLI and the editor both refuse to start on it"""
+    if CATALOG_BACKEND not in CATALOG_BACKENDS:
+        return f"unknown BITEBABE_BACKEND {CATALOG_BACKEND!r} (use {' or '.join(CATALOG_BACKENDS)})"
+    return None
+
+def ensure_dirs():
+    os.makedirs(DATA_DIR, exist_ok=True)
+    os.makedirs(ASSETS_DIR, exist_ok=True)
+    os.makedirs(PRODUCTS_DIR, exist_ok=True)
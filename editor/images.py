@@ -0,0 +1,195 @@
+"""Product image variants, branding assets and bulk image matching.
+
+Pillow is imported inside the functions that need it, so importing this module
+(e.g. from the command line) stays cheap.
+"""
+import csv
+import hashlib
+import os
+
+from .catalog import normalize_key
+from .config import (PROJECT_DIR, PRODUCTS_DIR, LOGO_TARGET, FAVICON_TARGET, IMAGE_VARIANTS, IMAGE_EXTENSIONS,
+                     WEBP_QUALITY, JPEG_QUALITY, LOGO_SIZE, FAVICON_SIZE, LOGO_BACKGROUND)
+from .timing import traced
+
+def file_hash(path, length=12):
+    """Short sha256 hex digest of a file's contents"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            h.update(chunk)
+    return h.hexdigest()[:length]
+
+def variants_cache_entry(src_path, out_dir=PRODUCTS_DIR):
+    """Build cache key and inputs (source hash + encode settings) for an image's variants"""
+    digest = file_hash(src_path)
+    inputs = {"source": digest, "dir": os.path.relpath(out_dir, PROJECT_DIR).replace(os.sep, "/"),
+              "sizes": IMAGE_VARIANTS, "webp": WEBP_QUALITY, "jpeg": JPEG_QUALITY}
+    return f"variants/{digest}", inputs
+
+def variant_files(variants):
+    return [os.path.join(PROJECT_DIR, v[key]) for v in variants.values() for key in ("webp", "fallback")]
+
+def preview_source(variants, image, edge):
+    """Smallest stored file that still covers `edge` px: a variant fallback if
+    there is one big enough, else the product's image. Returns an absolute
+    path, or None for a product without an image."""
+    sizes = sorted((IMAGE_VARIANTS[name], v["fallback"]) for name, v in variants.items() if name in IMAGE_VARIANTS)
+    path = next((p for size, p in sizes if size >= edge), sizes[-1][1] if sizes else image)
+    return os.path.join(PROJECT_DIR, path) if path else None
+
+@traced("images.build_image_variants")
+def build_image_variants(src_path, out_dir=PRODUCTS_DIR, cache=None):
+    """Resize an uploaded image into every IMAGE_VARIANTS size as WebP plus a PNG/JPEG fallback.
+
+    Files are named by the source content hash, so the same photo always maps to
+    the same files. With a BuildCache, an image already built with the current
+    settings is not decoded at all. Returns the variants map stored on the
+    product entry, with paths relative to PROJECT_DIR.
+    """
+    key, inputs = variants_cache_entry(src_path, out_dir)
+    if cache is not None:
+        entry = cache.get(key, inputs)
+        if entry:
+            return entry["result"]
+
+    variants = encode_variants(src_path, out_dir, inputs)
+    if cache is not None:
+        cache.put(key, inputs, variants, variant_files(variants))
+    return variants
+
+@traced("images.encode_variants")
+def encode_variants(src_path, out_dir, inputs):
+    from PIL import Image
+
+    digest = inputs["source"]
+    rel_dir = inputs["dir"]
+
+    with Image.open(src_path) as src:
+        src.load()
+        has_alpha = src.mode in ("RGBA", "LA") or (src.mode == "P" and "transparency" in src.info)
+        img = src.convert("RGBA" if has_alpha else "RGB")
+
+    fallback_ext, fallback_format = ("png", "PNG") if has_alpha else ("jpg", "JPEG")
+    variants = {}
+    for name, edge in IMAGE_VARIANTS.items():
+        resized = img.copy()
+        resized.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+
+        webp_name = f"{digest}_{name}.webp"
+        fallback_name = f"{digest}_{name}.{fallback_ext}"
+        resized.save(os.path.join(out_dir, webp_name), "WEBP", quality=WEBP_QUALITY, method=6)
+        if fallback_format == "JPEG":
+            resized.save(os.path.join(out_dir, fallback_name), "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+        else:
+            resized.save(os.path.join(out_dir, fallback_name), "PNG", optimize=True)
+
+        variants[name] = {
+            "webp": f"{rel_dir}/{webp_name}",
+            "fallback": f"{rel_dir}/{fallback_name}",
+            "width": resized.width,
+            "height": resized.height,
+        }
+    return variants
+
+# Bulk imports: workers check a read-only snapshot of the build cache and hand
+# new entries back, so only the parent process writes the cache file
+_worker_cache = None
+
+def init_import_worker(cache_entries):
+    """Process pool initializer for import_image_worker"""
+    global _worker_cache
+    from .buildcache import BuildCache
+    _worker_cache = BuildCache(entries=cache_entries)
+
+def import_image_worker(src_path):
+    """Process pool entry point: returns (src_path, variants, cache_update).
+
+    cache_update is None on a cache hit, else the (key, inputs) the parent
+    should record with apply_import_result.
+    """
+    key, inputs = variants_cache_entry(src_path)
+    entry = _worker_cache.get(key, inputs) if _worker_cache is not None else None
+    if entry:
+        return src_path, entry["result"], None
+    return src_path, encode_variants(src_path, PRODUCTS_DIR, inputs), (key, inputs)
+
+def apply_import_result(cache, variants, cache_update):
+    """Count a worker's hit/miss on the parent's cache and record new entries"""
+    if cache_update is None:
+        cache.hits += 1
+    else:
+        cache.misses += 1
+        cache.put(*cache_update, variants, variant_files(variants))
+
+def match_import_images(products, directory=None, mapping_csv=None):
+    """Pair image files with products by id or name.
+
+    With a directory, each image's file name (without extension) is matched. With a
+    CSV mapping file, each row names a product (`id`, `name` or `product` column) and
+    an `image` path, relative to the CSV's folder. Returns (matches, unmatched) where
+    matches is a list of (product_id, image_path).
+    """
+    by_key = {}
+    for p in products:
+        if p.name:
+            by_key.setdefault(normalize_key(p.name), p.id)
+    for p in products:
+        by_key[normalize_key(p.id)] = p.id
+
+    pairs = []
+    if mapping_csv:
+        base_dir = os.path.dirname(os.path.abspath(mapping_csv))
+        with open(mapping_csv, newline='', encoding='utf-8-sig') as f:
+            for row in csv.DictReader(f):
+                key = row.get('id') or row.get('name') or row.get('product') or ""
+                image = (row.get('image') or "").strip()
+                if image:
+                    pairs.append((key, os.path.join(base_dir, image)))
+    else:
+        for filename in sorted(os.listdir(directory)):
+            stem, ext = os.path.splitext(filename)
+            if ext.lower() in IMAGE_EXTENSIONS:
+                pairs.append((stem, os.path.join(directory, filename)))
+
+    matches, unmatched = [], []
+    for key, path in pairs:
+        p_id = by_key.get(normalize_key(key))
+        if p_id and os.path.isfile(path):
+            matches.append((p_id, path))
+        else:
+            unmatched.append(os.path.basename(path))
+    return matches, unmatched
+
+@traced("images.build_branding")
+def build_branding(src_path, logo_target=LOGO_TARGET, favicon_target=FAVICON_TARGET, cache=None):
+    """Center an uploaded logo on a square LOGO_SIZE canvas and derive the favicon from it.
+
+    Returns the files written; with a BuildCache, re-uploading the logo the
+    current files were built from writes nothing.
+    """
+    inputs = {"source": file_hash(src_path), "size": LOGO_SIZE, "favicon": FAVICON_SIZE,
+              "background": list(LOGO_BACKGROUND)}
+    if cache is not None and cache.get("branding", inputs):
+        return []
+
+    from PIL import Image
+
+    img = Image.open(src_path).convert("RGBA")
+    canvas = Image.new("RGBA", (LOGO_SIZE, LOGO_SIZE), LOGO_BACKGROUND)
+
+    # Resize and center
+    img.thumbnail((LOGO_SIZE * 0.8, LOGO_SIZE * 0.8), Image.Resampling.LANCZOS)
+    x = (LOGO_SIZE - img.width) // 2
+    y = (LOGO_SIZE - img.height) // 2
+    canvas.paste(img, (x, y), img)
+    canvas.save(logo_target, "PNG", optimize=True)
+
+    fav = canvas.copy()
+    fav.thumbnail((FAVICON_SIZE, FAVICON_SIZE), Image.Resampling.LANCZOS)
+    fav.save(favicon_target, "PNG", optimize=True)
+
+    if cache is not None:
+        cache.put("branding", inputs, None, [logo_target, favicon_target])
+    return [logo_target, favicon_target]
+
@@ -0,0 +1,213 @@
+"""Bulk product import from CSV or JSON-lines files.
+
+Rows are streamed one at a time, validated against the same limits as the
+product form and upserted by a key column, so memory stays flat however long
+the supplier's price list is. Validation needs only a read-only topping
+lookup and can run on a worker thread; apply() must run wherever the catalog
+is owned (the GUI thread in the editor).
+"""
+import csv
+import dataclasses
+import json
+import os
+import threading
+
+from .catalog import Product, normalize_key, stable_id
+from .config import PRICE_MAX, STOCK_MAX, MAX_ORDER_RANGE
+
+IMPORT_EXTENSIONS = (".csv", ".jsonl", ".ndjson")
+IMPORT_FIELDS = ("id", "name", "price", "description", "stock", "max_order", "category", "toppings")
+# Only the first errors are kept for the report; the rest are just counted
+MAX_REPORTED_ERRORS = 100
+
+class RowError(ValueError):
+    def __init__(self, line, message):
+        super().__init__(f"line {line}: {message}")
+        self.line = line
+
+def read_rows(f, fmt):
+    """Yield (line number, row dict) from an open text file, one row at a time.
+
+    A malformed JSON line is yielded as a RowError instead of a dict, so one bad
+    line doesn't end the import.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(f)
+        for row in reader:
+            # Blank cells mean "leave unchanged", like an omitted JSON key
+            yield reader.line_num, {k.strip(): v.strip() for k, v in row.items()
+                                    if k and isinstance(v, str) and v.strip()}
+        return
+    for line, text in enumerate(f, 1):
+        if not text.strip():
+            continue
+        try:
+            row = json.loads(text)
+        except ValueError as e:
+            yield line, RowError(line, f"invalid JSON ({e})")
+            continue
+        if not isinstance(row, dict):
+            yield line, RowError(line, "expected a JSON object")
+            continue
+        yield line, {k: v for k, v in row.items() if v is not None and v != ""}
+
+def import_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in IMPORT_EXTENSIONS:
+        raise ValueError(f"unsupported import file {os.path.basename(path)!r} (use {', '.join(IMPORT_EXTENSIONS)})")
+    return "csv" if ext == ".csv" else "jsonl"
+
+def open_import(path):
+    """Open an import file for read_rows; returns (file, format)"""
+    fmt = import_format(path)
+    return open(path, encoding="utf-8-sig", newline="" if fmt == "csv" else None), fmt
+
+def parse_number(kind, value, low, high, field):
+    try:
+        number = float(value)
+        if kind is int:
+            if not number.is_integer():
+                raise ValueError
+            number = int(number)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} must be {'a whole number' if kind is int else 'a number'}, got {value!r}") from None
+    if not low <= number <= high:
+        raise ValueError(f"{field} must be between {low} and {high}, got {value!r}")
+    return number
+
+class ProductImporter:
+    """Validates rows and upserts them into `catalog` by `key`.
+
+    `key` is "id", "name" or any other column (kept on the product as an extra
+    field, e.g. a supplier "sku"). New products get an id derived from the key
+    value, so importing the same file twice never creates duplicates.
+    """
+    def __init__(self, catalog, key="id"):
+        self.catalog = catalog
+        self.key = key
+        self.topping_ids = {}
+        for t in catalog.toppings.values():
+            self.topping_ids[normalize_key(t.name)] = t.id
+        for t_id in catalog.toppings:
+            self.topping_ids[normalize_key(t_id)] = t_id
+        self.index = {}
+        for p in catalog.products.values():
+            value = self.key_value(p)
+            if value:
+                self.index[self.index_key(value)] = p.id
+        self.created = 0
+        self.updated = 0
+        self.rejected = 0
+        self.errors = []
+        self.lock = threading.Lock()  # rows are rejected from both threads
+
+    def key_value(self, product):
+        if self.key in ("id", "name"):
+            return getattr(product, self.key)
+        return product.extra.get(self.key)
+
+    def index_key(self, value):
+        # Names match loosely, like everywhere else; ids and codes exactly
+        return normalize_key(value) if self.key == "name" else str(value).strip()
+
+    def validate(self, line, row):
+        """Checked, converted fields of one row; raises RowError"""
+        key_value = row.get(self.key)
+        if key_value is None or not str(key_value).strip():
+            raise RowError(line, f"missing {self.key!r}")
+        record = {}
+        try:
+            for name, value in row.items():
+                if name == "price":
+                    record[name] = round(parse_number(float, value, 0, PRICE_MAX, name), 2)
+                elif name == "stock":
+                    record[name] = parse_number(int, value, 0, STOCK_MAX, name)
+                elif name == "max_order":
+                    record[name] = parse_number(int, value, *MAX_ORDER_RANGE, name)
+                elif name == "toppings":
+                    record[name] = self.resolve_toppings(value)
+                elif isinstance(value, (str, int, float)):
+                    record[name] = str(value).strip()
+                elif name in IMPORT_FIELDS:
+                    raise ValueError(f"{name} must be text, got {type(value).__name__}")
+                else:
+                    record[name] = value  # kept as-is in the product's extra fields
+        except ValueError as e:
+            raise RowError(line, str(e)) from None
+        return record
+
+    def resolve_toppings(self, value):
+        names = value if isinstance(value, list) else str(value).split(",")
+        ids = []
+        for name in names:
+            name = str(name).strip()
+            if not name:
+                continue
+            t_id = self.topping_ids.get(normalize_key(name))
+            if t_id is None:
+                raise ValueError(f"unknown topping {name!r}")
+            ids.append(t_id)
+        return ids
+
+    def reject(self, error):
+        with self.lock:
+            self.rejected += 1
+            if len(self.errors) < MAX_REPORTED_ERRORS:
+                self.errors.append(str(error))
+
+    def apply(self, record):
+        """Upsert one validated record; returns the product id"""
+        key = self.index_key(record[self.key])
+        p_id = self.index.get(key)
+        old = self.catalog.get_product(p_id) if p_id else None
+        if old is None and "id" in record:
+            old = self.catalog.get_product(record["id"])
+
+        known = {f.name for f in dataclasses.fields(Product)} - {"extra"}
+        fields = {k: v for k, v in record.items() if k in known}
+        extra = {k: v for k, v in record.items() if k not in known}
+        if old is not None:
+            fields.pop("id", None)
+            product = dataclasses.replace(old, **fields, extra={**old.extra, **extra})
+            self.updated += 1
+        else:
+            if not fields.get("name"):
+                raise ValueError(f"new product {record[self.key]!r} has no name")
+            fields.setdefault("id", stable_id(self.key, key))
+            product = Product(**fields, extra=extra)
+            self.created += 1
+        self.catalog.put_product(product)
+        self.index[key] = product.id
+        return product.id
+
+    def summary(self):
+        return f"{self.created} created, {self.updated} updated, {self.rejected} rejected"
+
+def validated_batches(importer, f, fmt, batch_size=500, cancelled=None):
+    """Stream (line, record) batches of valid rows from `f`; invalid rows are
+    recorded on `importer` and skipped. Stops early once `cancelled()` is true."""
+    batch = []
+    for line, row in read_rows(f, fmt):
+        try:
+            if isinstance(row, RowError):
+                raise row
+            batch.append((line, importer.validate(line, row)))
+        except RowError as e:
+            importer.reject(e)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+            if cancelled is not None and cancelled():
+                return
+    if batch:
+        yield batch
+
+def apply_batch(importer, batch):
+    """Upsert a batch from validated_batches; returns the product ids touched"""
+    ids = []
+    for line, record in batch:
+        try:
+            ids.append(importer.apply(record))
+        except ValueError as e:
+            importer.reject(RowError(line, str(e)))
+    return ids
@@ -0,0 +1,260 @@
+"""Load test for the stock service: python -m editor.loadtest
+
+By default starts a local instance (in its own process, on a free port) over a
+synthetic catalog in a temporary directory, so the real data files are never
+touched. Two scenarios run against it:
+
+  contention  --clients customers race to hold and then buy the same product,
+              which has --stock units; exactly that many must succeed
+  mixed       for --duration seconds, every client polls availability
+              (/stock?since= and /stock/<id> with If-None-Match) and buys
+              random products
+
+Throughput, latency percentiles and status counts are printed. Afterwards the
+availability the service reports (and, for the local instance, the stock
+written back to products.json) is checked against the sales made; the exit
+status is 1 if anything was oversold or lost.
+
+With --url an already running service is tested instead. This really sells
+stock, so only point it at a test instance.
+"""
+import argparse
+import asyncio
+import functools
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from .catalogdb import CatalogDB, open_catalog_db
+from .config import CATALOG_BACKENDS
+from .stockapi import STOCK_SNAPSHOT_MAX_AGE
+from .storage import read_json, write_json
+
+CONTESTED = "prod_0"
+
+class Connection:
+    """One keep-alive HTTP/1.1 client connection (just enough for the JSON API)"""
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, data=None, headers=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        body = json.dumps(data).encode('utf-8') if data is not None else b""
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}", f"Content-Length: {len(body)}"]
+        lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1') + body)
+
+        status = int((await self.reader.readline()).split()[1])
+        response_headers = {}
+        while (line := await self.reader.readline()) not in (b"\r\n", b""):
+            name, _, value = line.decode('latin-1').partition(":")
+            response_headers[name.strip().lower()] = value.strip()
+        length = int(response_headers.get("content-length", 0))
+        payload = await self.reader.readexactly(length) if length else b""
+        if response_headers.get("connection") == "close":
+            self.close()
+        return status, response_headers, json.loads(payload) if payload else None
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+class Stats:
+    def __init__(self):
+        self.latencies = {}  # operation -> [ms]
+        self.statuses = Counter()
+
+    async def timed(self, name, request):
+        start = time.perf_counter()
+        status, headers, data = await request
+        self.latencies.setdefault(name, []).append((time.perf_counter() - start) * 1000)
+        self.statuses[f"{name} {status}"] += 1
+        return status, headers, data
+
+    def report(self, elapsed):
+        total = sum(len(v) for v in self.latencies.values())
+        print(f"  {total} requests in {elapsed:.2f}s: {total / elapsed:.0f} req/s")
+        for name, runs in sorted(self.latencies.items()):
+            runs.sort()
+            p50, p95, p99 = (runs[min(len(runs) - 1, int(q * len(runs)))] for q in (0.5, 0.95, 0.99))
+            print(f"  {name:<22} n={len(runs):<7} p50={p50:.2f}ms p95={p95:.2f}ms p99={p99:.2f}ms max={runs[-1]:.2f}ms")
+        print("  statuses: " + ", ".join(f"{k}: {v}" for k, v in sorted(self.statuses.items())))
+
+async def contention(host, port, clients, product):
+    """Every client holds one unit of `product`, then buys it; returns units sold"""
+    stats = Stats()
+    connections = [Connection(host, port) for _ in range(clients)]
+    gate = asyncio.Event()
+
+    async def customer(conn):
+        await gate.wait()
+        status, _, data = await stats.timed("reserve", conn.request("POST", "/reservations", {"items": [{"id": product, "qty": 1}]}))
+        if status != 201:
+            return 0
+        status, _, _ = await stats.timed("commit", conn.request("POST", f"/reservations/{data['reservation']}/commit"))
+        return 1 if status == 200 else 0
+
+    tasks = [asyncio.create_task(customer(conn)) for conn in connections]
+    await asyncio.sleep(0.1)  # let every customer get to the gate
+    start = time.perf_counter()
+    gate.set()
+    sold = sum(await asyncio.gather(*tasks))
+    elapsed = time.perf_counter() - start
+    for conn in connections:
+        conn.close()
+    stats.report(elapsed)
+    return sold
+
+async def mixed(host, port, clients, duration, product_ids, version):
+    """Clients poll availability (revalidating with ETags) and buy at random; returns units sold per product"""
+    stats = Stats()
+    sold = Counter()
+    deadline = time.perf_counter() + duration
+
+    async def client(seed, version):
+        rng = random.Random(seed)
+        conn = Connection(host, port)
+        etags = {}
+        while time.perf_counter() < deadline:
+            roll = rng.random()
+            if roll < 0.7:
+                path = f"/stock/{rng.choice(product_ids)}"
+                headers = {"If-None-Match": etags[path]} if path in etags else {}
+                status, response_headers, _ = await stats.timed("GET /stock/<id>", conn.request("GET", path, headers=headers))
+                if "etag" in response_headers:
+                    etags[path] = response_headers["etag"]
+            elif roll < 0.8:
+                status, _, data = await stats.timed("GET /stock?since", conn.request("GET", f"/stock?since={version}"))
+                version = data["version"]
+            else:
+                p_id = rng.choice(product_ids)
+                status, _, _ = await stats.timed("decrement", conn.request("POST", "/decrement", {"items": [{"id": p_id, "qty": 1}]}))
+                if status == 200:
+                    sold[p_id] += 1
+        conn.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(i, version) for i in range(clients)))
+    stats.report(time.perf_counter() - start)
+    return sold
+
+async def run(host, port, args):
+    conn = Connection(host, port)
+    _, _, data = await conn.request("GET", "/stock")
+    before, version = data["stock"], data["version"]
+    conn.close()
+    if args.product not in before:
+        raise SystemExit(f"error: no product {args.product!r} on the service")
+
+    print(f"contention: {args.clients} clients, {before[args.product]} units of {args.product}")
+    contested = await contention(host, port, args.clients, args.product)
+    expected_sold = min(before[args.product], args.clients)
+    ok = contested == expected_sold
+    print(f"  sold {contested} (expected {expected_sold})" + ("" if ok else "  <-- WRONG"))
+
+    print(f"mixed: {args.clients} clients for {args.duration}s over {len(before)} products")
+    sold = await mixed(host, port, args.clients, args.duration, list(before), version)
+    sold[args.product] += contested
+
+    await asyncio.sleep(STOCK_SNAPSHOT_MAX_AGE)  # the full map may lag by this much
+    conn = Connection(host, port)
+    _, _, data = await conn.request("GET", "/stock")
+    after = data["stock"]
+    conn.close()
+    wrong = {p_id: (before[p_id], sold[p_id], after[p_id]) for p_id in before if after[p_id] != before[p_id] - sold[p_id]}
+    oversold = [p_id for p_id in sold if sold[p_id] > before[p_id]]
+    print(f"check: {sum(sold.values())} units sold, {len(oversold)} product(s) oversold, "
+          f"{len(wrong)} with unexpected availability")
+    for p_id, (was, n, now) in list(wrong.items())[:10]:
+        print(f"  {p_id}: {was} available, {n} sold, now {now}")
+    return ok and not wrong and not oversold, before, sold
+
+def serve_local(work_dir, backend, ready):
+    """Child process: the stock service over the synthetic catalog in `work_dir`"""
+    from .catalog import Catalog
+    from .stockapi import StockService, serve
+    from .storage import file_signature
+
+    products_file = os.path.join(work_dir, "products.json")
+    toppings_file = os.path.join(work_dir, "toppings.json")
+    db_file = os.path.join(work_dir, "catalog.db")
+    if backend == "sqlite":
+        # Opened on first use, i.e. on the service's I/O thread
+        database = functools.lru_cache(maxsize=None)(lambda: open_catalog_db(db_file, products_file, toppings_file))
+        service = StockService(
+            lambda: database().load(),
+            lambda catalog, ids: database().save(catalog, ids),
+            lambda: (file_signature(db_file), file_signature(db_file + "-wal")))
+    else:
+        service = StockService(
+            lambda: Catalog.from_json(read_json(products_file, []), read_json(toppings_file, [])),
+            lambda catalog, ids: write_json(products_file, catalog.products_json()),
+            lambda: file_signature(products_file))
+    try:
+        asyncio.run(serve(service, "127.0.0.1", 0, ready.send))
+    except asyncio.CancelledError:
+        pass
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m editor.loadtest", description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="test a running service instead of a local one, e.g. http://127.0.0.1:8765")
+    parser.add_argument("--clients", type=int, default=200, help="concurrent clients (default: 200)")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds of mixed load (default: 5)")
+    parser.add_argument("--products", type=int, default=1000, help="products in the local synthetic catalog (default: 1000)")
+    parser.add_argument("--stock", type=int, default=50, help=f"units of {CONTESTED} in the local catalog (default: 50)")
+    parser.add_argument("--product", default=CONTESTED, help="product the contention scenario fights over")
+    parser.add_argument("--backend", choices=CATALOG_BACKENDS, default="json", help="how the local instance stores stock")
+    args = parser.parse_args(argv)
+
+    if args.url:
+        url = urlsplit(args.url)
+        ok, _, _ = asyncio.run(run(url.hostname, url.port or 80, args))
+        return 0 if ok else 1
+
+    from .bench import synthetic_catalog
+
+    with tempfile.TemporaryDirectory(prefix="bitebabe-loadtest-") as work_dir:
+        catalog = synthetic_catalog(args.products, 50)
+        products = catalog.products_json()
+        for p in products:
+            if p["id"] == args.product:
+                p.update(stock=args.stock, max_order=1)
+        products_file = os.path.join(work_dir, "products.json")
+        write_json(products_file, products)
+        write_json(os.path.join(work_dir, "toppings.json"), catalog.toppings_json())
+
+        receive, ready = multiprocessing.Pipe(duplex=False)
+        server = multiprocessing.Process(target=serve_local, args=(work_dir, args.backend, ready), daemon=True)
+        server.start()
+        if not receive.poll(30):
+            raise SystemExit("error: the local stock service did not start")
+        port = receive.recv()
+        try:
+            ok, before, sold = asyncio.run(run("127.0.0.1", port, args))
+        finally:
+            server.terminate()  # SIGTERM: the service writes pending sales and exits
+            server.join(10)
+
+        # Every sale must have been written once the service stopped
+        if args.backend == "sqlite":
+            db = CatalogDB(os.path.join(work_dir, "catalog.db"))
+            written = {p.id: p.stock for p in db.products()}
+            db.close()
+        else:
+            written = {p["id"]: p["stock"] for p in read_json(products_file, [])}
+        lost = {p_id: n for p_id, n in sold.items() if written[p_id] != before[p_id] - n}
+        print(f"write-back: {len(sold)} product(s) sold, {len(lost)} with wrong stock in the {args.backend} catalog")
+        return 0 if ok and not lost else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
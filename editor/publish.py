@@ -0,0 +1,329 @@
+"""Storefront outputs (bundle, category shards) and publishing them with git"""
+import gzip
+import hashlib
+import os
+import re
+import subprocess
+import unicodedata
+
+from .catalog import normalize_key
+from .config import (DATA_DIR, SHARDS_DIR, MANIFEST_FILE, PROJECT_DIR, PRODUCTS_FILE, TOPPINGS_FILE, STORE_FILE,
+                     EXPORT_MODES, DEFAULT_EXPORT_MODE, SHARD_PAGE_SIZE, SEARCH_COMPLETIONS)
+from .images import file_hash
+from .storage import dump_json, read_json, write_bytes, write_json
+from .timing import span, traced
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+def storefront_product(catalog, product):
+    """Product JSON for the storefront, with its topping records inlined"""
+    data = product.to_dict()
+    data["toppings"] = [catalog.toppings[t_id].to_dict() for t_id in product.toppings if t_id in catalog.toppings]
+    return data
+
+def product_summary(product):
+    """Just enough of a product to render its card"""
+    summary = {"id": product.id, "name": product.name, "price": product.price,
+               "category": product.category, "image": product.image}
+    if "card" in product.variants:
+        summary["variants"] = {"card": product.variants["card"]}
+    return summary
+
+def write_hashed_json(out_dir, stem, data, compress=False):
+    """Write minified `data` as <stem>.<hash>.json unless that exact file exists.
+
+    Returns (filename, paths written). With `compress`, .gz (and .br when brotli
+    is installed) siblings are written as well.
+    """
+    payload = dump_json(data, compact=True).encode('utf-8')
+    filename = f"{stem}.{hashlib.sha256(payload).hexdigest()[:12]}.json"
+    path = os.path.join(out_dir, filename)
+    if os.path.exists(path):
+        return filename, []
+
+    write_bytes(path, payload)
+    written = [path]
+    if compress:
+        write_bytes(path + ".gz", gzip.compress(payload, 9, mtime=0))
+        written.append(path + ".gz")
+        if brotli is not None:
+            write_bytes(path + ".br", brotli.compress(payload, quality=11))
+            written.append(path + ".br")
+    return filename, written
+
+def remove_stale(out_dir, pattern, keep):
+    """Delete files in `out_dir` matching `pattern` whose name isn't in `keep` (or a .gz/.br of it)"""
+    removed = []
+    for filename in os.listdir(out_dir):
+        base = re.sub(r"\.(gz|br)$", "", filename)
+        if re.fullmatch(pattern, base) and base not in keep:
+            os.remove(os.path.join(out_dir, filename))
+            removed.append(os.path.join(out_dir, filename))
+    return removed
+
+@traced("publish.bundle")
+def build_storefront_bundle(catalog, store_config, manifest, out_dir=DATA_DIR):
+    """Write the single-request storefront catalog.<hash>.json (+ .gz/.br).
+
+    Holds the store config and every product with toppings inlined. Older
+    bundles are removed. Records the bundle in `manifest` and returns every
+    path written or removed, for the git publisher.
+    """
+    products = [storefront_product(catalog, p) for p in catalog.products.values()]
+    bundle_name, changed = write_hashed_json(out_dir, "catalog", {"store": store_config, "products": products}, compress=True)
+    manifest["bundle"] = os.path.join(out_dir, bundle_name)
+    manifest["bytes"] = os.path.getsize(manifest["bundle"])
+    changed += remove_stale(out_dir, r"catalog\.[0-9a-f]+\.json", {bundle_name})
+    return changed
+
+def category_slug(category, taken):
+    slug = re.sub(r"[^a-z0-9]+", "-", normalize_key(category)).strip("-") or "uncategorized"
+    unique, n = slug, 2
+    while unique in taken:
+        unique, n = f"{slug}-{n}", n + 1
+    taken.add(unique)
+    return unique
+
+@traced("publish.shards")
+def build_catalog_shards(catalog, store_config, manifest, out_dir=SHARDS_DIR, page_size=SHARD_PAGE_SIZE, pages_out=None):
+    """Write one content-hashed JSON shard per category page plus a small index.
+
+    The index lists each category with its product count, shard file names and
+    card summaries for the first page, so the storefront can paint from the
+    index alone and fetch pages on demand. Records the index in `manifest` and
+    returns every path written or removed; `pages_out`, if given, is extended
+    with the path of every page the index refers to, written now or not.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    changed, keep, slugs, categories = [], set(), set(), []
+    for category, ids in catalog.by_category.items():
+        products = [catalog.products[p_id] for p_id in ids]
+        slug = category_slug(category, slugs)
+        pages = []
+        for page, start in enumerate(range(0, len(products), page_size)):
+            shard = {"category": category, "page": page,
+                     "products": [storefront_product(catalog, p) for p in products[start:start + page_size]]}
+            filename, written = write_hashed_json(out_dir, f"{slug}-{page}", shard)
+            pages.append(filename)
+            changed += written
+        keep.update(pages)
+        categories.append({
+            "name": category,
+            "slug": slug,
+            "count": len(products),
+            "pages": pages,
+            "first_page": [product_summary(p) for p in products[:page_size]],
+        })
+
+    index = {"store": store_config, "page_size": page_size, "categories": categories}
+    index_name, written = write_hashed_json(out_dir, "index", index, compress=True)
+    changed += written
+    keep.add(index_name)
+    changed += remove_stale(out_dir, r".+\.[0-9a-f]{12}\.json", keep)
+
+    manifest["shards"] = os.path.join(out_dir, index_name)
+    if pages_out is not None:
+        pages_out.extend(os.path.join(out_dir, filename) for filename in sorted(keep - {index_name}))
+    return changed
+
+# Fields searched, best match first; results are ranked by the best field a word is in
+SEARCH_FIELDS = ("name", "category", "description")
+
+def search_tokens(text):
+    """Accent-folded lowercase words: 'Crème Brûlée!' -> ['creme', 'brulee'].
+
+    app.js folds queries the same way (NFKD, marks dropped, toLowerCase).
+    """
+    text = str(text)
+    if not text.isascii():
+        text = "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.category(c).startswith("M"))
+    return re.findall(r"[^\W_]+", text.lower())
+
+def search_index(catalog):
+    """Inverted index for search-as-you-type, as stored in search.<hash>.json.
+
+    docs: product ids grouped by category, in shard order; a product is
+        referred to by its position here
+    terms: word -> docs containing it, name matches first, then category, then description
+    prefixes: typed prefix -> up to SEARCH_COMPLETIONS words it may be completing, most common first
+    categories / facets: category names and their product counts; category i
+        holds the next facets[i] docs, so a doc's page in the shards follows
+        from its position
+    """
+    categories = catalog.categories()
+    products = [catalog.products[p_id] for category in categories for p_id in catalog.by_category[category]]
+    ranks = {}  # word -> {doc: best field rank}
+    tokens = {}  # descriptions and categories repeat a lot; fold each text once
+    for doc, product in enumerate(products):
+        for rank, field in enumerate(SEARCH_FIELDS):
+            text = getattr(product, field)
+            words = tokens.get(text)
+            if words is None:
+                words = tokens[text] = set(search_tokens(text))
+            for word in words:  # fields go best first, so the first rank seen is the best
+                ranks.setdefault(word, {}).setdefault(doc, rank)
+    terms = {word: sorted(docs, key=lambda doc: (docs[doc], doc)) for word, docs in sorted(ranks.items())}
+
+    completions = {}
+    for word in terms:
+        for end in range(1, len(word)):
+            completions.setdefault(word[:end], []).append(word)
+    prefixes = {prefix: sorted(words, key=lambda w: (-len(terms[w]), w))[:SEARCH_COMPLETIONS]
+                for prefix, words in completions.items()}
+
+    return {
+        "docs": [p.id for p in products],
+        "terms": terms,
+        "prefixes": prefixes,
+        "categories": categories,
+        "facets": [len(catalog.by_category[c]) for c in categories],
+    }
+
+def search_products(index, query):
+    """Product ids matching `query`, best first: every word must match, the last
+    one as a prefix. The same lookup app.js does."""
+    words = search_tokens(query)
+    if not words:
+        return []
+    *complete, partial = words
+    required = [set(index["terms"].get(word, ())) for word in complete]
+    seen, matches = set(), []
+    for word in [partial] + index["prefixes"].get(partial, []):
+        for doc in index["terms"].get(word, ()):
+            if doc not in seen and all(doc in docs for docs in required):
+                seen.add(doc)
+                matches.append(index["docs"][doc])
+    return matches
+
+@traced("publish.search")
+def build_search_index(catalog, manifest, out_dir=DATA_DIR):
+    """Write search.<hash>.json (+ .gz/.br) next to the catalog and record it in `manifest`.
+
+    Returns every path written or removed.
+    """
+    index_name, changed = write_hashed_json(out_dir, "search", search_index(catalog), compress=True)
+    manifest["search"] = os.path.join(out_dir, index_name)
+    changed += remove_stale(out_dir, r"search\.[0-9a-f]+\.json", {index_name})
+    return changed
+
+def store_export_mode(store_config):
+    """The export mode saved in store.json, so the editor and every CLI publish build the same storefront"""
+    mode = store_config.get("export_mode", DEFAULT_EXPORT_MODE)
+    return mode if mode in EXPORT_MODES else DEFAULT_EXPORT_MODE
+
+def storefront_cache_inputs(mode):
+    """Fingerprint inputs for the storefront build: the data files on disk plus output settings"""
+    return {
+        "sources": [file_hash(path) if os.path.exists(path) else None for path in (PRODUCTS_FILE, TOPPINGS_FILE, STORE_FILE)],
+        "mode": mode,
+        "page_size": SHARD_PAGE_SIZE,
+        "search": [SEARCH_FIELDS, SEARCH_COMPLETIONS],
+        "brotli": brotli is not None,
+    }
+
+@traced("publish.storefront")
+def publish_storefront(catalog, store_config, mode=DEFAULT_EXPORT_MODE, cache=None):
+    """Build the storefront outputs for `mode` (see EXPORT_MODES) and update MANIFEST_FILE.
+
+    With a BuildCache the build is skipped when the data files and settings are
+    unchanged since the last publish; callers must have flushed `catalog` and
+    `store_config` to disk first.
+    """
+    key = f"storefront/{mode}"
+    if cache is not None:
+        inputs = storefront_cache_inputs(mode)
+        # The manifest is shared by all modes; only trust the entry if it is the one we wrote
+        if cache.get(key, inputs, check=lambda entry: entry["result"] == file_hash(MANIFEST_FILE)):
+            return []
+
+    manifest = {}
+    changed = []
+    shard_pages = []
+    if mode in ("bundle", "both"):
+        changed += build_storefront_bundle(catalog, store_config, manifest, DATA_DIR)
+    else:
+        changed += remove_stale(DATA_DIR, r"catalog\.[0-9a-f]+\.json", set())
+    if mode in ("shards", "both"):
+        changed += build_catalog_shards(catalog, store_config, manifest, SHARDS_DIR, pages_out=shard_pages)
+    elif os.path.isdir(SHARDS_DIR):
+        changed += remove_stale(SHARDS_DIR, r".+\.[0-9a-f]{12}\.json", set())
+    changed += build_search_index(catalog, manifest, DATA_DIR)
+
+    # Paths in the manifest are relative to it, as the storefront fetches them
+    manifest_dir = os.path.dirname(MANIFEST_FILE)
+    for field in ("bundle", "shards", "search"):
+        if field in manifest:
+            manifest[field] = os.path.relpath(manifest[field], manifest_dir).replace(os.sep, "/")
+
+    if read_json(MANIFEST_FILE, {}) != manifest:
+        write_json(MANIFEST_FILE, manifest)
+        changed.append(MANIFEST_FILE)
+
+    if cache is not None:
+        outputs = [MANIFEST_FILE] + [os.path.join(manifest_dir, manifest[k]) for k in ("bundle", "shards", "search") if k in manifest]
+        outputs += shard_pages  # the index alone is not enough: every page it points to must still exist
+        cache.put(key, inputs, file_hash(MANIFEST_FILE), outputs)
+    return changed
+
+# Bundles and search indexes written into DATA_DIR, with their compressed copies
+STOREFRONT_FILE_PATTERN = r"(catalog|search)\.[0-9a-f]+\.json(\.gz|\.br)?"
+
+def storefront_files(cwd=PROJECT_DIR):
+    """Every storefront build output, for git_publish: the manifest, the shards
+    directory, and the bundle/search files on disk or tracked but since removed.
+
+    Staged on every push rather than only what the last build changed, so the
+    output of a build that was never pushed (a build cache hit skips writing
+    it again) still goes out.
+    """
+    data_dir = os.path.relpath(DATA_DIR, cwd)
+    names = set(os.listdir(DATA_DIR)) if os.path.isdir(DATA_DIR) else set()
+    names.update(os.path.basename(path) for path in run_git(["ls-files", "--", data_dir], cwd).stdout.splitlines()
+                 if os.path.dirname(path) == data_dir.replace(os.sep, "/"))
+    return [MANIFEST_FILE, SHARDS_DIR] + sorted(os.path.join(DATA_DIR, name) for name in names
+                                                if re.fullmatch(STOREFRONT_FILE_PATTERN, name))
+
+# Git
+def run_git(args, cwd=PROJECT_DIR):
+    with span(f"git.{args[0]}"):
+        return subprocess.run(["git", *args], cwd=cwd, capture_output=True, text=True)
+
+@traced("git.publish")
+def git_publish(paths, message, cwd=PROJECT_DIR):
+    """Stage only `paths`, commit them if anything changed, and push.
+
+    Returns (ok, status) where status is a short human readable summary.
+    """
+    rel_paths = sorted(os.path.relpath(p, cwd) for p in paths if os.path.exists(p))
+    # Deleted files are staged too, as long as git tracks them
+    missing = sorted(os.path.relpath(p, cwd) for p in paths if not os.path.exists(p))
+    if missing:
+        rel_paths += run_git(["ls-files", "--", *missing], cwd).stdout.splitlines()
+    if not rel_paths:
+        return True, "Nothing to publish"
+
+    result = run_git(["add", "-A", "--", *rel_paths], cwd)
+    if result.returncode != 0:
+        return False, f"git add failed: {result.stderr.strip()}"
+
+    committed = False
+    if run_git(["diff", "--cached", "--quiet", "--", *rel_paths], cwd).returncode != 0:
+        result = run_git(["commit", "-m", message, "--", *rel_paths], cwd)
+        if result.returncode != 0:
+            return False, f"git commit failed: {result.stderr.strip() or result.stdout.strip()}"
+        committed = True
+
+    # Also push when an earlier publish committed but failed to push; without
+    # an upstream there is no way to tell, so only a new commit is pushed
+    if not committed:
+        ahead = run_git(["rev-list", "--count", "@{u}..HEAD"], cwd)
+        if ahead.returncode != 0 or ahead.stdout.strip() == "0":
+            return True, "No changes to publish"
+
+    result = run_git(["push"], cwd)
+    if result.returncode != 0:
+        return False, f"git push failed: {result.stderr.strip()}"
+    return True, "Changes pushed to GitHub" if committed else "Pending commits pushed to GitHub"
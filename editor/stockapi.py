@@ -0,0 +1,459 @@
+"""Live stock and reservations for the storefront: python -m editor serve
+
+A small asyncio HTTP/1.1 service (standard library only) that runs next to
+the editor. It serves the catalog and live availability with ETag/304
+responses, and takes stock holds and sales atomically: every check-and-update
+runs on the event loop without an await in between, so concurrent customers
+can never both get the last items.
+
+Sales are written back to the editor's data files (products.json, or the
+SQLite catalog) shortly after they happen, as decrements applied to a fresh
+read of the file, so edits made in the editor meanwhile are kept. Changes the
+editor saves are picked up within a second.
+
+    GET    /catalog                        products and toppings
+    GET    /stock                          {"version", "stock": {id: available}}
+    GET    /stock?since=<version>          only what changed since then
+    GET    /stock/<id>                     one product's availability
+    POST   /reservations                   {"items": [{"id", "qty"}], "ttl"?} -> hold stock
+    GET    /reservations/<id>
+    DELETE /reservations/<id>              release a hold
+    POST   /reservations/<id>/commit       turn a hold into a sale
+    POST   /decrement                      {"items": [...]} sell without a hold
+
+Requests for more than is available get 409 with the quantities that are.
+Clients poll /stock?since=<version from the last answer>, which stays small
+however large the catalog is; the full map is rebuilt at most once every
+STOCK_SNAPSHOT_MAX_AGE.
+"""
+import asyncio
+import contextlib
+import dataclasses
+import hashlib
+import json
+import re
+import secrets
+import signal
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+from .config import RESERVATION_TTL, STOCK_WRITE_DELAY
+from .storage import dump_json
+from .timing import span
+
+# Requests larger than this are refused (a cart is a few hundred bytes)
+MAX_BODY = 64 * 1024
+MAX_HEADERS = 100
+# How often expired holds are released and the data files checked for edits, in s
+SWEEP_INTERVAL = 1.0
+# Longest hold a client may ask for, in s
+MAX_RESERVATION_TTL = 24 * 3600
+# Per-product changes remembered for /stock?since=; older versions get the full map
+CHANGE_LOG_SIZE = 50000
+# The full /stock map is served up to this old (in s) while stock keeps changing
+STOCK_SNAPSHOT_MAX_AGE = 1.0
+
+class HTTPError(Exception):
+    def __init__(self, status, message, **extra):
+        super().__init__(message)
+        self.status = status
+        self.body = {"error": message, **extra}
+
+@dataclasses.dataclass
+class Reservation:
+    items: Counter
+    expires: float
+
+def etag_of(payload):
+    return f'"{hashlib.sha256(payload).hexdigest()[:20]}"'
+
+class StockService:
+    """Availability, holds and sales over a catalog loaded with `load()`.
+
+    `save(catalog, product_ids)` persists changed products and
+    `disk_version()` returns a cheap token that changes when the data files
+    do. All three run on one I/O thread, never on the event loop, so they may
+    block (and may use a SQLite connection, which is bound to its thread).
+    """
+    def __init__(self, load, save, disk_version=lambda: None, ttl=RESERVATION_TTL, write_delay=STOCK_WRITE_DELAY):
+        self.load = load
+        self.save = save
+        self.disk_version = disk_version
+        self.ttl = ttl
+        self.write_delay = write_delay
+        self.catalog = None
+        self.disk = None
+        self.sold = Counter()  # sales not yet written to the data files
+        self.reserved = Counter()
+        self.reservations = {}
+        self.catalog_version = 0
+        self.stock_version = 0
+        self.changes = deque(maxlen=CHANGE_LOG_SIZE)  # (stock version, product id)
+        self.changes_start = 0  # the log covers every change after this version
+        self.responses = {}  # cache key -> (version, built at, payload, etag)
+        self.writes = 0
+        self.io = ThreadPoolExecutor(1, thread_name_prefix="stock-io")
+        self.io_lock = None
+        self.write_task = None
+        self.sweep_task = None
+
+    def run_io(self, fn, *args):
+        return asyncio.get_running_loop().run_in_executor(self.io, fn, *args)
+
+    async def start(self):
+        self.io_lock = asyncio.Lock()
+        self.set_catalog(*await self.run_io(self.read_catalog))
+        self.sweep_task = asyncio.create_task(self.sweep())
+
+    async def close(self):
+        """Release the sweeper and write any sales still pending"""
+        if self.sweep_task is not None:
+            self.sweep_task.cancel()
+        if self.write_task is not None:
+            self.write_task.cancel()
+        await self.write_sold()
+        self.io.shutdown()
+
+    # Availability
+    def read_catalog(self):
+        with span("stockapi.load"):
+            return self.load(), self.disk_version()
+
+    def set_catalog(self, catalog, disk):
+        self.catalog = catalog
+        self.disk = disk
+        self.catalog_version += 1
+        self.changed()
+
+    def changed(self, p_ids=None):
+        """Bump the stock version; no `p_ids` means any product may have changed"""
+        self.stock_version += 1
+        if p_ids is None:
+            self.changes.clear()
+            self.changes_start = self.stock_version
+        else:
+            self.changes.extend((self.stock_version, p_id) for p_id in p_ids)
+
+    def changed_since(self, version):
+        """Ids of products changed after `version`, or None if the log doesn't reach back that far"""
+        # Once full, the log has lost entries up to (and maybe at) its oldest version
+        start = self.changes[0][0] if len(self.changes) == self.changes.maxlen else self.changes_start
+        if not start <= version <= self.stock_version:
+            return None
+        p_ids = set()
+        for entry_version, p_id in reversed(self.changes):
+            if entry_version <= version:
+                break
+            p_ids.add(p_id)
+        return p_ids
+
+    def product(self, p_id):
+        product = self.catalog.get_product(p_id)
+        if product is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"unknown product {p_id!r}")
+        return product
+
+    def available(self, product):
+        return max(0, product.stock - self.sold[product.id] - self.reserved[product.id])
+
+    def parse_items(self, data):
+        """Quantities per product id from a {"items": [{"id", "qty"}]} body"""
+        items = data.get("items") if isinstance(data, dict) else None
+        if not isinstance(items, list) or not items:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, 'expected {"items": [{"id": ..., "qty": ...}, ...]}')
+        wanted = Counter()
+        for item in items:
+            if not isinstance(item, dict) or not isinstance(item.get("id"), str):
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "each item needs a product id")
+            qty = item.get("qty", 1)
+            if not isinstance(qty, int) or isinstance(qty, bool) or qty < 1:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, f"qty for {item['id']!r} must be a whole number of at least 1")
+            wanted[item["id"]] += qty
+        for p_id, qty in wanted.items():
+            product = self.product(p_id)
+            if product.max_order and qty > product.max_order:
+                raise HTTPError(HTTPStatus.UNPROCESSABLE_ENTITY, f"at most {product.max_order} of {product.name!r} per order",
+                                max_order={p_id: product.max_order})
+        return wanted
+
+    def check_available(self, wanted):
+        short = {}
+        for p_id, qty in wanted.items():
+            available = self.available(self.product(p_id))
+            if qty > available:
+                short[p_id] = available
+        if short:
+            raise HTTPError(HTTPStatus.CONFLICT, "not enough stock", available=short)
+
+    # Holds and sales; each runs start to finish without yielding to other requests
+    def reserve(self, wanted, ttl):
+        self.check_available(wanted)
+        r_id = secrets.token_urlsafe(12)
+        self.reservations[r_id] = Reservation(wanted, time.monotonic() + ttl)
+        self.reserved += wanted
+        self.changed(wanted)
+        return r_id
+
+    def reservation(self, r_id):
+        reservation = self.reservations.get(r_id)
+        if reservation is None or reservation.expires <= time.monotonic():
+            raise HTTPError(HTTPStatus.NOT_FOUND, "no such reservation (it may have expired)")
+        return reservation
+
+    def release(self, r_id):
+        reservation = self.reservations.pop(r_id)
+        self.reserved -= reservation.items
+        self.changed(reservation.items)
+        return reservation
+
+    def commit(self, r_id):
+        self.reservation(r_id)
+        items = self.release(r_id).items
+        self.sell(items)
+        return items
+
+    def sell(self, wanted):
+        self.sold += wanted
+        self.changed(wanted)
+        if self.write_task is None:
+            self.write_task = asyncio.create_task(self.write_later())
+
+    def expire(self):
+        now = time.monotonic()
+        for r_id in [r_id for r_id, r in self.reservations.items() if r.expires <= now]:
+            self.release(r_id)
+
+    # Writing back
+    async def write_later(self):
+        await asyncio.sleep(self.write_delay)
+        self.write_task = None  # sales from here on schedule the next write
+        await self.write_sold()
+
+    async def write_sold(self):
+        """Move pending sales into the catalog's stock and save those products.
+
+        The catalog is re-read first only if the data files changed since we
+        last read or wrote them, so edits made in the editor are kept.
+        """
+        async with self.io_lock:
+            if not self.sold:
+                return
+            try:
+                await self.reload_if_changed()
+                pending, self.sold = self.sold, Counter()
+                for p_id, qty in pending.items():
+                    product = self.catalog.get_product(p_id)
+                    if product is not None:
+                        self.catalog.put_product(dataclasses.replace(product, stock=max(0, product.stock - qty)))
+                self.changed(pending)
+                try:
+                    self.disk = await self.run_io(self.save_products, list(pending))
+                except Exception:
+                    # Stock on disk is unknown now: re-read it and apply the sales again next time
+                    self.sold += pending
+                    self.disk = None
+                    raise
+            except Exception as e:
+                print(f"stock write failed, retrying: {e}", file=sys.stderr)
+                if self.write_task is None:
+                    self.write_task = asyncio.create_task(self.write_later())
+
+    def save_products(self, p_ids):
+        """Save `p_ids` from the catalog (on the I/O thread); returns the new disk version"""
+        with span("stockapi.write", products=len(p_ids)):
+            self.save(self.catalog, p_ids)
+            self.writes += 1
+            return self.disk_version()
+
+    async def reload_if_changed(self):
+        """Re-read the catalog if the data files changed; call with io_lock held"""
+        if self.catalog is None or await self.run_io(self.disk_version) != self.disk:
+            self.set_catalog(*await self.run_io(self.read_catalog))
+
+    async def sweep(self):
+        """Release expired holds and reload the catalog when the editor saved it"""
+        while True:
+            await asyncio.sleep(SWEEP_INTERVAL)
+            self.expire()
+            async with self.io_lock:
+                try:
+                    await self.reload_if_changed()
+                except Exception as e:
+                    print(f"catalog reload failed: {e}", file=sys.stderr)
+
+    # Responses
+    def cached_json(self, key, version, build, max_age=0):
+        """(payload, etag) for `key`, rebuilt when `version` changed and the copy is over `max_age` s old"""
+        cached = self.responses.get(key)
+        now = time.monotonic()
+        if cached is None or cached[0] != version and now - cached[1] >= max_age:
+            payload = dump_json(build(), compact=True).encode('utf-8')
+            cached = self.responses[key] = (version, now, payload, etag_of(payload))
+        return cached[2], cached[3]
+
+    def get_catalog(self):
+        return self.cached_json("catalog", self.catalog_version, lambda: {
+            "products": self.catalog.products_json(), "toppings": self.catalog.toppings_json()})
+
+    def get_stock(self, since=None):
+        p_ids = self.changed_since(since) if since is not None else None
+        if p_ids is None:
+            version = self.stock_version
+            return self.cached_json("stock", version, lambda: {
+                "version": version, "full": True,
+                "stock": {p.id: self.available(p) for p in self.catalog.products.values()}},
+                STOCK_SNAPSHOT_MAX_AGE)
+        stock = {}
+        for p_id in p_ids:
+            product = self.catalog.get_product(p_id)
+            stock[p_id] = self.available(product) if product is not None else 0
+        payload = dump_json({"version": self.stock_version, "full": False, "stock": stock}, compact=True).encode('utf-8')
+        return payload, etag_of(payload)
+
+    def handle(self, method, path, query, body):
+        """Route one request; returns (status, data) or (status, (payload, etag)) for cacheable GETs"""
+        if method == "GET" and path == "/catalog":
+            return HTTPStatus.OK, self.get_catalog()
+        if method == "GET" and path == "/stock":
+            since = query.get("since", [None])[0]
+            if since is not None and not since.isdigit():
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "since must be a stock version")
+            return HTTPStatus.OK, self.get_stock(int(since) if since is not None else None)
+        match = re.fullmatch(r"/stock/([^/]+)", path)
+        if method == "GET" and match:
+            product = self.product(match[1])
+            payload = dump_json({"id": product.id, "available": self.available(product), "max_order": product.max_order},
+                                compact=True).encode('utf-8')
+            return HTTPStatus.OK, (payload, etag_of(payload))
+        if method == "POST" and path == "/reservations":
+            data = self.parse_body(body)
+            ttl = data.get("ttl", self.ttl) if isinstance(data, dict) else self.ttl
+            if not isinstance(ttl, (int, float)) or not 0 < ttl <= MAX_RESERVATION_TTL:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, f"ttl must be between 0 and {MAX_RESERVATION_TTL} seconds")
+            wanted = self.parse_items(data)
+            r_id = self.reserve(wanted, ttl)
+            return HTTPStatus.CREATED, {"reservation": r_id, "items": wanted, "expires_in": ttl}
+        match = re.fullmatch(r"/reservations/([^/]+)(/commit)?", path)
+        if match and not match[2] and method == "GET":
+            reservation = self.reservation(match[1])
+            return HTTPStatus.OK, {"reservation": match[1], "items": reservation.items,
+                                   "expires_in": round(reservation.expires - time.monotonic(), 1)}
+        if match and not match[2] and method == "DELETE":
+            self.reservation(match[1])
+            self.release(match[1])
+            return HTTPStatus.NO_CONTENT, None
+        if match and match[2] and method == "POST":
+            return HTTPStatus.OK, {"sold": self.commit(match[1])}
+        if method == "POST" and path == "/decrement":
+            wanted = self.parse_items(self.parse_body(body))
+            self.check_available(wanted)
+            self.sell(wanted)
+            return HTTPStatus.OK, {"sold": wanted}
+        if path in ("/catalog", "/stock", "/reservations", "/decrement") or match or re.fullmatch(r"/stock/[^/]+", path):
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} not allowed on {path}")
+        raise HTTPError(HTTPStatus.NOT_FOUND, f"no such endpoint {path}")
+
+    @staticmethod
+    def parse_body(body):
+        try:
+            return json.loads(body or b"null")
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "request body is not valid JSON") from None
+
+    # HTTP
+    async def handle_connection(self, reader, writer):
+        """Serve requests on one (keep-alive) connection"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                keep_alive = await self.handle_request(request_line, reader, writer)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass  # client went away, or a line over the stream limit
+        finally:
+            writer.close()
+
+    async def handle_request(self, request_line, reader, writer):
+        headers = {}
+        try:
+            method, target, version = request_line.decode('latin-1').split()
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                if len(headers) >= MAX_HEADERS:
+                    raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "too many headers")
+                name, _, value = line.decode('latin-1').partition(":")
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get("content-length", 0))
+            if not 0 <= length <= MAX_BODY:
+                raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"request body over {MAX_BODY} bytes")
+        except HTTPError as e:
+            self.respond(writer, e.status, e.body, keep_alive=False)
+            return False
+        except ValueError:
+            self.respond(writer, HTTPStatus.BAD_REQUEST, {"error": "malformed request"}, keep_alive=False)
+            return False
+        body = await reader.readexactly(length) if length else b""
+        keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+
+        if method == "OPTIONS":  # CORS preflight from the storefront's origin
+            self.respond(writer, HTTPStatus.NO_CONTENT, None, keep_alive)
+            return keep_alive
+        try:
+            url = urlsplit(target)
+            status, data = self.handle(method, url.path.rstrip("/") or "/", parse_qs(url.query), body)
+        except HTTPError as e:
+            status, data = e.status, e.body
+        etag = None
+        if isinstance(data, tuple):
+            data, etag = data
+            if etag in (tag.strip() for tag in headers.get("if-none-match", "").split(",")):
+                status, data = HTTPStatus.NOT_MODIFIED, None
+        self.respond(writer, status, data, keep_alive, etag)
+        return keep_alive
+
+    @staticmethod
+    def respond(writer, status, data, keep_alive, etag=None):
+        if data is None:
+            payload = b""
+        elif isinstance(data, bytes):
+            payload = data
+        else:
+            payload = dump_json(data, compact=True).encode('utf-8')
+        lines = [f"HTTP/1.1 {status.value} {status.phrase}",
+                 "Access-Control-Allow-Origin: *",
+                 "Access-Control-Allow-Methods: GET, POST, DELETE, OPTIONS",
+                 "Access-Control-Allow-Headers: Content-Type, If-None-Match",
+                 "Access-Control-Expose-Headers: ETag",
+                 "Cache-Control: no-cache",
+                 f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        if etag:
+            lines.append(f"ETag: {etag}")
+        if payload:
+            lines.append("Content-Type: application/json; charset=utf-8")
+        if status != HTTPStatus.NOT_MODIFIED and status != HTTPStatus.NO_CONTENT:
+            lines.append(f"Content-Length: {len(payload)}")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1') + payload)
+
+async def serve(service, host, port, started=None):
+    """Run the service until cancelled (or sent SIGTERM); `started(port)` is called once it listens"""
+    with contextlib.suppress(NotImplementedError):  # no signal handlers on Windows event loops
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    await service.start()
+    server = await asyncio.start_server(service.handle_connection, host, port, backlog=1024)
+    try:
+        async with server:
+            if started is not None:
+                started(server.sockets[0].getsockname()[1])
+            await server.serve_forever()
+    finally:
+        await service.close()
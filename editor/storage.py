@@ -0,0 +1,121 @@
+"""JSON data files: atomic writes, corrupt-file detection and batched flushes"""
+import json
+import os
+import shutil
+import tempfile
+
+from .config import BACKUP_DIR, COMPACT_JSON
+from .timing import span, traced
+
+class DataFileError(Exception):
+    """A data file exists but could not be parsed; never silently replaced"""
+    def __init__(self, path, reason):
+        super().__init__(f"{os.path.basename(path)} is corrupt: {reason}")
+        self.path = path
+        self.backup = backup_path(path) if os.path.exists(backup_path(path)) else None
+
+def backup_path(path):
+    return os.path.join(BACKUP_DIR, os.path.basename(path))
+
+def read_json(path, default):
+    """Load a JSON data file; a missing file gives `default`, a corrupt one raises DataFileError"""
+    if not os.path.exists(path):
+        return default
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        raise DataFileError(path, str(e)) from e
+    if not isinstance(data, type(default)):
+        raise DataFileError(path, f"expected a JSON {type(default).__name__}, got {type(data).__name__}")
+    return data
+
+def file_signature(path):
+    """(mtime, size, inode) of a file, or None when it doesn't exist"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+def dump_json(data, compact=False):
+    if compact:
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    return json.dumps(data, ensure_ascii=False, indent=2)
+
+def write_bytes(path, data):
+    """Atomically replace `path`: write a temp file in the same folder, fsync, then rename"""
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp creates 0600 files; keep the target readable by web servers
+        os.chmod(tmp_path, os.stat(path).st_mode & 0o777 if os.path.exists(path) else 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def write_json(path, data, compact=False):
+    with span("storage.write_json", file=os.path.basename(path)):
+        write_bytes(path, dump_json(data, compact).encode('utf-8'))
+
+class DataStore:
+    """Tracks which data files have unsaved changes and writes them in batches.
+
+    `set()` only records the new value (or a zero-argument callable producing it,
+    evaluated at flush time); `flush()` writes every dirty file once, keeping a
+    copy of the previous (last good) version in BACKUP_DIR.
+
+    The on-disk signature of each file as last read or written is kept, so
+    changes made by other programs can be told apart from our own writes.
+    """
+    def __init__(self, compact=COMPACT_JSON):
+        self.compact = compact
+        self.values = {}
+        self.dirty = set()
+        self.signatures = {}
+
+    def load(self, path, default):
+        signature = file_signature(path)
+        data = read_json(path, default)
+        self.values[path] = data
+        self.dirty.discard(path)
+        self.signatures[path] = signature
+        return data
+
+    def changed_on_disk(self, path):
+        return file_signature(path) != self.signatures.get(path)
+
+    def synced(self, path, signature):
+        """Record that the file as of `signature` has been merged into our data"""
+        self.signatures[path] = signature
+
+    def set(self, path, data):
+        self.values[path] = data
+        self.dirty.add(path)
+
+    def is_dirty(self, path=None):
+        return path in self.dirty if path else bool(self.dirty)
+
+    @traced("storage.flush")
+    def flush(self):
+        """Write all dirty files; returns the paths written"""
+        written = []
+        for path in sorted(self.dirty):
+            if os.path.exists(path):
+                os.makedirs(BACKUP_DIR, exist_ok=True)
+                shutil.copy2(path, backup_path(path))
+            data = self.values[path]
+            write_json(path, data() if callable(data) else data, self.compact)
+            self.signatures[path] = file_signature(path)
+            written.append(path)
+        self.dirty.clear()
+        return written
+
+    def restore_backup(self, path):
+        shutil.copy2(backup_path(path), path)
@@ -0,0 +1,127 @@
+"""Wall-clock timings: phase timings for the GUI startup report, and spans
+that can be exported as a Chrome trace (chrome://tracing or ui.perfetto.dev).
+
+Tracing is off unless BITEBABE_TRACE is set (or it is switched on at runtime);
+while off, span() hands back one shared no-op context manager and traced
+functions call straight through, so instrumented code costs next to nothing.
+"""
+import collections
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+
+class PhaseTimer:
+    """Records the time between consecutive mark() calls as named phases"""
+    def __init__(self, start=None):
+        self.start = time.perf_counter() if start is None else start
+        self.last = self.start
+        self.phases = []  # (name, ms)
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.phases.append((name, (now - self.last) * 1000))
+        self.last = now
+
+    def total_ms(self):
+        return (self.last - self.start) * 1000
+
+    def report(self, title, budget_ms=None):
+        total = self.total_ms()
+        lines = [f"{title}: {total:.0f} ms" + (f" (budget {budget_ms} ms)" if budget_ms else "")]
+        for name, ms in self.phases:
+            lines.append(f"  {name:<16} {ms:8.1f} ms")
+        if budget_ms and total > budget_ms:
+            lines.append(f"  over budget by {total - budget_ms:.0f} ms")
+        return "\n".join(lines)
+
+_NO_SPAN = contextlib.nullcontext()
+
+class Tracer:
+    """Collects completed spans, newest `max_events` kept.
+
+    `on_finish(name, ms)` is called for each outermost span of a thread, from
+    that thread, e.g. to show the last operation's duration.
+    """
+    def __init__(self, enabled=False, max_events=100000):
+        self.enabled = enabled
+        self.events = collections.deque(maxlen=max_events)  # (name, start, end, thread id, args)
+        self.thread_names = {}
+        self.origin = time.perf_counter()
+        self.on_finish = None
+        self.local = threading.local()
+
+    def span(self, name, **args):
+        if not self.enabled:
+            return _NO_SPAN
+        return _Span(self, name, args)
+
+    def clear(self):
+        self.events.clear()
+
+    def chrome_trace(self):
+        """The recorded spans in Chrome trace event format"""
+        pid = os.getpid()
+        events = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+                  for tid, name in self.thread_names.items()]
+        for name, start, end, tid, args in list(self.events):
+            event = {"name": name, "cat": name.split(".")[0], "ph": "X", "pid": pid, "tid": tid,
+                     "ts": round((start - self.origin) * 1e6, 1), "dur": round((end - start) * 1e6, 1)}
+            if args:
+                event["args"] = args
+            events.append(event)
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f)
+        return len(self.events)
+
+class _Span:
+    __slots__ = ("tracer", "name", "args", "start")
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        local = self.tracer.local
+        local.depth = getattr(local, "depth", 0) + 1
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        tracer = self.tracer
+        tracer.local.depth -= 1
+        tid = threading.get_ident()
+        if tid not in tracer.thread_names:
+            tracer.thread_names[tid] = threading.current_thread().name
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        tracer.events.append((self.name, self.start, end, tid, self.args))
+        if tracer.local.depth == 0 and tracer.on_finish is not None:
+            tracer.on_finish(self.name, (end - self.start) * 1000)
+        return False
+
+tracer = Tracer(enabled=bool(os.environ.get("BITEBABE_TRACE")))
+
+def span(name, **args):
+    """Context manager timing a block as `name` on the global tracer"""
+    return tracer.span(name, **args)
+
+def traced(name):
+    """Decorator: time every call as a span. Not for Qt slots, whose argument
+    count PyQt reads from the function signature; use span() inside them."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return fn(*args, **kwargs)
+            with _Span(tracer, name, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
@@ -0,0 +1,77 @@
+import dataclasses
+
+import pytest
+
+from editor.bulk import BulkEditError, apply_records, plan_bulk_edit, scaled_price
+from editor.catalog import Catalog, Product, Topping
+from editor.config import PRICE_MAX
+
+def make_catalog():
+    return Catalog(
+        [Product("a", "Choco", price=10000, category="Cookies", toppings=["nuts"]),
+         Product("b", "Vanilla", price=12500.5, category="Cookies"),
+         Product("c", "Party Box", price=PRICE_MAX - 100, category="Boxes")],
+        [Topping("nuts", "Nuts", 2000), Topping("oreo", "Oreo", 3000)])
+
+def test_scaled_price_keeps_whole_prices_whole():
+    assert scaled_price(10000, 10) == 11000
+    assert isinstance(scaled_price(10000, 10), int)
+    assert scaled_price(10000, -50) == 5000
+
+def test_scaled_price_rounds_to_two_decimals():
+    assert scaled_price(9.99, 15) == 11.49
+    assert scaled_price(10050, 0.5) == 10100.25
+    assert scaled_price(10001, 0.5) == 10051  # rounds to a whole price, so stays an int
+    assert isinstance(scaled_price(10.0, 10), float)
+
+def test_plan_rejects_prices_scaled_out_of_range():
+    catalog = make_catalog()
+    with pytest.raises(BulkEditError, match="Party Box"):
+        plan_bulk_edit(catalog, ["a", "c"], "scale_price", 10)
+    with pytest.raises(BulkEditError):
+        plan_bulk_edit(catalog, ["a"], "scale_price", -150)
+    with pytest.raises(BulkEditError):
+        plan_bulk_edit(catalog, ["a"], "set_price", PRICE_MAX + 1)
+
+def test_plan_skips_unchanged_and_unknown_products():
+    catalog = make_catalog()
+    pairs = plan_bulk_edit(catalog, ["a", "b", "missing"], "add_topping", "nuts")
+    assert [(old.id, new.toppings) for old, new in pairs] == [("b", ["nuts"])]
+    assert plan_bulk_edit(catalog, ["a", "b"], "set_category", "Cookies") == []
+
+def test_plan_rejects_unknown_toppings():
+    with pytest.raises(BulkEditError, match="unknown topping"):
+        plan_bulk_edit(make_catalog(), ["a"], "remove_topping", "sprinkles")
+
+def test_plan_does_not_modify_the_catalog():
+    catalog = make_catalog()
+    before = catalog.products_json()
+    plan_bulk_edit(catalog, list(catalog.products), "set_stock", 7)
+    assert catalog.products_json() == before
+
+def test_undo_skips_products_edited_since():
+    catalog = make_catalog()
+    pairs = plan_bulk_edit(catalog, ["a", "b"], "set_stock", 3)
+    written = apply_records(catalog, [new for _, new in pairs])
+    assert written == ["a", "b"]
+
+    # "b" is edited again after the bulk edit; undoing must not clobber that
+    catalog.put_product(dataclasses.replace(catalog.get_product("b"), name="Vanilla Bean"))
+    undone = apply_records(catalog, [old for old, _ in pairs], expected={new.id: new for _, new in pairs})
+    assert undone == ["a"]
+    assert catalog.get_product("a").stock == 0
+    assert catalog.get_product("b").stock == 3
+    assert catalog.get_product("b").name == "Vanilla Bean"
+
+def test_undo_skips_products_whose_topping_was_deleted_since():
+    catalog = make_catalog()
+    pairs = plan_bulk_edit(catalog, ["a", "b"], "scale_price", 10)
+    apply_records(catalog, [new for _, new in pairs])
+
+    # Deleting a topping replaces the products offering it; the undo snapshot must not follow
+    assert catalog.remove_topping("nuts") == ["a"]
+    assert pairs[0][1].toppings == ["nuts"]
+    undone = apply_records(catalog, [old for old, _ in pairs], expected={new.id: new for _, new in pairs})
+    assert undone == ["b"]
+    assert catalog.get_product("a").toppings == []
+    assert catalog.products_with_topping("nuts") == []
@@ -0,0 +1,32 @@
+import dataclasses
+
+from editor.catalog import Catalog, Product
+from editor.catalogdb import CatalogDB
+
+def stock_of(db, p_id):
+    return next(p.stock for p in db.products() if p.id == p_id)
+
+def test_saves_keep_stock_sold_by_another_connection(tmp_path):
+    path = str(tmp_path / "catalog.db")
+    editor = CatalogDB(path)
+    editor.replace_all(Catalog([Product("a", "Choco", stock=10), Product("b", "Vanilla", stock=5)]))
+    catalog = editor.load()
+    version = editor.data_version()
+
+    service = CatalogDB(path)
+    sold = service.load()
+    sold.put_product(dataclasses.replace(sold.get_product("a"), stock=7))
+    service.save(sold, ["a"])
+    assert editor.data_version() != version
+
+    # An edit that leaves stock alone must not put the sold units back
+    catalog.put_product(dataclasses.replace(catalog.get_product("a"), name="Choco Chip"))
+    editor.save(catalog, ["a"])
+    assert stock_of(editor, "a") == 7
+
+    # A restock adds to what is left
+    catalog.put_product(dataclasses.replace(catalog.get_product("a"), stock=14))
+    editor.save(catalog, ["a"])
+    assert stock_of(editor, "a") == 11
+    service.close()
+    editor.close()
@@ -0,0 +1,69 @@
+import json
+import os
+import re
+import shutil
+import subprocess
+
+import pytest
+
+from editor.catalog import Catalog, Product
+from editor.config import PROJECT_DIR
+from editor.publish import search_index, search_products, search_tokens
+
+def make_catalog():
+    return Catalog([
+        Product("tart", "Crème Brûlée Tart", category="Tarts", description="Torched sugar"),
+        Product("choco", "Choco Chip", category="Cookies", description="Belgian chocolate"),
+        Product("mocha", "Mocha Crunch", category="Cookies", description="Coffee and choco shards"),
+        Product("box", "Party Box", category="Boxes", description="Twelve cookies"),
+        Product("lava", "Choco Lava", category="Tarts", description="Molten centre"),
+    ])
+
+def found(catalog, query):
+    return search_products(search_index(catalog), query)
+
+def test_tokens_fold_accents_and_case():
+    assert search_tokens("Crème Brûlée!") == ["creme", "brulee"]
+    assert search_tokens("Ｃａｆé_au-lait 2x") == ["cafe", "au", "lait", "2x"]
+    assert search_tokens("  ") == []
+
+def test_accented_names_match_plain_queries():
+    catalog = make_catalog()
+    assert found(catalog, "creme") == ["tart"]
+    assert found(catalog, "brul") == ["tart"]
+    assert found(catalog, "CRÈME brû") == ["tart"]
+
+def test_every_word_must_match_last_one_as_prefix():
+    catalog = make_catalog()
+    assert found(catalog, "choco la") == ["lava"]
+    assert found(catalog, "choco lava x") == []
+    # Only the last word completes: "cho" alone matches, as a first word it must be whole
+    assert set(found(catalog, "cho")) == {"choco", "mocha", "lava"}
+    assert found(catalog, "cho lava") == []
+
+def test_name_matches_rank_above_description_matches():
+    catalog = make_catalog()
+    results = found(catalog, "choco")
+    assert results.index("mocha") > max(results.index("choco"), results.index("lava"))
+    results = found(catalog, "cookie")
+    assert results[:2] == ["choco", "mocha"] and results[-1] == "box"  # category before description
+
+def test_facets_follow_docs_in_shard_order():
+    catalog = make_catalog()
+    index = search_index(catalog)
+    assert sum(index["facets"]) == len(index["docs"])
+    start = 0
+    for category, count in zip(index["categories"], index["facets"]):
+        assert index["docs"][start:start + count] == list(catalog.by_category[category])
+        start += count
+
+def test_app_js_tokenizer_matches():
+    node = shutil.which("node")
+    if node is None:
+        pytest.skip("node is not installed")
+    with open(os.path.join(PROJECT_DIR, "app.js"), encoding="utf-8") as f:
+        source = re.search(r"^function searchTokens\(text\) \{.*?^\}", f.read(), re.M | re.S).group(0)
+    texts = ["Crème Brûlée!", "Ｃａｆé_au-lait 2x", "Ñandú Æsir ǅemal", "Straße ½ ①", "日本の菓子 ١٢٣"]
+    script = f"{source}\nconsole.log(JSON.stringify({json.dumps(texts)}.map(searchTokens)));"
+    output = subprocess.run([node, "-e", script], capture_output=True, text=True, check=True).stdout
+    assert json.loads(output) == [search_tokens(text) for text in texts]